@@ -1,20 +1,53 @@
 # athlete-app/api/deps.py
+from collections import OrderedDict
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from pymongo.errors import ConnectionFailure
 from athlete_app.core.security import decode_token
-from athlete_app.core.config import db
+from shared.repositories import Repositories, get_repos
+from athlete_app.services.ingest import db_is_down, mark_db_down, mark_db_up
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+# 💾 Last user doc seen per email, so devices keep ingesting (into the spool)
+# while MongoDB is down. Bounded; oldest entries fall out first.
+USER_CACHE_SIZE = 1024
+_known_users: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def _remember_user(email: str, user: dict):
+    _known_users[email] = user
+    _known_users.move_to_end(email)
+    while len(_known_users) > USER_CACHE_SIZE:
+        _known_users.popitem(last=False)
+
+
+def _cached_user(email: str) -> dict:
+    user = _known_users.get(email)
+    if user is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), repos: Repositories = Depends(get_repos)):
     payload = decode_token(token)
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid token")
 
     # ✅ Only query by email (token `sub` is email)
-    user = await db.users.find_one({"email": payload["sub"]})
+    email = payload["sub"]
+    if db_is_down():
+        user = _cached_user(email)
+    else:
+        try:
+            user = await repos.users.find_one({"email": email})
+            mark_db_up()
+        except ConnectionFailure:
+            mark_db_down()
+            user = _cached_user(email)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    _remember_user(email, user)
 
     # ✅ Role check
     if user.get("role") != "athlete":
@@ -1,14 +1,30 @@
 from fastapi import APIRouter, Depends
 from datetime import datetime, timezone
 from athlete_app.api.deps import require_athlete
-from athlete_app.core.config import db
+from shared.repositories import Repositories, get_repos, get_repositories
 from fastapi.encoders import jsonable_encoder
 from athlete_app.models.schemas import HydrationAlertInput
 from bson import ObjectId
-from shared.utils import get_status_label, format_status_for_coach
+from shared.utils import format_status_for_coach
+from shared.hydration import ALERT_TEMPLATES, alert_template, coach_summary, transition_template
+from athlete_app.core.config import ALERT_REMINDER_MINUTES, ALERT_HYSTERESIS, ALERT_COOLDOWN_SECONDS
+from athlete_app.services.alert_engine import AlertEngine
+from shared.coach_inbox import append_to_inbox
+from shared.athlete_state import athlete_state
+from shared.response_cache import bump_coach_version
+from shared.responses import stream_json_array
+from datetime import timedelta
+from typing import Optional
 
 router = APIRouter()
 
+# 🧠 Per-process alert state (see services/alert_engine.py)
+alert_engine = AlertEngine(
+    reminder_interval=timedelta(minutes=ALERT_REMINDER_MINUTES),
+    cooldowns={k: timedelta(seconds=v) for k, v in ALERT_COOLDOWN_SECONDS.items()},
+    hysteresis=ALERT_HYSTERESIS,
+)
+
 # def get_coach_summary(hydration_level: float) -> str:
 #     if hydration_level < 70:
 #         return f"Dehydrated at {hydration_level:.0f}%"
@@ -17,51 +33,25 @@ router = APIRouter()
 #     else:
 #         return f"Hydrated at {hydration_level:.0f}%"
 
+# 📋 Templates and cutoffs live in shared/hydration.py
 def get_coach_summary(hydration_level: float) -> str:
-    if hydration_level < 70:
-        return f"The athlete is in a dehydrated state with hydration at {hydration_level:.0f}%. Immediate attention is recommended."
-    elif hydration_level < 85:
-        return f"The athlete's hydration level has dropped to {hydration_level:.0f}%. Encourage water intake soon."
-    else:
-        return f"The athlete is well-hydrated at {hydration_level:.0f}%. No immediate action needed."
+    return coach_summary(hydration_level)
+
+HYDRATION_ALERT_DETAILS = ALERT_TEMPLATES
 
 def get_hydration_alert_details(hydration_level: int):
-    if hydration_level < 70:
-        return {
-            "type": "DEHYDRATED",
-            "title": "Critical Hydration Alert",
-            "description": (
-                "You are in a dehydrated state! Immediate hydration is recommended to prevent fatigue and performance decline."
-            )
-        }
-    elif hydration_level < 85:
-        return {
-            "type": "SLIGHTLY DEHYDRATED",
-            "title": "Hydration Warning",
-            "description": (
-                "You are slightly dehydrated. Drink 250mL of water to maintain optimal performance."
-            )
-        }
-    else:
-        return {
-            "type": "HYDRATED",
-            "title": "Daily Hydration Goal Reminder",
-            "description": (
-                "You’ve consumed 1.5L of water today. Keep going!\nYour daily hydration goal is 2.5L."
-            )
-        }
+    return alert_template(hydration_level)
 
 @router.get("/alerts")
-async def get_athlete_alerts(user=Depends(require_athlete)):
-    cursor = db.alerts.find({"athlete_id": user["username"]}).sort("timestamp", -1)
-
-    result = []
-    async for doc in cursor:
-        doc["id"] = str(doc.pop("_id"))
-        doc["timestamp"] = doc["timestamp"].isoformat() + "Z"  # ✅ Append 'Z' for UTC
-        result.append(doc)
-
-    return result
+async def get_athlete_alerts(user=Depends(require_athlete), repos: Repositories = Depends(get_repos)):
+    # ⚡ id renamed server-side, streamed straight to orjson (timestamps get 'Z' for UTC)
+    cursor = repos.alerts.aggregate([
+        {"$match": {"athlete_id": user["username"]}},
+        {"$sort": {"timestamp": -1}},
+        {"$set": {"id": {"$toString": "$_id"}}},
+        {"$unset": "_id"},
+    ])
+    return stream_json_array(cursor, utc_z=True)
 
 # @router.post("/alerts/hydration")
 # async def insert_hydration_alert(payload: HydrationAlertInput, user=Depends(require_athlete)):
@@ -120,6 +110,7 @@ async def get_athlete_alerts(user=Depends(require_athlete)):
 #     return {"message": "Hydration alert created"}
 
 async def insert_hydration_alert(payload: HydrationAlertInput, user=Depends(require_athlete)):
+    repos = get_repositories()
     hydration_level = payload.hydration_level
     alert_data = get_hydration_alert_details(hydration_level)
     coach_msg = get_coach_summary(hydration_level)  # ← Short summary
@@ -135,7 +126,7 @@ async def insert_hydration_alert(payload: HydrationAlertInput, user=Depends(requ
         "coach_message": coach_msg  # ← This is what the coach will read
     }
 
-    result = await db.alerts.insert_one(alert)
+    result = await repos.alerts.insert_one(alert)
 
     response = {
         "status": "inserted",
@@ -174,30 +165,29 @@ async def insert_hydration_alert(payload: HydrationAlertInput, user=Depends(requ
 
 # athlete_app/api/routes/alerts.py
 
-async def insert_prediction_alert(user: dict, hydration_label: str, hydration_percent: int, source: str = "ml_model"):
-    if hydration_percent >= 85:
-        return  # skip if hydrated
-
+async def insert_prediction_alert(
+    user: dict, hydration_label: str, hydration_percent: int, source: str = "ml_model",
+    previous_level: Optional[float] = None
+):
+    repos = get_repositories()
     athlete_id = user["username"]
-    status = get_status_label(hydration_percent)
 
-    # get last hydration status
-    latest_preds = await db.predictions.find(
-        {"user": user["email"]}
-    ).sort("timestamp", -1).to_list(length=2)
+    # 🔄 Previous reading was handled by another worker (or before a restart)
+    if previous_level is not None:
+        alert_engine.sync(athlete_id, previous_level)
 
-    last_status = None
-    if len(latest_preds) > 1:
-        prev = latest_preds[1]
-        last_status = prev.get("hydration_status")
+    # 🔕 Engine drops repeats; only transitions and periodic reminders get written
+    decision = alert_engine.evaluate(athlete_id, hydration_percent)
+    if decision is None:
+        return
 
-    is_changed = last_status != status
+    status = decision["status"]
+    is_changed = decision["status_change"]
+    # 📋 Recovery to hydrated gets its own template, not the daily goal reminder
+    alert_data = transition_template(status, decision["previous_status"])
 
-    alert_data = get_hydration_alert_details(hydration_percent)
-
-    # 🔍 Get coach name from athletes collection
-    athlete_doc = await db.athletes.find_one({"username": athlete_id})
-    coach_name = athlete_doc.get("assigned_by") if athlete_doc else None
+    # 🔍 Coach from the last-known state (athletes docs carry the email, not the username)
+    coach_name = await athlete_state.coach_for(user["email"])
 
     alert_doc = {
         "athlete_id": athlete_id,
@@ -214,7 +204,12 @@ async def insert_prediction_alert(user: dict, hydration_label: str, hydration_pe
         "coach_name": coach_name  # 🆕 Added coach_name to alert doc
     }
 
-    await db.alerts.insert_one(alert_doc)
+    result = await repos.alerts.insert_one(alert_doc)
+
+    # 📥 Fan out to the coach's inbox (coach feed only shows status changes)
+    if coach_name and is_changed:
+        await append_to_inbox(coach_name, result.inserted_id, alert_doc)
+        await bump_coach_version(coach_name, "alerts")
 
 # async def insert_auto_hydration_alert(user: dict, hydration_label: str, hydration_percent: int):
 #     if hydration_percent >= 85:
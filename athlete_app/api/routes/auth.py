@@ -1,14 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from shared.schemas import UserLogin, UserSignup
 from shared.security import create_access_token, hash_password, verify_password
-from athlete_app.core.config import db
+from shared.repositories import Repositories, get_repos
 from datetime import datetime
 
 router = APIRouter()
 
 @router.post("/signup")
-async def signup(data: UserSignup):
-    existing = await db.users.find_one({"email": data.email})
+async def signup(data: UserSignup, repos: Repositories = Depends(get_repos)):
+    existing = await repos.users.find_one({"email": data.email})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -22,13 +22,13 @@ async def signup(data: UserSignup):
         "created_at": datetime.utcnow()
     }
 
-    await db.users.insert_one(new_user)
+    await repos.users.insert_one(new_user)
     token = create_access_token({"sub": data.email, "role": data.role})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/login")
-async def login(data: UserLogin):
-    user = await db.users.find_one({"email": data.email})
+async def login(data: UserLogin, repos: Repositories = Depends(get_repos)):
+    user = await repos.users.find_one({"email": data.email})
     if not user or not verify_password(data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": user["email"], "role": "athlete"})
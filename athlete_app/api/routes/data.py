@@ -1,78 +1,88 @@
 # athlete-app/api/routes/data.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from datetime import datetime, timezone
 from fastapi.responses import JSONResponse
-from typing import List
-import pandas as pd
+from typing import List, Optional, Literal
 
 from athlete_app.models.schemas import SensorData, RawSensorInput
 from athlete_app.api.deps import get_current_user, require_athlete
-from athlete_app.core.config import db
+from shared.repositories import Repositories, get_repos, get_repositories
 from athlete_app.services.predictor import predict_hydration
-from athlete_app.services.preprocess import extract_features_from_row, HYDRATION_LABELS
-from athlete_app.core.model_loader import get_model, get_scaler
-from athlete_app.api.routes.alerts import insert_prediction_alert
+from athlete_app.services.preprocess import extract_features_from_row
+from shared.hydration import label_for_prediction, percent_for_label
+from athlete_app.api.routes.alerts import insert_prediction_alert, alert_engine
+from shared.coach_stats import record_athlete_change
+from shared.athlete_state import athlete_state
+from shared.response_cache import bump_coach_version
+from shared.responses import stream_json_array, BSONJSONResponse
+from athlete_app.services.ingest import (
+    write_reading, ingest_status, ingest_key, find_ingested, recent_keys, ingest_load
+)
+from athlete_app.services.sampling import recommend_sampling
+from athlete_app.services.sensor_quality import (
+    FLATLINE_CHANNELS, assess, summarize, describe, merged_flags, raw_channels, record_sensor_warnings,
+    sensor_quality
+)
+from athlete_app.services.ecg import decode_window, ecg_stage
+from athlete_app.core.config import SENSOR_REJECT_ARTIFACTS
+from bson import ObjectId
+from shared.rollups import history_window, update_rollups, read_history
+from shared.projections import (
+    build_projection, PREDICTION_FIELDS, PREDICTION_PROJECTION,
+    SENSOR_WARNING_FIELDS, SENSOR_WARNING_PROJECTION, VITALS_PROJECTION
+)
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 
+async def warn_sensor_quality(user: dict, device: str, quality: dict, received: dict):
+    """Count flags into the device's warning window; one SensorWarning alert per new window."""
+    opened = await record_sensor_warnings(user["username"], device, quality, received)
+    if opened and merged_flags(quality) and alert_engine.allow(user["username"], "SensorWarning"):
+        await get_repositories().alerts.insert_one({
+            "athlete_id": user["username"],
+            "alert_type": "SensorWarning",
+            "description": f"Sensor quality issues: {describe(quality)}",
+            "timestamp": datetime.utcnow()
+        })
+
 @router.post("/receive")
-async def receive_data(data: SensorData, user=Depends(require_athlete)):
+async def receive_data(
+    data: SensorData,
+    user=Depends(require_athlete),
+    device_id: Optional[str] = Header(None, alias="X-Device-Id"),
+):
     input_data = data.dict()
 
-    for key, value in input_data.items():
-        if value is None or value <= 0:
-            await db.sensor_warnings.insert_one({
-                "user": user["username"],
-                "missing_field": key,
-                "received_data": input_data,
-                "timestamp": datetime.utcnow()
-            })
-            await db.alerts.insert_one({
-                "athlete_id": user["username"],
-                "alert_type": "SensorWarning",
-                "description": f"Missing or invalid value: {key}",
-                "timestamp": datetime.utcnow()
-            })
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "message": f"Invalid or missing value for: {key}",
-                    "received": input_data
-                }
-            )
+    # 📡 Every field checked at once; warnings aggregated per device window
+    fields = list(input_data)
+    quality = summarize(assess([[input_data[f] for f in fields]], fields), fields)
+    if quality["rejected"]:
+        await warn_sensor_quality(user, device_id or "default", quality, input_data)
+        key = next(iter(quality["flags"]))
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": f"Invalid or missing value for: {key}",
+                "received": input_data
+            }
+        )
 
     prediction, combined = predict_hydration(input_data)
-    hydration_label = HYDRATION_LABELS.get(prediction, "Unknown")
-
-    await save_prediction(input_data, user, hydration_label, combined)
-
-    if combined < 70:
-        alert_type = "DEHYDRATED"
-        title = "Critical Hydration Alert"
-        description = f"Dehydrated at {round(combined)}%"
-    elif combined < 85:
-        alert_type = "SLIGHTLY DEHYDRATED"
-        title = "Hydration Dropped"
-        description = f"Hydration dropped to {round(combined)}%"
-    else:
-        alert_type = "HYDRATED"
-        title = "Hydration OK"
-        description = f"Hydrated at {round(combined)}%"
-
-    await db.alerts.insert_one({
-        "athlete_id": user["username"],
-        "alert_type": alert_type,
-        "title": title,
-        "description": description,
-        "timestamp": datetime.utcnow()
-    })
+    hydration_label = label_for_prediction(prediction)
+
+    # 🚨 Hydration alerts are raised (and deduplicated) inside save_prediction
+    spooled = await save_prediction(input_data, user, hydration_label, combined)
 
     return {
         "status": "success",
         "hydration_state_prediction": hydration_label,
         "processed_combined_metrics": combined,
-        "raw_sensor_data": input_data
+        "raw_sensor_data": input_data,
+        "spooled": spooled,
+        **recommend_sampling(user["email"], hydration_label, ingest_load())
     }
 
 # async def save_prediction(input_data: dict, user: dict, label: str, combined: float):
@@ -121,16 +131,18 @@ async def receive_data(data: SensorData, user=Depends(require_athlete)):
 #     )
 
 @router.post("/raw-schema")
-async def receive_raw_schema(data: RawSensorInput, user=Depends(require_athlete)):
-    record = await db.predictions.find_one({"user": user["username"]}, sort=[("timestamp", -1)])
+async def receive_raw_schema(data: RawSensorInput, user=Depends(require_athlete), repos: Repositories = Depends(get_repos)):
+    record = await repos.predictions.find_one({"user": user["username"]}, sort=[("timestamp", -1)])
     if record and "_id" in record:
         record["_id"] = str(record["_id"])
     return record or {"hydration_status": "Unknown"}
 
 @router.get("/hydration/status")
-async def get_latest_hydration(user=Depends(require_athlete)):
-    prediction = await db.predictions.find_one({"user": user["email"]}, sort=[("timestamp", -1)])
-    vitals = await db.sensor_data.find_one({"user": user["email"]}, sort=[("timestamp", -1)])
+async def get_latest_hydration(user=Depends(require_athlete), repos: Repositories = Depends(get_repos)):
+    prediction = await repos.predictions.find_one(
+        {"user": user["email"]}, {"hydration_status": 1, "hydration_percent": 1}, sort=[("timestamp", -1)]
+    )
+    vitals = await repos.sensor_data.find_one({"user": user["email"]}, VITALS_PROJECTION, sort=[("timestamp", -1)])
 
     if not prediction or not vitals:
         raise HTTPException(status_code=404, detail="No hydration data found")
@@ -146,27 +158,43 @@ async def get_latest_hydration(user=Depends(require_athlete)):
     }
 
 @router.get("/warnings/prediction")
-async def get_prediction_warnings(sensor: str = Query(None), user=Depends(require_athlete)):
-    cursor = db.predictions.find({"user": user["username"]}).sort("timestamp", -1)
-    logs = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        logs.append(doc)
-    return logs
+async def get_prediction_warnings(sensor: str = Query(None), fields: Optional[str] = Query(None), user=Depends(require_athlete), repos: Repositories = Depends(get_repos)):
+    projection = build_projection(fields, PREDICTION_FIELDS, PREDICTION_PROJECTION)
+    cursor = repos.predictions.find({"user": user["username"]}, projection).sort("timestamp", -1)
+    return stream_json_array(cursor)
 
 
 @router.get("/warnings/sensor")
-async def get_sensor_warnings(sensor: str = Query(None), user=Depends(get_current_user)):
+async def get_sensor_warnings(sensor: str = Query(None), fields: Optional[str] = Query(None), user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
     query = {"user": user["username"]}
     if sensor:
         query["missing_field"] = sensor
 
-    cursor = db.sensor_warnings.find(query).sort("timestamp", -1)
-    warnings = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        warnings.append(doc)
-    return warnings
+    # `received_data` is only sent when asked for via fields=
+    projection = build_projection(fields, SENSOR_WARNING_FIELDS, SENSOR_WARNING_PROJECTION)
+    cursor = repos.sensor_warnings.find(query, projection).sort("timestamp", -1)
+    return stream_json_array(cursor)
+
+
+@router.get("/history")
+async def get_history(
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    resolution: Literal["auto", "raw", "1m", "15m", "1h"] = Query("auto"),
+    points: Optional[int] = Query(None, ge=3, le=5000),
+    user=Depends(require_athlete)
+):
+    """
+    Vitals + hydration series for charts. Defaults to the last 2 hours;
+    `points` LTTB-downsamples each series to at most that many points.
+    """
+    try:
+        start, end = history_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    history = await read_history(user["email"], start, end, resolution, points)
+    return BSONJSONResponse(history)
 
 
 @router.get("/time")
@@ -179,41 +207,69 @@ async def ping():
     return {"status": "alive"}
 
 
+@router.get("/ingest/status")
+async def get_ingest_status():
+    # 💾 Write-behind queue + spool depth / replay rate
+    return ingest_status()
+
+
 # @router.get("/alerts")
 # async def get_athlete_alerts(user=Depends(require_athlete)):
 #     alerts = db.alerts.find({"athlete_id": user["username"]})
 #     return [doc async for doc in alerts]
 
 
-def map_label_to_percentage(label: str) -> int:
-    if label == "Hydrated":
-        return 90
-    elif label == "Slightly Dehydrated":
-        return 75
-    elif label == "Dehydrated":
-        return 65
-    return 0
+def ingested_response(previous: dict, clean_data: dict, user: dict) -> dict:
+    return {
+        "status": "success",
+        "hydration_state_prediction": previous["hydration_status"],
+        "processed_combined_metrics": previous.get("combined_metrics"),
+        "raw_sensor_data": clean_data,
+        "spooled": False,
+        "duplicate": True,
+        **recommend_sampling(user["email"], previous["hydration_status"], ingest_load())
+    }
 
-async def save_prediction(input_data: dict, user: dict, label: str, combined: float):
-    hydration_percent = map_label_to_percentage(label)
+async def save_prediction(
+    input_data: dict, user: dict, label: str, combined: float, key: Optional[str] = None
+) -> bool:
+    """
+    Returns True if the reading was spooled locally because MongoDB is down.
+    Raises DuplicateKeyError if a reading with the same ingest `key` exists.
+    """
+    repos = get_repositories()
+    hydration_percent = percent_for_label(label)
     timestamp = datetime.now(timezone.utc)  # ✅ Native datetime object
 
-    await db.sensor_data.insert_one({
+    # 🔑 _ids assigned up front so a spool replay can't duplicate these
+    sensor_doc = {
+        "_id": ObjectId(),
         "user": user["email"],
         **input_data,
         "combined_metrics": combined,
         "hydration_level": hydration_percent,
         "timestamp": timestamp
-    })
-
-    await db.predictions.insert_one({
+    }
+    prediction_doc = {
+        "_id": ObjectId(),
         "user": user["email"],
         "hydration_status": label,
         "hydration_percent": hydration_percent,
+        "combined_metrics": combined,
         "timestamp": timestamp
-    })
+    }
+    if key:
+        sensor_doc["ingest_key"] = prediction_doc["ingest_key"] = key
+
+    # 📝 Raw row may be written behind; predictions/alerts below stay synchronous
+    if await write_reading(sensor_doc, prediction_doc):
+        # 💾 Spooled: derived state catches up with the next live reading
+        return True
 
-    await db.users.update_one(
+    # 📈 1m / 15m / 1h rollups for the history charts
+    await update_rollups(user["email"], {**input_data, "hydration_level": hydration_percent}, label, timestamp)
+
+    await repos.users.update_one(
         {"username": user["username"]},
         {"$set": {
             "profile.latest_prediction": {
@@ -225,19 +281,33 @@ async def save_prediction(input_data: dict, user: dict, label: str, combined: fl
         }}
     )
 
-    await db.athletes.update_one(
+    # Server-derived level / status win over the client's own hydration_level
+    # (SensorData carries one): the state cache and coach_stats deltas below
+    # must see exactly what was written
+    written = {"hydration_level": hydration_percent, "status": label}
+    before = await repos.athletes.find_one_and_update(
         {"email": user["email"]},
-        {"$set": {
-            "hydration_level": hydration_percent,
-            "status": label,
-            **input_data
-        }}
+        {"$set": {**input_data, **written}},
+        projection={"hydration_level": 1, "status": 1, "assigned_by": 1},
+        return_document=ReturnDocument.BEFORE
     )
+    previous_level = None
+    if before:
+        # 🧠 Remember status + coach so alerting needs no athletes lookup
+        previous_level = athlete_state.record_write(user["email"], before, written)
+        await record_athlete_change(before.get("assigned_by"), before, written)
+        # 🗃 Latest vitals changed -> coach's cached athlete list is stale
+        await bump_coach_version(before.get("assigned_by"), "athletes")
 
-    await insert_prediction_alert(user, label, hydration_percent)
+    await insert_prediction_alert(user, label, hydration_percent, previous_level=previous_level)
+    return False
 
 @router.post("/raw-receive")
-async def raw_receive(data: RawSensorInput, user=Depends(require_athlete)):
+async def raw_receive(
+    data: RawSensorInput,
+    user=Depends(require_athlete),
+    device_id: Optional[str] = Header(None, alias="X-Device-Id"),
+):
     """
     Accepts raw sensor input and performs:
     1. Preprocessing (normalization)
@@ -245,42 +315,73 @@ async def raw_receive(data: RawSensorInput, user=Depends(require_athlete)):
     3. Save prediction + vitals
     4. Return hydration status
     """
+    # ✅ FIX HERE: Make sure input is a dict, not a list
+    input_dict = data.model_dump()  # use `model_dump()` instead of `dict()` (pydantic v2+)
+    window = input_dict.pop("ad8232_window", None)
+    ecg_hz = input_dict.pop("ecg_hz", None)
+    device = device_id or "default"
+
+    # 💓 ECG window -> R-peaks / HRV; its median stands in for the single sample
+    ecg = None
+    if window is not None:
+        try:
+            ecg = ecg_stage.process(f"{user['email']}:{device}", decode_window(window), ecg_hz, data.time)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        input_dict["ad8232"] = ecg["ad8232"]
+
+    # 📡 Range / flatline / spike / dropout over this device's recent window; a
+    # window's median holds steady by design, the ECG stage checks it for flat
+    flatline_channels = [c for c in FLATLINE_CHANNELS if not (ecg and c == "ad8232")]
+    quality = sensor_quality.check(
+        f"{user['email']}:{device}", raw_channels(input_dict), data.time, flatline_channels=flatline_channels
+    )
+    if (merged_flags(quality) or quality["dropout"]) and not quality.get("repeat"):
+        await warn_sensor_quality(user, device, quality, input_dict)
+
     try:
-        # ✅ FIX HERE: Make sure input is a dict, not a list
-        input_dict = data.model_dump()  # use `model_dump()` instead of `dict()` (pydantic v2+)
         clean_data = extract_features_from_row(input_dict)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if quality["rejected"] and SENSOR_REJECT_ARTIFACTS:
+        raise HTTPException(status_code=400, detail=f"Sensor artifact rejected: {describe(quality)}")
+    if ecg:
+        if ecg["ecg_quality"] in ("flat", "lead_off") and SENSOR_REJECT_ARTIFACTS:
+            raise HTTPException(status_code=400, detail=f"Sensor artifact rejected: ad8232 {ecg['ecg_quality']}")
+        clean_data.update({k: v for k, v in ecg.items() if k.startswith("ecg_")})
+
+    # 🔁 Wristband retry of a reading we already have: answer from the stored prediction
+    key = ingest_key(user, data.time)
+    previous = await find_ingested(key)
+    if previous:
+        return ingested_response(previous, clean_data, user)
 
     prediction, combined = predict_hydration(clean_data)
     print("PREDICTION:", prediction, type(prediction))
 
-    HYDRATION_LABELS = {
-    0: "Hydrated",
-    1: "Slightly Dehydrated",
-    2: "Dehydrated"
-    }
-    
-    # hydration_label = HYDRATION_LABELS.get(prediction, "Unknown")
-
-    # try:
-    #     hydration_label = HYDRATION_LABELS[prediction] 
-    # except Exception: 
-    #     hydration_label = "Unknown"
-
-    try:
-        # hydration_label = HYDRATION_LABELS[int(prediction)]
-        hydration_label = prediction
-    except (ValueError, KeyError, TypeError):
-        hydration_label = "Unknown"
+    # 🏷 Class index or label from the model -> label ("Unknown" otherwise)
+    hydration_label = label_for_prediction(prediction)
 
     print("MAPPED:", hydration_label)
 
-    await save_prediction(clean_data, user, hydration_label, combined)
+    try:
+        spooled = await save_prediction(clean_data, user, hydration_label, combined, key)
+    except DuplicateKeyError:
+        # Retry raced the original, or this worker hadn't seen the key yet
+        previous = await find_ingested(key, confirm_only=True)
+        if previous:
+            return ingested_response(previous, clean_data, user)
+        raise
+    if key:
+        recent_keys.add(key)
 
     return {
         "status": "success",
         "hydration_state_prediction": hydration_label,
         "processed_combined_metrics": combined,
-        "raw_sensor_data": clean_data
+        "raw_sensor_data": clean_data,
+        "spooled": spooled,
+        "duplicate": False,
+        # 📶 Back off while the state holds, speed up on a transition
+        **recommend_sampling(user["email"], hydration_label, ingest_load())
     }
\ No newline at end of file
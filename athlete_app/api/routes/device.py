@@ -1,30 +1,30 @@
 from fastapi import APIRouter, Depends
 from datetime import datetime, timedelta
-from athlete_app.core.config import db
+from shared.repositories import Repositories, get_repos
 from athlete_app.api.deps import get_current_user
 
 router = APIRouter()
 
 @router.get("/device/pairing-status")
-async def check_pairing_status(user=Depends(get_current_user)):
+async def check_pairing_status(user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
     one_minute_ago = datetime.utcnow() - timedelta(seconds=60)
-    recent = await db.sensor_data.find_one({
+    recent = await repos.sensor_data.find_one({
         "user": user["username"],
         "timestamp": {"$gte": one_minute_ago}
-    })
+    }, {"timestamp": 1})
 
     return {
         "paired": bool(recent),
         "last_received": recent["timestamp"] if recent else None
     }
 @router.get("/device/status")
-async def device_status(user=Depends(get_current_user)):
+async def device_status(user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
     # For UI compatibility: WiFi, Wristband, Battery
     one_minute_ago = datetime.utcnow() - timedelta(seconds=60)
-    recent = await db.sensor_data.find_one({
+    recent = await repos.sensor_data.find_one({
         "user": user["username"],
         "timestamp": {"$gte": one_minute_ago}
-    })
+    }, {"timestamp": 1})
 
     return {
         "wifi": "Off",  # Placeholder logic
@@ -1,11 +1,16 @@
 # athlete_app/api/routes/session.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
 from bson import ObjectId
 from athlete_app.api.deps import get_current_user, require_athlete
-from athlete_app.core.config import db
+from shared.repositories import Repositories, get_repos
 from pydantic import BaseModel
 from typing import Optional
+from shared.projections import (
+    build_projection, SESSION_FIELDS, SESSION_SUMMARY_PROJECTION, SENSOR_SNAPSHOT_PROJECTION
+)
+from shared.responses import BSONJSONResponse, stream_json_array
+from athlete_app.services.session_summary import compute_session_summary
 
 router = APIRouter()
 
@@ -15,10 +20,16 @@ class SessionMetadata(BaseModel):
     description: Optional[str] = None
 
 @router.post("/session/start")
-async def start_session(user=Depends(get_current_user)):
+async def start_session(user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
     now = datetime.utcnow()
-    sensor = await db.sensor_data.find_one({"user": user["username"]}, sort=[("timestamp", -1)])
-    prediction = await db.predictions.find_one({"user": user["username"]}, sort=[("timestamp", -1)])
+    # 📉 Compact vitals snapshot instead of the whole sensor_data document
+    # (sensor_data / predictions are keyed by email, see data.save_prediction)
+    sensor = await repos.sensor_data.find_one(
+        {"user": user["email"]}, SENSOR_SNAPSHOT_PROJECTION, sort=[("timestamp", -1)]
+    )
+    prediction = await repos.predictions.find_one(
+        {"user": user["email"]}, {"hydration_status": 1}, sort=[("timestamp", -1)]
+    )
 
     session = {
         "user": user["username"],
@@ -27,18 +38,26 @@ async def start_session(user=Depends(get_current_user)):
         "hydration_start": prediction.get("hydration_status") if prediction else None,
         "active": True
     }
-    result = await db.sessions.insert_one(session)
+    result = await repos.sessions.insert_one(session)
     return {"message": "Session started", "session_id": str(result.inserted_id)}
 
 @router.post("/session/end")
-async def end_session(meta: SessionMetadata, user=Depends(get_current_user)):
-    session = await db.sessions.find_one({"user": user["username"], "active": True}, sort=[("start_time", -1)])
+async def end_session(meta: SessionMetadata, user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
+    session = await repos.sessions.find_one(
+        {"user": user["username"], "active": True}, {"start_time": 1}, sort=[("start_time", -1)]
+    )
     if not session:
         raise HTTPException(status_code=404, detail="No active session found")
 
     now = datetime.utcnow()
-    sensor = await db.sensor_data.find_one({"user": user["username"]}, sort=[("timestamp", -1)])
-    prediction = await db.predictions.find_one({"user": user["username"]}, sort=[("timestamp", -1)])
+    # 📉 Compact vitals snapshot instead of the whole sensor_data document
+    # (sensor_data / predictions are keyed by email, see data.save_prediction)
+    sensor = await repos.sensor_data.find_one(
+        {"user": user["email"]}, SENSOR_SNAPSHOT_PROJECTION, sort=[("timestamp", -1)]
+    )
+    prediction = await repos.predictions.find_one(
+        {"user": user["email"]}, {"hydration_status": 1}, sort=[("timestamp", -1)]
+    )
 
     update_fields = {
         "end_time": now,
@@ -46,10 +65,11 @@ async def end_session(meta: SessionMetadata, user=Depends(get_current_user)):
         "hydration_end": prediction.get("hydration_status") if prediction else None,
         "duration": (now - session["start_time"]).total_seconds(),
         "metadata": meta.dict(),
+        "summary": await compute_session_summary(user, session["start_time"], now),
         "active": False
     }
-    await db.sessions.update_one({"_id": session["_id"]}, {"$set": update_fields})
-    await db.alerts.insert_one({
+    await repos.sessions.update_one({"_id": session["_id"]}, {"$set": update_fields})
+    await repos.alerts.insert_one({
         "athlete_id": user["username"],
         "alert_type": "ActivitySummary",
         "description": f"New activity: {meta.title}",
@@ -58,18 +78,16 @@ async def end_session(meta: SessionMetadata, user=Depends(get_current_user)):
     return {"message": "Session ended and saved"}
 
 @router.get("/session/logs")
-async def get_session_logs(user=Depends(get_current_user)):
-    sessions = db.sessions.find({"user": user["username"]}, sort=[("start_time", -1)])
-    results = []
-    async for s in sessions:
-        s["_id"] = str(s["_id"])
-        results.append(s)
-    return results
+async def get_session_logs(fields: Optional[str] = Query(None), user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
+    # Summary variant by default; `fields=sensor_start,sensor_end` opts back in
+    projection = build_projection(fields, SESSION_FIELDS, SESSION_SUMMARY_PROJECTION)
+    sessions = repos.sessions.find({"user": user["username"]}, projection, sort=[("start_time", -1)])
+    return stream_json_array(sessions)
 
 @router.get("/session/{session_id}")
-async def get_session_detail(session_id: str, user=Depends(require_athlete)):
-    session = await db.sessions.find_one({"_id": ObjectId(session_id), "user": user["username"]})
+async def get_session_detail(session_id: str, fields: Optional[str] = Query(None), user=Depends(require_athlete), repos: Repositories = Depends(get_repos)):
+    projection = build_projection(fields, SESSION_FIELDS, None)
+    session = await repos.sessions.find_one({"_id": ObjectId(session_id), "user": user["username"]}, projection)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    session["_id"] = str(session["_id"])
-    return session
+    return BSONJSONResponse(session)
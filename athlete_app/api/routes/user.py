@@ -3,27 +3,31 @@ from fastapi import APIRouter, HTTPException, Depends
 from athlete_app.models.schemas import PasswordChange
 from athlete_app.api.deps import get_current_user
 from athlete_app.models.schemas import AthleteJoinCoachSchema
-from shared.database import db
+from shared.repositories import Repositories, get_repos
+from shared.roster import invalidate_coach_roster
+from shared.athlete_state import athlete_state
+from shared.coach_stats import record_athlete_change
+from shared.response_cache import bump_coach_version
 from shared.security import verify_password
 import uuid
 
 router = APIRouter()
 
 @router.post("/password")
-async def change_password(data: PasswordChange, user=Depends(get_current_user)):
+async def change_password(data: PasswordChange, user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
     if not verify_password(data.current_password, user["password"]):
         raise HTTPException(status_code=403, detail="Incorrect current password")
-    await db.users.update_one({"username": user["username"]}, {"$set": {"password": data.new_password}})
+    await repos.users.update_one({"username": user["username"]}, {"$set": {"password": data.new_password}})
     return {"message": "Password changed"}
 
 @router.delete("/delete")
-async def delete_account(user=Depends(get_current_user)):
-    await db.users.delete_one({"username": user["username"]})
+async def delete_account(user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
+    await repos.users.delete_one({"username": user["username"]})
     return {"message": "Account deleted"}
 
 @router.post("/athlete/join")
-async def join_coach(data: AthleteJoinCoachSchema, user=Depends(get_current_user)):
-    coach = await db["users"].find_one({
+async def join_coach(data: AthleteJoinCoachSchema, user=Depends(get_current_user), repos: Repositories = Depends(get_repos)):
+    coach = await repos.users.find_one({
         "name": data.coach_name.strip(),
         "role": "coach"
     })
@@ -31,7 +35,7 @@ async def join_coach(data: AthleteJoinCoachSchema, user=Depends(get_current_user
     if not coach:
         raise HTTPException(status_code=400, detail="Coach not found")
 
-    existing = await db.athletes.find_one({"email": user["email"]})
+    existing = await repos.athletes.find_one({"email": user["email"]})
     if existing:
         return {"message": "Athlete already linked to a coach"}
 
@@ -51,5 +55,9 @@ async def join_coach(data: AthleteJoinCoachSchema, user=Depends(get_current_user
         "status": "Hydrated",
         "assigned_by": coach["email"]
     }
-    await db.athletes.insert_one(athlete_entry)
+    await repos.athletes.insert_one(athlete_entry)
+    invalidate_coach_roster(coach["email"])
+    athlete_state.forget(user["email"])
+    await bump_coach_version(coach["email"])
+    await record_athlete_change(coach["email"], None, athlete_entry)
     return {"message": "Coach linked successfully"}
\ No newline at end of file
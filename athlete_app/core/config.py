@@ -3,8 +3,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConfigurationError
 
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "hydration_db")
@@ -12,16 +10,69 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# 🚨 Alert engine tuning
+ALERT_REMINDER_MINUTES = float(os.getenv("ALERT_REMINDER_MINUTES", "15"))
+ALERT_HYSTERESIS = float(os.getenv("ALERT_HYSTERESIS", "3"))
+ALERT_COOLDOWN_SECONDS = {
+    "DEHYDRATED": float(os.getenv("ALERT_COOLDOWN_DEHYDRATED", "120")),
+    "SLIGHTLY DEHYDRATED": float(os.getenv("ALERT_COOLDOWN_SLIGHTLY_DEHYDRATED", "300")),
+    "HYDRATED": float(os.getenv("ALERT_COOLDOWN_HYDRATED", "300")),
+    "SensorWarning": float(os.getenv("ALERT_COOLDOWN_SENSOR_WARNING", "300")),
+}
+ALERT_STATE_CAPACITY = int(os.getenv("ALERT_STATE_CAPACITY", "50000"))
 
-client = AsyncIOMotorClient(MONGO_URI)
-try:
-    client.admin.command("ping")
-except ConfigurationError as ce:
-    import logging
-    logging.error(f"MongoDB connection failed: {ce}")
-    raise
+# 📝 Write-behind for raw sensor_data rows
+SENSOR_WRITE_BEHIND = os.getenv("SENSOR_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+SENSOR_WRITE_BATCH = int(os.getenv("SENSOR_WRITE_BATCH", "500"))
+SENSOR_WRITE_FLUSH_MS = int(os.getenv("SENSOR_WRITE_FLUSH_MS", "500"))
+SENSOR_WRITE_QUEUE = int(os.getenv("SENSOR_WRITE_QUEUE", "10000"))
 
-db = client[DB_NAME]
+# 💾 Local spool for readings that can't reach MongoDB
+SPOOL_ENABLED = os.getenv("SPOOL_ENABLED", "true").lower() in ("1", "true", "yes")
+SPOOL_DIR = os.getenv("SPOOL_DIR", "/tmp/hydration-spool")
+SPOOL_MAX_MB = int(os.getenv("SPOOL_MAX_MB", "256"))
+SPOOL_REPLAY_SECONDS = float(os.getenv("SPOOL_REPLAY_SECONDS", "5"))
+SPOOL_REPLAY_BATCH = int(os.getenv("SPOOL_REPLAY_BATCH", "500"))
 
-def init_db():
-    return db
+# 🔁 Retry deduplication: recently ingested (athlete, device time) keys
+IDEMPOTENCY_FILTER_CAPACITY = int(os.getenv("IDEMPOTENCY_FILTER_CAPACITY", "100000"))
+IDEMPOTENCY_FILTER_ERROR_RATE = float(os.getenv("IDEMPOTENCY_FILTER_ERROR_RATE", "0.01"))
+
+# 📶 Recommended device sampling interval (seconds) in ingest replies
+SAMPLING_ENABLED = os.getenv("SAMPLING_ENABLED", "true").lower() in ("1", "true", "yes")
+SAMPLING_MIN_SECONDS = float(os.getenv("SAMPLING_MIN_SECONDS", "2"))
+SAMPLING_BASE_SECONDS = float(os.getenv("SAMPLING_BASE_SECONDS", "5"))
+SAMPLING_MAX_SECONDS = float(os.getenv("SAMPLING_MAX_SECONDS", "60"))
+SAMPLING_WATCH_MAX_SECONDS = float(os.getenv("SAMPLING_WATCH_MAX_SECONDS", "15"))
+SAMPLING_DOUBLING_SECONDS = float(os.getenv("SAMPLING_DOUBLING_SECONDS", "600"))
+SAMPLING_LOAD_GAIN = float(os.getenv("SAMPLING_LOAD_GAIN", "2"))
+SAMPLING_STATE_CAPACITY = int(os.getenv("SAMPLING_STATE_CAPACITY", "50000"))
+
+# 📡 Sensor quality stage (flatline / spike / dropout over a per-device window)
+SENSOR_QUALITY_WINDOW = int(os.getenv("SENSOR_QUALITY_WINDOW", "30"))
+SENSOR_FLATLINE_SAMPLES = int(os.getenv("SENSOR_FLATLINE_SAMPLES", "10"))
+SENSOR_FLATLINE_SECONDS = float(os.getenv("SENSOR_FLATLINE_SECONDS", "60"))
+SENSOR_SPIKE_Z = float(os.getenv("SENSOR_SPIKE_Z", "6"))
+SENSOR_SPIKE_MIN_SAMPLES = int(os.getenv("SENSOR_SPIKE_MIN_SAMPLES", "8"))
+SENSOR_DROPOUT_SECONDS = float(os.getenv("SENSOR_DROPOUT_SECONDS", "30"))
+SENSOR_WARNING_WINDOW_SECONDS = int(os.getenv("SENSOR_WARNING_WINDOW_SECONDS", "300"))
+# Opt-in: keep flatlined samples away from the model (warnings are always recorded)
+SENSOR_REJECT_ARTIFACTS = os.getenv("SENSOR_REJECT_ARTIFACTS", "false").lower() in ("1", "true", "yes")
+SENSOR_QUALITY_CAPACITY = int(os.getenv("SENSOR_QUALITY_CAPACITY", "50000"))
+
+# 💓 ECG window stage (ad8232_window payloads)
+ECG_SAMPLE_HZ = float(os.getenv("ECG_SAMPLE_HZ", "250"))
+ECG_BAND_LOW_HZ = float(os.getenv("ECG_BAND_LOW_HZ", "5"))
+ECG_BAND_HIGH_HZ = float(os.getenv("ECG_BAND_HIGH_HZ", "15"))
+ECG_REFRACTORY_MS = float(os.getenv("ECG_REFRACTORY_MS", "250"))
+ECG_MIN_WINDOW_SECONDS = float(os.getenv("ECG_MIN_WINDOW_SECONDS", "2"))
+ECG_MAX_WINDOW_SAMPLES = int(os.getenv("ECG_MAX_WINDOW_SAMPLES", "5000"))
+ECG_RR_HISTORY = int(os.getenv("ECG_RR_HISTORY", "64"))
+ECG_STATE_CAPACITY = int(os.getenv("ECG_STATE_CAPACITY", "50000"))
+
+# 🔥 Model warm-up at startup: "background" (serve while it loads), "blocking"
+# (first request never waits on unpickling) or "off" (load on first prediction)
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "background").lower()
+
+# 🔌 The MongoDB client lives in shared.database and is opened in the app
+# lifespan (see main.py), not at import time
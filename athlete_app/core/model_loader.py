@@ -1,8 +1,9 @@
+import logging
 import os
 import pickle
-import pandas as pd
-from pathlib import Path
-from sklearn.preprocessing import StandardScaler
+
+# ⏱ pandas / scikit-learn are only imported when the model is first loaded
+# (unpickling pulls sklearn in), so importing the app stays cheap.
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.normpath(os.path.join(BASE_DIR, '..', 'model', 'hydration_model.pkl'))
@@ -42,8 +43,20 @@ def get_scaler():
 def get_train_df():
     global _train_df
     if _train_df is None:
+        import pandas as pd
         _train_df = pd.read_csv(TRAIN_PATH)
     return _train_df
 
+def warm_model() -> bool:
+    """Load model + scaler ahead of the first prediction (blocking; run in a thread)."""
+    try:
+        get_model()
+        get_scaler()
+        import pandas  # noqa: F401  (predict_hydration builds a DataFrame)
+        return True
+    except FileNotFoundError as e:
+        logging.getLogger(__name__).error(f"Model warm-up skipped: {e}")
+        return False
+
 print("📦 MODEL_PATH:", os.path.abspath(MODEL_PATH))
 print("📦 SCALER_PATH:", os.path.abspath(SCALER_PATH))
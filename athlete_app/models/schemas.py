@@ -1,7 +1,7 @@
 # athlete-app/models/schemas.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from pydantic.config import ConfigDict
-from typing import Optional, Literal, Dict
+from typing import Optional, Literal, Dict, List, Union
 from datetime import datetime
 from enum import Enum
 from typing import Optional
@@ -102,9 +102,18 @@ class RawSensorInput(BaseModel):
     max30105: Dict[str, float]  # {"bpm": 72, "ir": 25279}
     gy906: float                # body temperature
     groveGsr: float             # skin conductance
-    ad8232: int                 # ECG raw value
+    ad8232: Optional[int] = None  # ECG raw value (or send ad8232_window)
+    # ECG window: raw samples, or base64 of little-endian uint16 samples
+    ad8232_window: Optional[Union[List[int], str]] = None
+    ecg_hz: Optional[float] = Field(None, gt=0, le=2000)  # sample rate of ad8232_window
     analog_calibration_pin: Optional[int] = None
-    time: Optional[int] = None  # Unix timestamp
+    time: Optional[int] = None  # Unix timestamp (end of the ECG window)
+
+    @model_validator(mode="after")
+    def require_ecg(self):
+        if self.ad8232 is None and self.ad8232_window is None:
+            raise ValueError("ad8232 or ad8232_window is required")
+        return self
 
     model_config = ConfigDict(
         json_schema_extra={
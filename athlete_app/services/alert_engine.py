@@ -0,0 +1,126 @@
+# athlete_app/services/alert_engine.py
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from athlete_app.core.config import ALERT_STATE_CAPACITY
+from shared.hydration import ALERT_TEMPLATES, STATUS_KEYS, status_key as get_status_label, status_rank
+
+# Lower rank = better hydrated
+STATUS_RANK = {key: status_rank(key) for key in STATUS_KEYS}
+
+STATUS_ALERT_TYPES = {key: template["type"] for key, template in ALERT_TEMPLATES.items()}
+
+
+class AlertEngine:
+    """
+    Decides when a hydration reading is worth an alert document.
+
+    Keeps the last known status per athlete in memory and only lets an alert
+    through on a status transition, or as a reminder once `reminder_interval`
+    has passed without one. Recovering to a better status requires the level
+    to clear the threshold by `hysteresis` points, so readings hovering around
+    a cutoff don't flap. Each alert type also has a cooldown so a flapping
+    athlete can't re-trigger the same alert back to back; a change for the
+    worse always goes through. At most `capacity` athletes are tracked; the
+    least recently seen is forgotten first and starts over as a new athlete.
+    """
+
+    def __init__(
+        self,
+        reminder_interval: timedelta,
+        cooldowns: Optional[Dict[str, timedelta]] = None,
+        hysteresis: float = 0.0,
+        capacity: int = ALERT_STATE_CAPACITY,
+    ):
+        self.reminder_interval = reminder_interval
+        self.cooldowns = cooldowns or {}
+        self.hysteresis = hysteresis
+        self.capacity = capacity
+        self._state: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _classify(self, hydration_level: float, previous: Optional[str]) -> str:
+        status = get_status_label(hydration_level)
+        if previous is None or STATUS_RANK[status] >= STATUS_RANK[previous]:
+            return status
+
+        # Improving: only step up as far as the level clears with the margin
+        damped = get_status_label(hydration_level - self.hysteresis)
+        if STATUS_RANK[damped] < STATUS_RANK[previous]:
+            return damped
+        return previous
+
+    def _cooling_down(self, state: dict, alert_type: str, now: datetime) -> bool:
+        last_sent = state["sent"].get(alert_type)
+        cooldown = self.cooldowns.get(alert_type)
+        return bool(last_sent and cooldown and now - last_sent < cooldown)
+
+    def _athlete_state(self, athlete_id: str) -> dict:
+        state = self._state.get(athlete_id)
+        if state is None:
+            state = self._state[athlete_id] = {"status": None, "sent": {}}
+            if len(self._state) > self.capacity:
+                self._state.popitem(last=False)
+        else:
+            self._state.move_to_end(athlete_id)
+        return state
+
+    def evaluate(self, athlete_id: str, hydration_level: float, now: Optional[datetime] = None) -> Optional[dict]:
+        """
+        Feed one reading through the engine.
+
+        Returns None when no alert should be written, otherwise a dict with
+        `status`, `previous_status`, `alert_type` and `status_change`.
+        """
+        now = now or datetime.now(timezone.utc)
+        state = self._athlete_state(athlete_id)
+        previous = state["status"]
+        status = self._classify(hydration_level, previous)
+        state["status"] = status
+
+        alert_type = STATUS_ALERT_TYPES[status]
+        is_changed = status != previous
+
+        if status == "hydrated":
+            # Only a recovery from a dehydrated state is worth telling anyone about
+            if previous is None or not is_changed:
+                return None
+        elif not is_changed:
+            last_sent = state["sent"].get(alert_type)
+            if last_sent and now - last_sent < self.reminder_interval:
+                return None
+
+        worsened = is_changed and previous is not None and STATUS_RANK[status] > STATUS_RANK[previous]
+        if not worsened and self._cooling_down(state, alert_type, now):
+            return None
+
+        state["sent"][alert_type] = now
+        return {
+            "status": status,
+            "previous_status": previous,
+            "alert_type": alert_type,
+            "status_change": is_changed,
+        }
+
+    def allow(self, athlete_id: str, alert_type: str, now: Optional[datetime] = None) -> bool:
+        """Cooldown gate for alerts that aren't driven by hydration status (e.g. SensorWarning)."""
+        now = now or datetime.now(timezone.utc)
+        state = self._athlete_state(athlete_id)
+        if self._cooling_down(state, alert_type, now):
+            return False
+        state["sent"][alert_type] = now
+        return True
+
+    def sync(self, athlete_id: str, hydration_level: float):
+        """Adopt a status seen elsewhere (another worker, or before a restart)."""
+        self._athlete_state(athlete_id)["status"] = get_status_label(hydration_level)
+
+    def last_status(self, athlete_id: str) -> Optional[str]:
+        state = self._state.get(athlete_id)
+        return state["status"] if state else None
+
+    def reset(self, athlete_id: Optional[str] = None):
+        if athlete_id is None:
+            self._state.clear()
+        else:
+            self._state.pop(athlete_id, None)
@@ -0,0 +1,192 @@
+# athlete_app/services/ecg.py
+#
+# ECG window stage for wristbands that send a window of ad8232 samples
+# (`ad8232_window`, a JSON list or base64 little-endian uint16) instead of
+# one raw value per request.
+#
+# Per window, all in NumPy:
+#   1. FFT band-pass (ECG_BAND_LOW_HZ .. ECG_BAND_HIGH_HZ) to keep the QRS
+#      energy and drop baseline wander / mains / motion
+#   2. Pan-Tompkins style energy envelope (derivative, square, 150 ms moving
+#      average), local maxima above an adaptive threshold, refractory period
+#   3. R-peaks refined to the band-passed maximum; RR intervals, heart rate,
+#      SDNN and RMSSD
+#
+# Per device the stage keeps only the last R-peak time and the last
+# ECG_RR_HISTORY RR intervals (bounded, least recently seen devices dropped),
+# so an RR interval spanning two windows is still counted and HRV settles
+# over a minute or so of windows.
+#
+# The model was trained on sigmoid(one raw ad8232 value); the window's median
+# is a stable estimate of that same level, so `ecg_sigmoid` keeps its
+# meaning while the HRV features are stored alongside for later models.
+
+import base64
+import binascii
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Union
+import numpy as np
+from athlete_app.core.config import (
+    ECG_SAMPLE_HZ, ECG_BAND_LOW_HZ, ECG_BAND_HIGH_HZ, ECG_REFRACTORY_MS, ECG_MIN_WINDOW_SECONDS,
+    ECG_MAX_WINDOW_SAMPLES, ECG_RR_HISTORY, ECG_STATE_CAPACITY
+)
+from athlete_app.services.preprocess import sigmoid
+
+ADC_MAX = 4095
+# Plausible RR range (30 .. 200 bpm)
+RR_MIN_SECONDS = 0.3
+RR_MAX_SECONDS = 2.0
+# Peak-to-peak below this (ADC counts) is a flat trace, electrodes off skin
+FLAT_ADC = 20
+# Share of samples at the ADC rails that means leads off
+LEAD_OFF_FRACTION = 0.2
+
+
+def decode_window(payload: Union[List[int], str]) -> np.ndarray:
+    """JSON list or base64 little-endian uint16 -> float array; ValueError if unusable."""
+    if isinstance(payload, str):
+        try:
+            raw = base64.b64decode(payload, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("ad8232_window is not valid base64")
+        if len(raw) % 2:
+            raise ValueError("ad8232_window must hold 16-bit samples")
+        samples = np.frombuffer(raw, dtype="<u2").astype(float)
+    else:
+        samples = np.asarray(payload, dtype=float)
+    if samples.ndim != 1 or not len(samples):
+        raise ValueError("ad8232_window is empty")
+    if len(samples) > ECG_MAX_WINDOW_SAMPLES:
+        raise ValueError(f"ad8232_window exceeds {ECG_MAX_WINDOW_SAMPLES} samples")
+    return samples
+
+
+def bandpass(signal: np.ndarray, fs: float, low: float = ECG_BAND_LOW_HZ, high: float = ECG_BAND_HIGH_HZ) -> np.ndarray:
+    spectrum = np.fft.rfft(signal - signal.mean())
+    freqs = np.fft.rfftfreq(len(signal), 1.0 / fs)
+    spectrum[(freqs < low) | (freqs > high)] = 0
+    return np.fft.irfft(spectrum, len(signal))
+
+
+def detect_r_peaks(signal: np.ndarray, fs: float, refractory_ms: float = ECG_REFRACTORY_MS) -> np.ndarray:
+    """Sample indices of R-peaks in a raw ECG window."""
+    filtered = bandpass(signal, fs)
+    energy = np.gradient(filtered) ** 2
+    width = max(int(0.15 * fs), 1)
+    envelope = np.convolve(energy, np.ones(width) / width, mode="same")
+
+    threshold = 0.3 * np.percentile(envelope, 99)
+    if threshold <= 0:
+        return np.array([], dtype=int)
+    middle = envelope[1:-1]
+    candidates = np.flatnonzero((middle > envelope[:-2]) & (middle >= envelope[2:]) & (middle > threshold)) + 1
+
+    # Refractory period: of two candidates closer than that, keep the stronger
+    refractory = int(refractory_ms * fs / 1000)
+    kept: List[int] = []
+    for idx in candidates:
+        if kept and idx - kept[-1] < refractory:
+            if envelope[idx] > envelope[kept[-1]]:
+                kept[-1] = idx
+            continue
+        kept.append(idx)
+
+    # R-peak = largest band-passed deflection near the envelope maximum
+    half = width // 2 + 1
+    peaks = [
+        max(i - half, 0) + int(np.argmax(np.abs(filtered[max(i - half, 0):i + half])))
+        for i in kept
+    ]
+    return np.unique(np.array(peaks, dtype=int))
+
+
+def hrv(rr: np.ndarray) -> Dict[str, Optional[float]]:
+    """Heart rate (bpm), SDNN and RMSSD (ms) from RR intervals in seconds."""
+    if len(rr) < 2:
+        return {"ecg_heart_rate": round(60 / rr[0], 1) if len(rr) else None, "ecg_sdnn_ms": None, "ecg_rmssd_ms": None}
+    return {
+        "ecg_heart_rate": round(float(60 / rr.mean()), 1),
+        "ecg_sdnn_ms": round(float(rr.std(ddof=1) * 1000), 1),
+        "ecg_rmssd_ms": round(float(np.sqrt(np.mean(np.diff(rr) ** 2)) * 1000), 1),
+    }
+
+
+class EcgStage:
+    def __init__(self, fs: float = ECG_SAMPLE_HZ, rr_history: int = ECG_RR_HISTORY, capacity: int = ECG_STATE_CAPACITY):
+        self.fs = fs
+        self.rr_history = rr_history
+        self.capacity = capacity
+        # device -> {"end": window end time, "last_peak": time, "rr": deque, "features": last result}
+        self._states: "OrderedDict[str, dict]" = OrderedDict()
+        self.windows = 0
+
+    def _state(self, device: str) -> dict:
+        state = self._states.get(device)
+        if state is None:
+            state = self._states[device] = {"end": None, "last_peak": None, "rr": deque(maxlen=self.rr_history)}
+        self._states.move_to_end(device)
+        if len(self._states) > self.capacity:
+            self._states.popitem(last=False)
+        return state
+
+    def process(self, device: str, samples: np.ndarray, fs: Optional[float] = None, end: Optional[float] = None) -> Dict:
+        """
+        Features for one window whose last sample was taken at `end` (unix
+        seconds). Raises ValueError for windows too short to analyse.
+        """
+        fs = fs or self.fs
+        if len(samples) < ECG_MIN_WINDOW_SECONDS * fs:
+            raise ValueError(f"ad8232_window must cover at least {ECG_MIN_WINDOW_SECONDS:g}s at {fs:g} Hz")
+        end = time.time() if end is None else float(end)
+        state = self._state(device)
+        # Retried window: same answer, RR history untouched
+        if state["end"] == end:
+            return state["features"]
+
+        level = float(np.median(samples))
+        features = {
+            "ad8232": int(round(level)),
+            "ecg_sigmoid": sigmoid(level),
+            "ecg_r_peaks": 0,
+            "ecg_heart_rate": None,
+            "ecg_sdnn_ms": None,
+            "ecg_rmssd_ms": None,
+        }
+
+        railed = np.mean((samples <= 0) | (samples >= ADC_MAX))
+        if railed > LEAD_OFF_FRACTION:
+            quality = "lead_off"
+        elif np.ptp(samples) < FLAT_ADC:
+            quality = "flat"
+        else:
+            start = end - len(samples) / fs
+            detected = start + detect_r_peaks(samples, fs) / fs
+            features["ecg_r_peaks"] = len(detected)
+
+            # Previous window's last beat closes the RR interval across the boundary
+            peak_times = detected
+            if state["last_peak"] is not None and detected.size:
+                peak_times = np.concatenate(([state["last_peak"]], detected))
+            rr = np.diff(peak_times)
+            plausible = rr[(rr >= RR_MIN_SECONDS) & (rr <= RR_MAX_SECONDS)]
+            state["rr"].extend(plausible.tolist())
+            if detected.size:
+                state["last_peak"] = float(detected[-1])
+            features.update(hrv(np.array(state["rr"])))
+            quality = "good" if len(rr) and len(plausible) >= 0.8 * len(rr) else "noisy"
+
+        features["ecg_quality"] = quality
+        state["end"] = end
+        state["features"] = features
+        self.windows += 1
+        return features
+
+    def forget(self, device: str):
+        self._states.pop(device, None)
+
+    def stats(self) -> Dict:
+        return {"devices": len(self._states), "capacity": self.capacity, "windows": self.windows}
+
+
+ecg_stage = EcgStage()
@@ -1,7 +1,3 @@
 # athlete_app/services/hydration_map.py
 
-PERCENTAGE_MAP = {
-    "Hydrated": 90,
-    "Slightly Dehydrated": 75,
-    "Dehydrated": 60
-}
\ No newline at end of file
+from shared.hydration import PERCENT_BY_LABEL as PERCENTAGE_MAP
@@ -0,0 +1,251 @@
+# athlete_app/services/ingest.py
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+from pymongo.errors import ConnectionFailure
+from athlete_app.core.config import (
+    SENSOR_WRITE_BEHIND, SENSOR_WRITE_BATCH, SENSOR_WRITE_FLUSH_MS, SENSOR_WRITE_QUEUE,
+    SPOOL_ENABLED, SPOOL_DIR, SPOOL_MAX_MB, SPOOL_REPLAY_SECONDS, SPOOL_REPLAY_BATCH,
+    IDEMPOTENCY_FILTER_CAPACITY, IDEMPOTENCY_FILTER_ERROR_RATE
+)
+from shared.write_behind import WriteBehindBuffer
+from shared.repositories import get_repositories
+from shared.spool import Spool, SpoolFull, claim_orphaned_spools
+from shared.recent_keys import RecentKeysFilter
+
+logger = logging.getLogger(__name__)
+
+# 💾 Per-worker spool, opened in start_ingest_workers (after any fork)
+spool: Optional[Spool] = None
+_replay_task: Optional[asyncio.Task] = None
+
+# While the database is known to be down, skip straight to the spool instead
+# of waiting out a server selection timeout on every reading. One write per
+# DB_RETRY_SECONDS is still let through, so the worker recovers on its own
+# even when no replay loop is pinging (or the ping loop has stalled).
+#
+# db_is_down() is a plain check for reads, status, load and auth; only the
+# write path spends the retry through claim_db_retry().
+_db_down_since: Optional[float] = None
+_db_retry_at = 0.0
+DB_RETRY_SECONDS = SPOOL_REPLAY_SECONDS
+
+
+def db_is_down() -> bool:
+    return _db_down_since is not None
+
+
+def claim_db_retry() -> bool:
+    """Write path: True if the database should be tried for this write."""
+    global _db_retry_at
+    if _db_down_since is None:
+        return True
+    now = time.monotonic()
+    if now >= _db_retry_at:
+        _db_retry_at = now + DB_RETRY_SECONDS
+        return True
+    return False
+
+
+def mark_db_down():
+    global _db_down_since, _db_retry_at
+    now = time.monotonic()
+    if _db_down_since is None:
+        logger.error("MongoDB unavailable, spooling ingest locally")
+        _db_down_since = now
+    _db_retry_at = now + DB_RETRY_SECONDS
+
+
+def mark_db_up():
+    global _db_down_since
+    if _db_down_since is not None:
+        logger.info("MongoDB reachable again, replaying spool")
+    _db_down_since = None
+
+
+async def spool_docs(collection: str, docs: list) -> bool:
+    if spool is None or not spool.is_open:
+        return False
+    try:
+        spool.append(collection, docs)
+        return True
+    except SpoolFull as e:
+        logger.error(str(e))
+        return False
+
+
+async def _spool_sensor_batch(docs: list) -> bool:
+    return await spool_docs("sensor_data", docs)
+
+
+# Raw vitals history isn't needed to answer the request, so it's written behind
+sensor_writer = WriteBehindBuffer(
+    lambda: get_repositories().sensor_data,
+    max_batch=SENSOR_WRITE_BATCH,
+    flush_interval=SENSOR_WRITE_FLUSH_MS / 1000,
+    max_queue=SENSOR_WRITE_QUEUE,
+    enabled=SENSOR_WRITE_BEHIND,
+    fallback=_spool_sensor_batch if SPOOL_ENABLED else None,
+)
+
+
+# 🔁 Keys of readings this worker ingested recently; the unique ingest_key
+# indexes on sensor_data / predictions are the source of truth
+recent_keys = RecentKeysFilter(IDEMPOTENCY_FILTER_CAPACITY, IDEMPOTENCY_FILTER_ERROR_RATE)
+
+INGESTED_PROJECTION = {"_id": 0, "hydration_status": 1, "hydration_percent": 1, "combined_metrics": 1}
+
+
+def ingest_key(user: dict, device_time: Optional[int]) -> Optional[str]:
+    """Idempotency key for a device reading; None when the device sent no timestamp."""
+    if device_time is None:
+        return None
+    return f"{user['email']}:{int(device_time)}"
+
+
+async def find_ingested(key: Optional[str], confirm_only: bool = False) -> Optional[dict]:
+    """
+    Prediction stored for `key` if that reading was already ingested. Keys
+    the filter has never seen are answered without touching the database.
+    """
+    if key is None or db_is_down():
+        return None
+    if not confirm_only and key not in recent_keys:
+        return None
+    try:
+        previous = await get_repositories().predictions.find_one({"ingest_key": key}, INGESTED_PROJECTION)
+    except ConnectionFailure:
+        mark_db_down()
+        return None
+    if previous:
+        recent_keys.add(key)
+    return previous
+
+
+async def write_reading(sensor_doc: dict, prediction_doc: dict) -> bool:
+    """
+    Persist one reading's raw vitals + prediction. Returns True if they went
+    to the local spool instead of MongoDB. Both docs must already carry an
+    `_id` so a replay can't duplicate a partially written reading.
+
+    The prediction goes first: on a retried reading its unique ingest_key
+    raises DuplicateKeyError before the raw row is queued.
+    """
+    if claim_db_retry():
+        try:
+            await get_repositories().predictions.insert_one(prediction_doc)
+            await sensor_writer.submit(sensor_doc)
+            mark_db_up()
+            return False
+        except ConnectionFailure:
+            mark_db_down()
+
+    if await spool_docs("sensor_data", [sensor_doc]) and await spool_docs("predictions", [prediction_doc]):
+        return True
+    raise ConnectionFailure("MongoDB unavailable and spool could not take the reading")
+
+
+async def _replay_orphans():
+    for orphan in claim_orphaned_spools(SPOOL_DIR, exclude=spool.path if spool else None):
+        try:
+            await orphan.replay(get_repositories(), SPOOL_REPLAY_BATCH)
+            # Removed while still locked, so no other worker picks it up half-gone
+            if orphan.pending == 0:
+                os.remove(orphan.path)
+        finally:
+            orphan.close()
+
+
+async def replay_spool_once():
+    try:
+        await asyncio.wait_for(get_repositories().ping(), timeout=SPOOL_REPLAY_SECONDS)
+    except (ConnectionFailure, asyncio.TimeoutError) as e:
+        mark_db_down()
+        if spool:
+            spool.last_error = str(e) or type(e).__name__
+        return
+
+    mark_db_up()
+    try:
+        if spool and spool.pending:
+            await spool.replay(get_repositories(), SPOOL_REPLAY_BATCH)
+        if SPOOL_ENABLED:
+            await _replay_orphans()
+    except ConnectionFailure as e:
+        mark_db_down()
+        if spool:
+            spool.last_error = str(e)
+
+
+async def _replay_loop():
+    while True:
+        try:
+            await replay_spool_once()
+        except Exception:
+            # Keep pinging / replaying; a dead loop would never mark the DB up
+            logger.exception("Spool replay pass failed")
+        await asyncio.sleep(SPOOL_REPLAY_SECONDS)
+
+
+async def start_ingest_workers():
+    global spool, _replay_task
+    if SPOOL_ENABLED:
+        spool = Spool(
+            os.path.join(SPOOL_DIR, f"spool-{os.getpid()}.bin"),
+            max_size=SPOOL_MAX_MB << 20,
+        ).open()
+    # 🔁 Pings run with or without a spool: they're what marks the DB up again
+    _replay_task = asyncio.create_task(_replay_loop())
+    await sensor_writer.start()
+
+
+async def stop_ingest_workers():
+    global _replay_task
+    await sensor_writer.stop()
+    if _replay_task:
+        _replay_task.cancel()
+        try:
+            await _replay_task
+        except asyncio.CancelledError:
+            pass
+        _replay_task = None
+    if spool:
+        # Whatever is still pending stays on disk for the next worker to replay
+        spool.close()
+
+
+def ingest_load() -> float:
+    """
+    0 (idle) .. 1 (saturated): the worse of write-behind queue fill and
+    admission pressure, or 1 while spooling.
+    """
+    from shared.admission import admission
+
+    if db_is_down():
+        return 1.0
+    load = admission.pressure()
+    if sensor_writer.running and sensor_writer.max_queue:
+        load = max(load, sensor_writer.stats()["queued"] / sensor_writer.max_queue)
+    return min(load, 1.0)
+
+
+def ingest_status() -> dict:
+    from athlete_app.services.sampling import sampler
+    from shared.athlete_state import athlete_state
+    from athlete_app.services.sensor_quality import sensor_quality
+    from athlete_app.services.ecg import ecg_stage
+
+    return {
+        "database": "down" if db_is_down() else "up",
+        "load": round(ingest_load(), 3),
+        "sampling": sampler.stats(),
+        "sensor_writer": sensor_writer.stats(),
+        "spool": spool.stats() if spool else None,
+        "recent_keys": recent_keys.stats(),
+        "athlete_state": athlete_state.stats(),
+        "sensor_quality": sensor_quality.stats(),
+        "ecg": ecg_stage.stats(),
+    }
@@ -1,5 +1,4 @@
 from typing import Tuple
-import pandas as pd
 from athlete_app.core.model_loader import get_model, get_scaler, FEATURE_ORDER
 
 def normalize_skin_conductance(raw_value: float) -> float:
@@ -18,6 +17,8 @@ def predict_hydration(data: dict) -> Tuple[int, float]:
     ) / 4
     data["combined_metrics"] = combined
 
+    import pandas as pd
+
     # ⚠️ Ensure features are in correct order for model
     input_df = pd.DataFrame([data])[FEATURE_ORDER]
     scaled_input = get_scaler().transform(input_df)
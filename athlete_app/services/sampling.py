@@ -0,0 +1,110 @@
+# athlete_app/services/sampling.py
+#
+# Recommended sampling interval returned to the wristband with every ingest
+# reply. A state change asks for the fastest rate; the longer an athlete's
+# predicted state holds, the further the interval backs off (doubling every
+# SAMPLING_DOUBLING_SECONDS), capped lower while they are anything but
+# Hydrated so alerts stay responsive. Server load stretches stable intervals
+# but never a transition.
+#
+# State is per worker and bounded (least recently seen athletes are dropped).
+# With several workers each one sees a share of an athlete's readings, but
+# stability is measured in wall-clock time, so they converge on the same
+# recommendation.
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+from shared.hydration import LABEL_BY_KEY
+from athlete_app.core.config import (
+    SAMPLING_ENABLED, SAMPLING_MIN_SECONDS, SAMPLING_BASE_SECONDS, SAMPLING_MAX_SECONDS,
+    SAMPLING_WATCH_MAX_SECONDS, SAMPLING_DOUBLING_SECONDS, SAMPLING_LOAD_GAIN, SAMPLING_STATE_CAPACITY
+)
+
+STABLE_LABEL = LABEL_BY_KEY["hydrated"]
+
+
+class AdaptiveSampler:
+    def __init__(
+        self,
+        min_seconds: float = SAMPLING_MIN_SECONDS,
+        base_seconds: float = SAMPLING_BASE_SECONDS,
+        max_seconds: float = SAMPLING_MAX_SECONDS,
+        watch_max_seconds: float = SAMPLING_WATCH_MAX_SECONDS,
+        doubling_seconds: float = SAMPLING_DOUBLING_SECONDS,
+        load_gain: float = SAMPLING_LOAD_GAIN,
+        capacity: int = SAMPLING_STATE_CAPACITY,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_seconds = min_seconds
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.watch_max_seconds = watch_max_seconds
+        self.doubling_seconds = doubling_seconds
+        self.load_gain = load_gain
+        self.capacity = capacity
+        self.clock = clock
+        # athlete -> (label, time the label was first seen)
+        self._states: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.transitions = 0
+
+    def observe(self, athlete: str, label: str, load: float = 0.0) -> Dict:
+        """
+        Record `athlete`'s latest predicted `label` and return the interval the
+        device should sample at next. `load` is 0 (idle) .. 1 (saturated).
+        """
+        now = self.clock()
+        previous = self._states.get(athlete)
+
+        if previous is None or previous[0] != label:
+            self._states[athlete] = (label, now)
+            self._states.move_to_end(athlete)
+            if len(self._states) > self.capacity:
+                self._states.popitem(last=False)
+            if previous is not None:
+                self.transitions += 1
+                return self._recommend(self.min_seconds, "transition")
+            interval, reason = self.base_seconds, "new"
+        else:
+            self._states.move_to_end(athlete)
+            stable_for = now - previous[1]
+            interval = self.base_seconds * 2 ** (stable_for / self.doubling_seconds)
+            reason = "stable"
+
+        if load > 0:
+            interval *= 1 + self.load_gain * min(load, 1.0)
+            if load >= 0.5:
+                reason = "load"
+
+        # Capped after the load stretch: load never pushes a watched athlete past it
+        cap = self.max_seconds if label == STABLE_LABEL else self.watch_max_seconds
+        if interval >= cap:
+            interval, reason = cap, reason if label == STABLE_LABEL else "watch"
+        return self._recommend(interval, reason)
+
+    def _recommend(self, interval: float, reason: str) -> Dict:
+        return {
+            "recommended_interval_seconds": max(round(interval), round(self.min_seconds)),
+            "sampling_reason": reason,
+        }
+
+    def forget(self, athlete: str):
+        self._states.pop(athlete, None)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": SAMPLING_ENABLED,
+            "tracked": len(self._states),
+            "capacity": self.capacity,
+            "transitions": self.transitions,
+        }
+
+
+sampler = AdaptiveSampler()
+
+
+def recommend_sampling(athlete: str, label: str, load: float = 0.0) -> Dict:
+    """Response fields for an ingest reply; empty when SAMPLING_ENABLED is off."""
+    if not SAMPLING_ENABLED:
+        return {}
+    return sampler.observe(athlete, label, load)
@@ -0,0 +1,272 @@
+# athlete_app/services/sensor_quality.py
+#
+# Sensor quality stage for wristband readings.
+#
+# Every channel of a reading is checked, and over a short per-device window
+# of recent samples, flagged as:
+#   missing  - absent, NaN or <= 0
+#   range    - outside SENSOR_LIMITS
+#   flatline - raw ADC channels only (GSR, ECG): the last
+#              SENSOR_FLATLINE_SAMPLES values are identical and span at least
+#              SENSOR_FLATLINE_SECONDS (stuck ADC, sensor off the skin).
+#              Skin temperature and heart rate legitimately hold steady.
+#   spike    - a single-sample outlier: robust z-score against the window
+#              (median / MAD) above SENSOR_SPIKE_Z that the following sample
+#              does not confirm. Two outliers in a row in the same direction
+#              are a real change (e.g. heart rate rising at exercise onset),
+#              so the newest sample is never a spike yet; it is judged when
+#              the next one arrives. Not applied to the raw ECG sample, which
+#              swings across the cardiac cycle between readings.
+#   dropout  - more than SENSOR_DROPOUT_SECONDS since the device's previous
+#              sample (per sample, not per channel; informational only)
+#
+# assess() works on a whole (samples x channels) array and returns boolean
+# masks of the same shape, so a batch is checked in one pass; the live path
+# keeps a bounded window per device and reads the newest row. Rejected
+# samples and confirmed spikes stay out of the spike reference (median).
+#
+# Only missing / range / flatline reject a sample, and flatline only when
+# SENSOR_REJECT_ARTIFACTS is on.
+#
+# Warnings are aggregated: one sensor_warnings document per device per
+# SENSOR_WARNING_WINDOW_SECONDS, counted per channel and flag, instead of a
+# row per bad sample.
+
+import time
+import warnings
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from athlete_app.core.config import (
+    SENSOR_QUALITY_WINDOW, SENSOR_FLATLINE_SAMPLES, SENSOR_FLATLINE_SECONDS, SENSOR_SPIKE_Z, SENSOR_SPIKE_MIN_SAMPLES,
+    SENSOR_DROPOUT_SECONDS, SENSOR_WARNING_WINDOW_SECONDS, SENSOR_QUALITY_CAPACITY
+)
+from athlete_app.services.preprocess import SENSOR_LIMITS
+from shared.repositories import get_repositories
+
+RAW_CHANNELS = ("bpm", "gy906", "groveGsr", "ad8232")
+FLATLINE_CHANNELS = ("groveGsr", "ad8232")
+SPIKE_CHANNELS = ("bpm", "gy906", "groveGsr")
+# Smallest spread the spike test assumes, in raw units, so a very steady
+# window (MAD ~ 0) doesn't turn ordinary jitter into spikes
+SPIKE_MIN_SCALE = {"bpm": 3.0, "gy906": 0.2, "groveGsr": 30.0}
+
+CHANNEL_FLAGS = ("missing", "range", "flatline", "spike")
+# Flags that keep a sample away from the model
+REJECT_FLAGS = ("missing", "range", "flatline")
+
+
+def raw_channels(reading: dict) -> Dict[str, Optional[float]]:
+    """RawSensorInput payload -> {channel: value}."""
+    return {
+        "bpm": (reading.get("max30105") or {}).get("bpm"),
+        "gy906": reading.get("gy906"),
+        "groveGsr": reading.get("groveGsr"),
+        "ad8232": reading.get("ad8232"),
+    }
+
+
+def assess(
+    values,
+    channels: Sequence[str] = RAW_CHANNELS,
+    timestamps: Optional[Iterable[float]] = None,
+    reference: Optional[Iterable[bool]] = None,
+    flatline_channels: Sequence[str] = FLATLINE_CHANNELS,
+    flatline_samples: int = SENSOR_FLATLINE_SAMPLES,
+    flatline_seconds: float = SENSOR_FLATLINE_SECONDS,
+    spike_z: float = SENSOR_SPIKE_Z,
+    spike_min_samples: int = SENSOR_SPIKE_MIN_SAMPLES,
+    dropout_seconds: float = SENSOR_DROPOUT_SECONDS,
+) -> Dict[str, np.ndarray]:
+    """
+    Quality masks for a (samples x channels) array, oldest sample first.
+    Channel flags are (n, k) boolean arrays; `dropout` and `rejected` are (n,).
+    None values count as missing. `reference` marks the rows the spike test
+    may use as its baseline (default: all).
+    """
+    values = np.asarray(values, dtype=float)
+    n, k = values.shape
+    stamps = np.asarray(list(timestamps), dtype=float) if timestamps is not None else None
+    reference = np.ones(n, dtype=bool) if reference is None else np.asarray(list(reference), dtype=bool)
+    limits = np.array([SENSOR_LIMITS.get(c, (-np.inf, np.inf)) for c in channels], dtype=float)
+
+    missing = ~np.isfinite(values) | (values <= 0)
+    out_of_range = ~missing & ((values < limits[:, 0]) | (values > limits[:, 1]))
+    valid = ~(missing | out_of_range)
+
+    # Trailing run of identical valid values, long enough in samples and time
+    flatline = np.zeros((n, k), dtype=bool)
+    cols = [i for i, c in enumerate(channels) if c in flatline_channels]
+    if cols and flatline_samples > 1 and n >= flatline_samples:
+        windows = sliding_window_view(values[:, cols], flatline_samples, axis=0)
+        all_valid = sliding_window_view(valid[:, cols], flatline_samples, axis=0).all(axis=-1)
+        flat = all_valid & (windows.max(axis=-1) == windows.min(axis=-1))
+        if stamps is not None:
+            span = stamps[flatline_samples - 1:] - stamps[:n - flatline_samples + 1]
+            flat &= (span >= flatline_seconds)[:, None]
+        flatline[flatline_samples - 1:, cols] = flat
+
+    spike = np.zeros((n, k), dtype=bool)
+    cols = [i for i, c in enumerate(channels) if c in SPIKE_CHANNELS]
+    if cols and n >= spike_min_samples:
+        sub = values[:, cols]
+        baseline = np.where(valid[:, cols] & reference[:, None], sub, np.nan)
+        enough = np.sum(~np.isnan(baseline), axis=0) >= spike_min_samples
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            median = np.nanmedian(baseline, axis=0)
+            mad = np.nanmedian(np.abs(baseline - median), axis=0) * 1.4826
+        floor = np.array([SPIKE_MIN_SCALE.get(channels[i], 0.0) for i in cols])
+        scale = np.fmax(np.nan_to_num(mad), floor)
+        scale[scale == 0] = np.inf
+        deviation = np.nan_to_num(sub - median)
+        outlier = enough & valid[:, cols] & (np.abs(deviation) / scale > spike_z)
+        # The next sample deviating the same way confirms a real change
+        confirmed = np.zeros_like(outlier)
+        confirmed[:-1] = outlier[1:] & (np.sign(deviation[1:]) == np.sign(deviation[:-1]))
+        isolated = outlier & ~confirmed
+        isolated[-1] = False  # no following sample yet
+        spike[:, cols] = isolated
+
+    dropout = np.zeros(n, dtype=bool)
+    if stamps is not None and n > 1:
+        dropout[1:] = np.diff(stamps) > dropout_seconds
+
+    masks = {"missing": missing, "range": out_of_range, "flatline": flatline, "spike": spike}
+    rejected = np.zeros(n, dtype=bool)
+    for flag in REJECT_FLAGS:
+        rejected |= masks[flag].any(axis=1)
+    return {**masks, "dropout": dropout, "rejected": rejected}
+
+
+def summarize(masks: Dict[str, np.ndarray], channels: Sequence[str] = RAW_CHANNELS, row: int = -1) -> Dict:
+    """One sample's flags: {"flags": {channel: [flag, ...]}, "dropout", "rejected"}."""
+    flags: Dict[str, List[str]] = {}
+    for flag in CHANNEL_FLAGS:
+        for i in np.flatnonzero(masks[flag][row]):
+            flags.setdefault(channels[i], []).append(flag)
+    return {"flags": flags, "dropout": bool(masks["dropout"][row]), "rejected": bool(masks["rejected"][row])}
+
+
+class SensorQualityMonitor:
+    def __init__(self, window: int = SENSOR_QUALITY_WINDOW, capacity: int = SENSOR_QUALITY_CAPACITY,
+                 channels: Sequence[str] = RAW_CHANNELS):
+        self.window = window
+        self.capacity = capacity
+        self.channels = tuple(channels)
+        # device -> deque of [timestamp, values, result, reference]
+        self._windows: "OrderedDict[str, deque]" = OrderedDict()
+        self.checked = 0
+        self.rejected = 0
+
+    def check(self, device: str, sample: Dict[str, Optional[float]], timestamp: Optional[float] = None,
+              flatline_channels: Sequence[str] = FLATLINE_CHANNELS) -> Dict:
+        """
+        Flags for the device's newest sample. Channels derived from a window
+        (the ECG window's median) have their own flat-signal check and can be
+        left out of `flatline_channels`.
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        history = self._windows.get(device)
+        if history is None:
+            history = self._windows[device] = deque(maxlen=self.window)
+        self._windows.move_to_end(device)
+        if len(self._windows) > self.capacity:
+            self._windows.popitem(last=False)
+
+        # A retried reading carries the same device time: same answer, no second sample
+        if history and history[-1][0] == timestamp:
+            return {**history[-1][2], "repeat": True}
+
+        values = [sample.get(c) for c in self.channels]
+        rows = [entry[1] for entry in history] + [values]
+        stamps = [entry[0] for entry in history] + [timestamp]
+        reference = [entry[3] for entry in history] + [True]
+        masks = assess(rows, self.channels, stamps, reference, flatline_channels)
+        result = summarize(masks, self.channels)
+
+        # The previous sample is judged now that this one shows whether it was a spike
+        result["confirmed"] = {}
+        if history:
+            previous = summarize(masks, self.channels, row=-2)["flags"]
+            result["confirmed"] = {c: ["spike"] for c, flags in previous.items() if "spike" in flags}
+            if result["confirmed"]:
+                history[-1][3] = False
+
+        # Rejected samples and spikes stay out of later baselines
+        history.append([timestamp, values, result, not result["rejected"]])
+
+        self.checked += 1
+        self.rejected += result["rejected"]
+        return result
+
+    def forget(self, device: str):
+        self._windows.pop(device, None)
+
+    def stats(self) -> Dict:
+        return {
+            "devices": len(self._windows),
+            "capacity": self.capacity,
+            "checked": self.checked,
+            "rejected": self.rejected,
+        }
+
+
+sensor_quality = SensorQualityMonitor()
+
+
+def warning_window(ts: datetime, seconds: int = SENSOR_WARNING_WINDOW_SECONDS) -> datetime:
+    epoch = int(ts.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+async def record_sensor_warnings(
+    user: str, device: str, result: Dict, received: dict, now: Optional[datetime] = None
+) -> bool:
+    """
+    Count one sample's flags (and the spikes it confirmed in the previous
+    sample) into its device's current warning window. Returns True when this
+    opened a new window (worth one SensorWarning alert).
+    """
+    flagged = merged_flags(result)
+    if not flagged and not result["dropout"]:
+        return False
+    now = now or datetime.now(timezone.utc)
+    start = warning_window(now)
+
+    inc = {"samples": 1}
+    for channel, flags in flagged.items():
+        for flag in flags:
+            inc[f"counts.{channel}.{flag}"] = inc.get(f"counts.{channel}.{flag}", 0) + 1
+    if result["dropout"]:
+        inc["dropouts"] = 1
+
+    update = {
+        "$inc": inc,
+        "$set": {"last_seen": now, "received_data": received},
+        "$setOnInsert": {
+            "timestamp": start,
+            "window_end": datetime.fromtimestamp(start.timestamp() + SENSOR_WARNING_WINDOW_SECONDS, tz=timezone.utc),
+        },
+    }
+    if flagged:
+        # Kept for the ?sensor= filter on /data/warnings/sensor
+        update["$addToSet"] = {"missing_field": {"$each": sorted(flagged)}}
+    outcome = await get_repositories().sensor_warnings.update_one(
+        {"user": user, "device": device, "window_start": start}, update, upsert=True
+    )
+    return outcome.upserted_id is not None
+
+
+def merged_flags(result: Dict) -> Dict[str, List[str]]:
+    """This sample's flags plus the spikes it confirmed in the previous one."""
+    flagged = {channel: list(flags) for channel, flags in result["flags"].items()}
+    for channel, flags in result.get("confirmed", {}).items():
+        flagged.setdefault(channel, []).extend(f for f in flags if f not in flagged[channel])
+    return flagged
+
+
+def describe(result: Dict) -> str:
+    return ", ".join(f"{channel} {'/'.join(flags)}" for channel, flags in sorted(merged_flags(result).items()))
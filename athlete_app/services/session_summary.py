@@ -0,0 +1,87 @@
+# athlete_app/services/session_summary.py
+
+from datetime import datetime
+from shared.repositories import get_repositories
+from shared.hydration import STATUS_KEYS, status_label_expr
+
+SUMMARY_VITALS = [
+    "heart_rate",
+    "body_temperature",
+    "skin_conductance",
+    "ecg_sigmoid",
+    "hydration_level",
+]
+
+HYDRATION_STATES = list(reversed(STATUS_KEYS))
+
+
+def _session_pipeline(email: str, username: str, start: datetime, end: datetime) -> list:
+    group = {"_id": None, "samples": {"$sum": 1}}
+    for v in SUMMARY_VITALS:
+        group[f"{v}_min"] = {"$min": f"${v}"}
+        group[f"{v}_mean"] = {"$avg": f"${v}"}
+        group[f"{v}_max"] = {"$max": f"${v}"}
+    for state in HYDRATION_STATES:
+        group[f"{state}_seconds"] = {"$sum": {"$cond": [{"$eq": ["$state", state]}, "$dt", 0]}}
+
+    return [
+        # (user, timestamp) index
+        {"$match": {"user": email, "timestamp": {"$gte": start, "$lte": end}}},
+        # Each reading holds its state until the next one (or the end of the session)
+        {"$setWindowFields": {
+            "sortBy": {"timestamp": 1},
+            "output": {"next_ts": {"$shift": {"output": "$timestamp", "by": 1, "default": end}}},
+        }},
+        {"$set": {
+            "dt": {"$divide": [{"$subtract": ["$next_ts", "$timestamp"]}, 1000]},
+            "state": status_label_expr("$hydration_level", STATUS_KEYS),
+        }},
+        {"$group": group},
+        # Alert count rides along in the same round trip
+        {"$lookup": {
+            "from": "alerts",
+            "pipeline": [
+                {"$match": {"athlete_id": username, "timestamp": {"$gte": start, "$lte": end}}},
+                {"$count": "n"},
+            ],
+            "as": "alert_count",
+        }},
+    ]
+
+
+async def compute_session_summary(user: dict, start: datetime, end: datetime) -> dict:
+    """
+    Per-session statistics over [start, end]: min/mean/max of each vital,
+    seconds spent in each hydration state and the number of alerts raised.
+    """
+    repos = get_repositories()
+    rows = await repos.sensor_data.aggregate(
+        _session_pipeline(user["email"], user["username"], start, end)
+    ).to_list(length=1)
+
+    if not rows:
+        alerts = await repos.alerts.count_documents(
+            {"athlete_id": user["username"], "timestamp": {"$gte": start, "$lte": end}}
+        )
+        return {
+            "samples": 0,
+            "vitals": {},
+            "time_in_state": {state: 0 for state in HYDRATION_STATES},
+            "alerts": alerts,
+        }
+
+    row = rows[0]
+    alert_count = row.get("alert_count") or [{"n": 0}]
+    return {
+        "samples": row["samples"],
+        "vitals": {
+            v: {
+                "min": row.get(f"{v}_min"),
+                "mean": row.get(f"{v}_mean"),
+                "max": row.get(f"{v}_max"),
+            }
+            for v in SUMMARY_VITALS
+        },
+        "time_in_state": {state: row.get(f"{state}_seconds", 0) for state in HYDRATION_STATES},
+        "alerts": alert_count[0]["n"],
+    }
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from coach_app.api.deps import get_current_coach
-from shared.database import db
+from shared.repositories import Repositories, get_repos
 from shared.security import verify_password, hash_password
 from pydantic import BaseModel
 from typing import Optional
@@ -19,7 +19,7 @@ class DeleteAccountResponse(BaseModel):
 
 # --------- Change Password ----------
 @router.post("/password", response_model=DeleteAccountResponse)
-async def change_password(data: CoachPasswordChange, coach=Depends(get_current_coach)):
+async def change_password(data: CoachPasswordChange, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
     if data.new_password != data.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
 
@@ -27,7 +27,7 @@ async def change_password(data: CoachPasswordChange, coach=Depends(get_current_c
         raise HTTPException(status_code=403, detail="Incorrect current password")
 
     hashed = hash_password(data.new_password)
-    await db.coaches.update_one(
+    await repos.coaches.update_one(
         {"email": coach["email"]},
         {"$set": {"password": hashed}}
     )
@@ -36,6 +36,6 @@ async def change_password(data: CoachPasswordChange, coach=Depends(get_current_c
 
 # --------- Delete Account ----------
 @router.delete("/delete", response_model=DeleteAccountResponse)
-async def delete_account(coach=Depends(get_current_coach)):
-    await db.coaches.delete_one({"email": coach["email"]})
+async def delete_account(coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
+    await repos.coaches.delete_one({"email": coach["email"]})
     return {"message": "Coach account deleted"}
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from coach_app.api.deps import get_current_coach
 from coach_app.models.schemas import Alert
-from shared.database import db
+from shared.repositories import Repositories, get_repos, get_repositories
+from shared.database import read_db, primary_reads
+from shared.roster import get_coach_roster, username_to_pretty
+from shared.coach_inbox import read_inbox, backfill_inbox, unseeded_athletes, append_to_inbox, resolve_in_inbox
+from shared.response_cache import cached_json, bump_coach_version
 from bson import ObjectId
 from typing import List
 from datetime import timezone
@@ -63,73 +67,72 @@ router = APIRouter()
 
 #     return alerts
 
-@router.get("/", response_model=List[Alert])
-async def get_alerts(coach=Depends(get_current_coach)):
-    coach_email = coach["email"]
-
-    # ✅ 1. Get coach profile
-    coach_profile = await db.coach_profile.find_one({"email": coach_email})
-    if not coach_profile or "name" not in coach_profile:
-        raise HTTPException(status_code=400, detail="Coach profile missing or incomplete")
-    coach_name = coach_profile["name"]
-
-    # ✅ 2. Get athletes under this coach
-    athlete_docs = await db.athletes.find({"assigned_by": coach_email}).to_list(length=None)
-    athlete_emails = [a["email"] for a in athlete_docs]
+def format_coach_alert(doc: dict, username_to_name: dict) -> dict:
+    alert_id = doc.pop("_id", None) or doc.pop("alert_id", None)
+    doc["id"] = str(alert_id)
 
-    if not athlete_emails:
-        return []
+    if "timestamp" in doc and hasattr(doc["timestamp"], "isoformat"):
+        doc["timestamp"] = doc["timestamp"].replace(tzinfo=timezone.utc).isoformat()
 
-    # ✅ 3. Convert emails → usernames (to match alert's athlete_id field)
-    user_docs = await db.users.find({"email": {"$in": athlete_emails}}).to_list(length=None)
-    email_to_username = {
-    u["email"]: u["username"]
-    for u in user_docs
-    if "email" in u and "username" in u
-    }
+    doc.setdefault("status", "active")
+    doc.setdefault("hydration_level", None)
+    doc.setdefault("source", "unknown")
+    doc.setdefault("coach_message", "")
+    doc.setdefault("hydration_status", "")
+    doc.setdefault("alert_type", "")
+    doc["status_change"] = doc.get("status_change", False)
 
-    username_to_name = {
-    u["username"]: u["name"]
-    for u in user_docs
-    if "username" in u and "name" in u
-    }   
-
-    athlete_usernames = list(email_to_username.values())
-
-    print("Coach:", coach_email)
-    print("Athlete USERNAMES for alerts:", athlete_usernames)
-
-    # ✅ 4. Query alerts by athlete usernames
-    cursor = db.alerts.find({
-        "athlete_id": {"$in": athlete_usernames},
-        "status_change": True
-    }).sort("timestamp", -1)
-
-    alerts = []
-    async for doc in cursor:
-        doc["id"] = str(doc.pop("_id"))
+    athlete_id = doc.get("athlete_id")
+    doc["athlete_name"] = username_to_name.get(athlete_id, username_to_pretty(athlete_id))
+    return doc
 
-        if "timestamp" in doc and hasattr(doc["timestamp"], "isoformat"):
-            doc["timestamp"] = doc["timestamp"].replace(tzinfo=timezone.utc).isoformat()
+@router.get("/", response_model=List[Alert])
+async def get_alerts(request: Request, coach=Depends(get_current_coach)):
+    return await cached_json(
+        request, "alerts", coach["email"],
+        lambda: load_coach_alerts(coach),
+        response_model=List[Alert],
+        read_group="coach"
+    )
 
-        doc.setdefault("status", "active")
-        doc.setdefault("hydration_level", None)
-        doc.setdefault("source", "unknown")
-        doc.setdefault("coach_message", "")
-        doc.setdefault("hydration_status", "")
-        doc.setdefault("alert_type", "")
-        doc["status_change"] = doc.get("status_change", False)
+async def load_coach_alerts(coach: dict) -> list:
+    repos = get_repositories()
+    coach_email = coach["email"]
 
-        athlete_id = doc.get("athlete_id")
-        # doc["athlete_name"] = username_to_name.get(athlete_id, "Unknown")
-        def username_to_pretty(name: str) -> str:
-            return name.replace(".", " ").title() if name else "Unknown"
+    # ✅ 1. Coach profile + athletes come from the cached membership index
+    roster = await get_coach_roster(coach_email)
+    if not roster["coach_name"]:
+        raise HTTPException(status_code=400, detail="Coach profile missing or incomplete")
 
-        doc["athlete_name"] = username_to_name.get(athlete_id, username_to_pretty(athlete_id))
+    username_to_name = roster["athletes"]
+    athlete_usernames = list(username_to_name)
 
-        alerts.append(doc)
+    if not athlete_usernames:
+        return []
 
-    return alerts
+    # ✅ 2. Athletes new to this coach's inbox (first read, or the roster
+    # grew): backfill their history once, single indexed query on
+    # (athlete_id, status_change, timestamp)
+    unseeded = await unseeded_athletes(coach_email, athlete_usernames)
+    if unseeded:
+        docs = await repos.alerts.find({
+            "athlete_id": {"$in": unseeded},
+            "status_change": True
+        }).to_list(length=None)
+        await backfill_inbox(coach_email, unseeded, docs)
+
+    # ✅ 3. The coach's own inbox, one key range read; on the primary right
+    # after a backfill so a lagging secondary can't hide it
+    if unseeded:
+        with primary_reads():
+            entries = await read_inbox(coach_email)
+    else:
+        entries = await read_inbox(coach_email)
+    return [
+        format_coach_alert(e, username_to_name)
+        for e in entries
+        if e.get("athlete_id") in username_to_name
+    ]
 
 # @router.get("/", response_model=List[Alert])
 # async def get_alerts(coach=Depends(get_current_coach)):
@@ -186,7 +189,7 @@ async def get_alerts(coach=Depends(get_current_coach)):
 @router.get("/{athlete_id}", response_model=list[Alert])
 async def get_alerts_by_athlete(athlete_id: str, coach=Depends(get_current_coach)):
     # 🔍 Return all alerts for a single athlete
-    cursor = db.alerts.find({"athlete_id": athlete_id}).sort("timestamp", -1)
+    cursor = read_db("coach").alerts.find({"athlete_id": athlete_id}).sort("timestamp", -1)
     alerts = []
     async for doc in cursor:
         doc["id"] = str(doc.pop("_id"))
@@ -197,16 +200,22 @@ async def get_alerts_by_athlete(athlete_id: str, coach=Depends(get_current_coach
     return alerts
 
 @router.post("/")
-async def create_alert(data: Alert, coach=Depends(get_current_coach)):
-    await db.alerts.insert_one(data.dict())
+async def create_alert(data: Alert, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
+    alert_doc = data.dict()
+    result = await repos.alerts.insert_one(alert_doc)
+    if alert_doc.get("status_change"):
+        await append_to_inbox(coach["email"], result.inserted_id, alert_doc)
+        await bump_coach_version(coach["email"], "alerts")
     return {"message": "Alert created"}
 
 @router.post("/resolve/{alert_id}")
-async def resolve_alert(alert_id: str, coach=Depends(get_current_coach)):
-    result = await db.alerts.update_one(
+async def resolve_alert(alert_id: str, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
+    result = await repos.alerts.update_one(
         {"_id": ObjectId(alert_id)},
         {"$set": {"status": "resolved"}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Alert not found")
+    await resolve_in_inbox(ObjectId(alert_id))
+    await bump_coach_version(coach["email"], "alerts")
     return {"message": "Alert resolved"}
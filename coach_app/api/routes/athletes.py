@@ -1,124 +1,104 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from datetime import datetime
+from typing import Optional, Literal
 from coach_app.models.schemas import Athlete, SensorData
 from coach_app.api.deps import get_current_coach
-from shared.database import db
+from shared.repositories import Repositories, get_repos, get_repositories
+from shared.database import read_db
+from shared.response_cache import cached_json
+from shared.projections import VITALS_PROJECTION
+from shared.responses import BSONJSONResponse
+from shared.rollups import history_window, read_history
 
 router = APIRouter()
 
 @router.get("/", response_model=list[Athlete])
-async def get_athletes(coach=Depends(get_current_coach)):
+async def get_athletes(request: Request, coach=Depends(get_current_coach)):
     if not coach or "email" not in coach:
         raise HTTPException(status_code=401, detail="Invalid or missing coach token")
 
-    profile = await db.coach_profile.find_one({"email": coach["email"]})
+    # 🗃 Served from cache until ingest for one of this coach's athletes bumps the version
+    return await cached_json(request, "athletes", coach["email"], lambda: load_athletes(coach), read_group="coach")
+
+ATHLETE_VITALS = ("hydration_level", "heart_rate", "body_temperature", "skin_conductance", "ecg_sigmoid")
+
+async def load_athletes(coach: dict) -> list:
+    repos = get_repositories()
+    profile = await repos.coach_profile.find_one({"email": coach["email"]}, {"name": 1})
     if not profile or not profile.get("name"):
         raise HTTPException(status_code=400, detail="Coach profile missing name")
 
-    coach_name = profile["name"]
-
+    # ⚡ Mongo builds the exact `Athlete` shape, so the rows can go straight to
+    # orjson without a per-document pydantic round trip.
     pipeline = [
         {"$match": {"assigned_by": coach["email"]}},
-        {
-            "$lookup": {
-                "from": "predictions",
-                "let": {"athlete": "$email"},
-                "pipeline": [
-                    {"$match": {"$expr": {"$eq": ["$user", "$$athlete"]}}},
-                    {"$sort": {"timestamp": -1}},
-                    {"$limit": 1}
-                ],
-                "as": "latest_prediction"
-            }
-        },
         {
             "$lookup": {
                 "from": "sensor_data",
-                "let": {"athlete": "$email"},
+                "localField": "email",
+                "foreignField": "user",
                 "pipeline": [
-                    {"$match": {"$expr": {"$eq": ["$user", "$$athlete"]}}},
                     {"$sort": {"timestamp": -1}},
-                    {"$limit": 1}
+                    {"$limit": 1},
+                    {"$project": {"_id": 0, **{f: 1 for f in ATHLETE_VITALS}}}
                 ],
                 "as": "latest_vitals"
             }
         },
-        {
-            "$lookup": {
-                "from": "sensor_warnings",
-                "let": {"athlete": "$email"},
-                "pipeline": [
-                    {"$match": {"$expr": {"$eq": ["$user", "$$athlete"]}}},
-                    {"$sort": {"timestamp": -1}},
-                    {"$limit": 5}
-                ],
-                "as": "warnings"
-            }
-        },
+        {"$set": {"vitals": {"$ifNull": [{"$arrayElemAt": ["$latest_vitals", 0]}, {}]}}},
         {
             "$project": {
                 "_id": 0,
-                "id": 1,
-                "athlete_id": 1,
-                "name": 1,
-                "email": 1,
-                "sport": 1,
-                "assigned_by": 1,
-                "hydration_level": 1,
-                "status": 1,
-                "ecg_sigmoid": 1,
-                "skin_conductance": 1,
-                "heart_rate": 1,
-                "body_temperature": 1,
-                "latest_prediction": {"$arrayElemAt": ["$latest_prediction", 0]},
-                "latest_vitals": {"$arrayElemAt": ["$latest_vitals", 0]},
-                "warnings": 1
+                "id": {"$ifNull": ["$id", "$email"]},
+                "name": {"$ifNull": ["$name", ""]},
+                "sport": {"$ifNull": ["$sport", ""]},
+                "hydration_level": {"$toInt": {"$ifNull": ["$vitals.hydration_level", 0]}},
+                "heart_rate": {"$toDouble": {"$ifNull": ["$vitals.heart_rate", 0]}},
+                "body_temperature": {"$toDouble": {"$ifNull": ["$vitals.body_temperature", 0]}},
+                "skin_conductance": {"$toDouble": {"$ifNull": ["$vitals.skin_conductance", 0]}},
+                "ecg_sigmoid": {"$toDouble": {"$ifNull": ["$vitals.ecg_sigmoid", 0]}},
+                "status": {"$ifNull": ["$status", "Unknown"]}
             }
         }
     ]
 
-    raw_athletes = await db.athletes.aggregate(pipeline).to_list(length=None)
+    return await read_db("coach").athletes.aggregate(pipeline).to_list(length=None)
 
-    athletes = []
-    for doc in raw_athletes:
-        vitals = doc.get("latest_vitals", {})
-        prediction = doc.get("latest_prediction", {})
-        athlete = {
-        "id": doc.get("id") or doc.get("email"),
-        "athlete_id": doc.get("athlete_id", ""),
-        "name": doc.get("name", ""),
-        "email": doc.get("email", ""),
-        "sport": doc.get("sport", ""),
-        "assigned_by": doc.get("assigned_by", ""),
-        "hydration_level": int(vitals.get("hydration_level", 0)),
-        "heart_rate": float(vitals.get("heart_rate", 0)),
-        "body_temperature": float(vitals.get("body_temperature", 0)),
-        "skin_conductance": float(vitals.get("skin_conductance", 0)),
-        "ecg_sigmoid": float(vitals.get("ecg_sigmoid", 0)),
-
-        # "heart_rate": float(doc.get("heart_rate", 0)),
-        # "body_temperature": float(doc.get("body_temperature", 0)),
-        # "skin_conductance": float(doc.get("skin_conductance", 0)),
-        # "ecg_sigmoid": float(doc.get("ecg_sigmoid", 0)),
-
-        "status": doc.get("status", "Unknown"),
-        "alerts": doc.get("warnings", [])
-        }
+@router.get("/history/{athlete_email}")
+async def get_athlete_history(
+    athlete_email: str,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    resolution: Literal["auto", "raw", "1m", "15m", "1h"] = Query("auto"),
+    points: Optional[int] = Query(None, ge=3, le=5000),
+    coach=Depends(get_current_coach),
+    repos: Repositories = Depends(get_repos)
+):
+    athlete = await repos.athletes.find_one({"email": athlete_email, "assigned_by": coach["email"]}, {"_id": 1})
+    if not athlete:
+        raise HTTPException(status_code=404, detail="Athlete not found")
 
-        athletes.append(athlete)
+    try:
+        start, end = history_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return athletes
+    history = await read_history(athlete_email, start, end, resolution, points)
+    return BSONJSONResponse(history)
 
 @router.get("/{athlete_id}", response_model=Athlete)
-async def retrieve_athlete(athlete_id: str, coach=Depends(get_current_coach)):
-    athlete = await db.athletes.find_one({"id": athlete_id})
+async def retrieve_athlete(athlete_id: str, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
+    athlete = await repos.athletes.find_one({"id": athlete_id})
     if not athlete:
         raise HTTPException(status_code=404, detail="Athlete not found")
     return athlete
 
 
 @router.get("/vitals/{athlete_id}", response_model=SensorData)
-async def get_latest_vitals(athlete_id: str, coach=Depends(get_current_coach)):
-    latest_data = await db.sensor_data.find_one({"user": athlete_id}, sort=[("timestamp", -1)])
+async def get_latest_vitals(athlete_id: str, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
+    latest_data = await repos.sensor_data.find_one(
+        {"user": athlete_id}, {**VITALS_PROJECTION, "hydration_level": 1, "combined_metrics": 1}, sort=[("timestamp", -1)]
+    )
     if not latest_data:
         raise HTTPException(status_code=404, detail="No sensor data found for this athlete")
     return latest_data
\ No newline at end of file
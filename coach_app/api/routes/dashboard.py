@@ -1,24 +1,30 @@
-from fastapi import APIRouter, Depends
-from shared.database import db
+from fastapi import APIRouter, Depends, Request
+from shared.coach_stats import get_coach_stats
+from shared.response_cache import cached_json
 from coach_app.api.deps import get_current_coach
 
 router = APIRouter()
 
+CRITICAL_STATUS = "Critical"
+
 @router.get("/")
-async def dashboard(coach=Depends(get_current_coach)):
+async def dashboard(request: Request, coach=Depends(get_current_coach)):
+    return await cached_json(request, "dashboard", coach["email"], lambda: load_dashboard(coach), read_group="coach")
+
+async def load_dashboard(coach: dict) -> dict:
     coach_email = coach["email"]
 
-    # Pull all athletes linked to the coach
-    athletes = await db.athletes.find({"assigned_by": coach_email}).to_list(length=None)
+    # Running aggregates maintained on write (see shared/coach_stats.py)
+    stats = await get_coach_stats(coach_email)
 
-    total_athletes = len(athletes)
+    total_athletes = stats.get("total_athletes", 0)
 
     avg_hydration = (
-        sum(a.get("hydration_level", 0) for a in athletes) // total_athletes
+        stats.get("hydration_sum", 0) // total_athletes
         if total_athletes > 0 else 0
     )
 
-    critical_hydration = sum(1 for a in athletes if a.get("status") == "Critical")
+    critical_hydration = stats.get("status_counts", {}).get(CRITICAL_STATUS, 0)
 
     return {
         "totalAthletes": total_athletes,
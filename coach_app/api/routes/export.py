@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional, Literal
+from coach_app.api.deps import get_current_coach
+from shared.repositories import Repositories, get_repos
+from shared.export import (
+    EXPORT_FROM_SECONDARY, MEDIA_TYPES, export_available, export_filename, stream_export, team_emails
+)
+from shared.rollups import history_window
+
+router = APIRouter()
+
+@router.get("/{collection}")
+async def export_telemetry(
+    collection: Literal["sensor_data", "predictions"],
+    start: datetime = Query(...),
+    end: Optional[datetime] = Query(None),
+    athlete: Optional[str] = Query(None, description="Athlete email; omit for the whole team"),
+    format: Literal["parquet", "arrow", "csv.gz"] = Query("csv.gz"),
+    secondary: bool = Query(EXPORT_FROM_SECONDARY),
+    coach=Depends(get_current_coach),
+    repos: Repositories = Depends(get_repos)
+):
+    """
+    Stream one collection for an athlete (or the coach's whole team) over
+    [start, end) as Parquet, Arrow IPC stream or gzip CSV.
+    """
+    try:
+        start, end = history_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not export_available(format):
+        raise HTTPException(status_code=400, detail=f"{format} export is not available on this server")
+
+    if athlete:
+        found = await repos.athletes.find_one({"email": athlete, "assigned_by": coach["email"]}, {"_id": 1})
+        if not found:
+            raise HTTPException(status_code=404, detail="Athlete not found")
+        users, scope = [athlete], athlete
+    else:
+        users, scope = await team_emails(coach["email"]), "team"
+        if not users:
+            raise HTTPException(status_code=404, detail="No athletes assigned")
+
+    filename = export_filename(collection, scope, start, end, format)
+    return StreamingResponse(
+        stream_export(collection, users, start, end, format, secondary=secondary),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -3,28 +3,34 @@
 from fastapi import APIRouter, Depends
 from coach_app.models.schemas import CoachProfile
 from coach_app.api.deps import get_current_coach
-from shared.database import db
+from shared.repositories import Repositories, get_repos
+from shared.roster import invalidate_coach_roster
+from shared.response_cache import bump_coach_version
 
 router = APIRouter()
 
 @router.get("/", response_model=CoachProfile)
-async def get_profile(coach=Depends(get_current_coach)):
+async def get_profile(coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
     print(f"[GET /profile] Authenticated coach: {coach['email']}")
-    profile = await db.coach_profile.find_one({"email": coach["email"]})
+    profile = await repos.coach_profile.find_one({"email": coach["email"]})
     return profile or CoachProfile(name="", email=coach["email"], contact="", sport="")
 
 @router.put("/")
-async def update_profile(data: CoachProfile, coach=Depends(get_current_coach)):
+async def update_profile(data: CoachProfile, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
     print(f"[PUT /profile] Updating coach profile: {data.dict()}")
-    await db.coach_profile.replace_one({"email": coach["email"]}, data.dict(), upsert=True)
+    await repos.coach_profile.replace_one({"email": coach["email"]}, data.dict(), upsert=True)
+    invalidate_coach_roster(coach["email"])
+    await bump_coach_version(coach["email"])
     return {"message": "Profile updated"}
 
 @router.post("/")
-async def create_profile(data: CoachProfile, coach=Depends(get_current_coach)):
+async def create_profile(data: CoachProfile, coach=Depends(get_current_coach), repos: Repositories = Depends(get_repos)):
     print(f"[POST /profile/] Creating coach profile for: {coach['email']}")
-    await db.coach_profile.replace_one(
+    await repos.coach_profile.replace_one(
         {"email": coach["email"]},
         data.dict(),
         upsert=True
     )
+    invalidate_coach_roster(coach["email"])
+    await bump_coach_version(coach["email"])
     return {"message": "Coach profile created"}
@@ -1,19 +1,21 @@
 # coach_app/api/routes/sessions.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from coach_app.api.deps import get_current_coach
-from shared.database import db
+from shared.database import read_db
+from shared.projections import build_projection, SESSION_FIELDS, SESSION_SUMMARY_PROJECTION
+from shared.responses import BSONJSONResponse
 from bson import ObjectId
+from typing import Optional
 
 router = APIRouter()
 
 @router.get("/session/logs/{athlete_id}")
-async def get_athlete_sessions(athlete_id: str, coach=Depends(get_current_coach)):
-    sessions = db.sessions.find({"user": athlete_id}, sort=[("start_time", -1)])
-    results = []
-    async for s in sessions:
-        s["_id"] = str(s["_id"])
-        results.append(s)
+async def get_athlete_sessions(athlete_id: str, fields: Optional[str] = Query(None), coach=Depends(get_current_coach)):
+    projection = build_projection(fields, SESSION_FIELDS, SESSION_SUMMARY_PROJECTION)
+    results = await read_db("coach").sessions.find(
+        {"user": athlete_id}, projection, sort=[("start_time", -1)]
+    ).to_list(length=None)
     if not results:
         raise HTTPException(status_code=404, detail=f"No sessions found for athlete: {athlete_id}")
-    return results
+    return BSONJSONResponse(results)
@@ -0,0 +1,92 @@
+# gunicorn_conf.py
+# Production entry point:
+#
+#   gunicorn -c gunicorn_conf.py main:app
+#
+# One uvicorn worker (uvloop + httptools) per available CPU. The app is
+# imported once in the master (preload_app) and, with PRELOAD_MODEL, the
+# model + scaler are unpickled there too, so forked workers share those
+# pages copy-on-write instead of each loading their own. MongoDB clients,
+# the ingest spool and the write-behind queue are opened per worker in the
+# lifespan (main.py), after the fork.
+#
+# On SIGTERM each worker stops accepting, gives in-flight requests up to
+# REQUEST_DRAIN_SECONDS, then runs the lifespan shutdown (flush the
+# write-behind queue, close the spool and the Motor pool). Gunicorn kills
+# anything still running after GRACEFUL_TIMEOUT.
+#
+# With more than one worker, per-process state has to be shared: the local
+# response cache would serve bodies and ETags that differ per worker, and
+# local rate-limit buckets would allow WEB_CONCURRENCY times the limit. So
+# RESPONSE_CACHE_BACKEND defaults to "mongo" and RATE_LIMIT_BACKEND to
+# "shared" here; setting either to "local" explicitly logs a warning.
+
+import os
+from uvicorn_worker import UvicornWorker
+
+
+def _cpu_count() -> int:
+    try:
+        # Honours container CPU sets, unlike os.cpu_count()
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or _cpu_count()
+worker_class = "gunicorn_conf.HydrationWorker"
+preload_app = _flag("PRELOAD_APP", "true")
+
+# 🧮 Backends every worker must agree on (read when the app is imported, after this)
+SHARED_BACKENDS = {"RESPONSE_CACHE_BACKEND": "mongo", "RATE_LIMIT_BACKEND": "shared"}
+if workers > 1:
+    for _name, _shared in SHARED_BACKENDS.items():
+        os.environ.setdefault(_name, _shared)
+
+# 🔌 Connection handling
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+backlog = int(os.getenv("BACKLOG", "2048"))
+
+# 🛑 Shutdown / liveness
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+REQUEST_DRAIN_SECONDS = int(os.getenv("REQUEST_DRAIN_SECONDS", str(max(graceful_timeout - 10, 1))))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("ACCESS_LOG") or None
+errorlog = "-"
+
+PRELOAD_MODEL = _flag("PRELOAD_MODEL", "true")
+
+
+class HydrationWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        # Leaves GRACEFUL_TIMEOUT - REQUEST_DRAIN_SECONDS for the lifespan shutdown
+        "timeout_graceful_shutdown": REQUEST_DRAIN_SECONDS,
+    }
+
+
+def on_starting(server):
+    if workers > 1:
+        for name, shared in SHARED_BACKENDS.items():
+            if os.environ.get(name) == "local":
+                server.log.warning(
+                    f"{name}=local with {workers} workers: each worker keeps its own state; use {shared}"
+                )
+
+
+def when_ready(server):
+    # Runs in the master after preload, before the first fork
+    if preload_app and PRELOAD_MODEL:
+        from athlete_app.core.model_loader import warm_model
+        if warm_model():
+            server.log.info("Model and scaler preloaded for copy-on-write sharing")
@@ -1,7 +1,9 @@
 # backend/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 import traceback
 
@@ -24,14 +26,66 @@ from coach_app.api.routes import (
     profile as coach_profile,
     sessions,
     account as coach_account,
-    alerts as coach_alerts
+    alerts as coach_alerts,
+    export as coach_export
 )
 
+from pymongo.errors import PyMongoError
+from shared.database import ensure_indexes_in_background
+from shared.admission import AdmissionMiddleware, render_metrics
+from shared.rate_limit import RateLimitMiddleware, render_metrics as render_rate_limit_metrics
+from shared.repositories import get_repositories, close_repositories
+from shared.athlete_state import athlete_state, ATHLETE_STATE_WARM
+from athlete_app.core.config import MODEL_WARMUP
+from athlete_app.core.model_loader import warm_model
+from athlete_app.services.ingest import start_ingest_workers, stop_ingest_workers
+from shared.coach_stats import start_coach_stats_reconcile, stop_coach_stats_reconcile
+
+# ⏱ Nothing above connects to MongoDB or loads pandas / scikit-learn; that
+# happens here, once per worker, after any fork
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 🔌 Open the database client, then the indexes used by the hot read paths.
+    # Best-effort: a MongoDB outage at boot retries in the background instead
+    # of keeping the worker down (ingest spools until the DB is back)
+    repos = get_repositories()
+    indexing = await ensure_indexes_in_background(repos)
+
+    # 📝 Background writers: started with the app, drained on shutdown
+    await start_ingest_workers()
+    start_coach_stats_reconcile()
+
+    # 🧠 Last-known athlete status + coach for alerting
+    if ATHLETE_STATE_WARM:
+        try:
+            await athlete_state.warm(repos)
+        except PyMongoError as e:
+            # Cold cache: entries load on first use instead
+            print("⚠️ Athlete state warm-up skipped:", e)
+
+    # 🔥 Model + scaler off the event loop
+    warmup = None
+    if MODEL_WARMUP == "blocking":
+        await asyncio.to_thread(warm_model)
+    elif MODEL_WARMUP == "background":
+        warmup = asyncio.create_task(asyncio.to_thread(warm_model))
+
+    yield
+
+    if warmup:
+        await warmup
+    if indexing:
+        indexing.cancel()
+    await stop_coach_stats_reconcile()
+    await stop_ingest_workers()
+    close_repositories()
+
 # Init FastAPI
 app = FastAPI(
     title="Smart Hydration API",
     version="1.0.0",
-    description="Unified API for athlete and coach apps"
+    description="Unified API for athlete and coach apps",
+    lifespan=lifespan
 )
 
 # 🌐 Middleware: Log requests with missing authorization
@@ -55,6 +109,14 @@ class LogRequestHeadersMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(LogRequestHeadersMiddleware)
 
+# 🚦 Admission control: ingest/alerts before dashboards before history/exports.
+# Inside CORS so shed responses still carry the CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
+# 🪣 Token buckets per token subject / route group, checked before admission
+# so a flooding client can't take admission slots from everyone else
+app.add_middleware(RateLimitMiddleware)
+
 # 🌍 CORS
 app.add_middleware(
     CORSMiddleware,
@@ -81,6 +143,12 @@ app.include_router(coach_profile.router, prefix="/profile", tags=["Coach Profile
 app.include_router(sessions.router, prefix="/coach", tags=["Coach Sessions"])
 app.include_router(coach_account.router, prefix="/coach/account", tags=["Coach Account"])
 app.include_router(coach_alerts.router, prefix="/coach/alerts", tags=["Coach Alerts"])
+app.include_router(coach_export.router, prefix="/coach/export", tags=["Coach Export"])
+
+# 📊 Queue depth / shed / rate-limit counters (Prometheus text format)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics() + render_rate_limit_metrics())
 
 # 🛑 Global Error Handler
 @app.middleware("http")
@@ -0,0 +1,122 @@
+# scripts/benchmark.py
+#
+#   python -m scripts.benchmark [--workers 1,2,4] [--clients 16] [--seconds 10]
+#                               [--path /data/ingest/status] [--token JWT]
+#
+# Starts `gunicorn -c gunicorn_conf.py main:app` once per worker count and
+# drives it with keep-alive clients (one process each), then reports req/s,
+# latency and scaling efficiency against the single-worker run. Defaults to
+# the in-memory repositories so the database isn't what's being measured.
+# The clients share the machine with the server: for clean numbers on many
+# cores, pin them elsewhere (taskset) or keep --clients below the core count.
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from scripts.cold_start import PROBE_PATH, wait_for_first_response
+
+
+def client_loop(port: int, path: str, headers: dict, seconds: float, queue):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    queue.put((latencies, errors))
+
+
+def run_load(port: int, path: str, headers: dict, clients: int, seconds: float) -> dict:
+    queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=client_loop, args=(port, path, headers, seconds, queue))
+        for _ in range(clients)
+    ]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies = sorted(l for lat, _ in results for l in lat)
+    if not latencies:
+        raise RuntimeError("no successful requests")
+    return {
+        "rps": len(latencies) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": sum(e for _, e in results),
+    }
+
+
+def start_server(workers: int, port: int, backend: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "REPOSITORY_BACKEND": backend,
+        "SPOOL_ENABLED": "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Throughput across worker counts")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--path", default="/data/ingest/status")
+    parser.add_argument("--token", help="bearer token for authenticated paths")
+    parser.add_argument("--backend", choices=["memory", "motor"], default="memory")
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        proc = start_server(workers, args.port, args.backend)
+        try:
+            wait_for_first_response(f"http://127.0.0.1:{args.port}{PROBE_PATH}", proc, timeout=60)
+            result = run_load(args.port, args.path, headers, args.clients, args.seconds)
+        except (RuntimeError, TimeoutError, urllib.error.URLError) as e:
+            print(f"❌ {workers} workers: {e}")
+            continue
+        finally:
+            proc.terminate()
+            proc.wait()
+
+        baseline = baseline or result["rps"] / workers
+        efficiency = result["rps"] / (baseline * workers)
+        print(
+            f"⚙️ {workers:>2} workers: {result['rps']:>8.0f} req/s  "
+            f"p50 {result['p50_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  "
+            f"errors {result['errors']}  scaling {efficiency:.0%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# scripts/cold_start.py
+#
+#   python -m scripts.cold_start [--runs 5] [--backend memory|motor] [--port 8765]
+#
+# Spawns a fresh uvicorn worker per run and times process start -> first
+# 200 from a cheap endpoint. The memory backend keeps MongoDB latency out
+# of the number; pass --backend motor to include index creation.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PROBE_PATH = "/data/ingest/status"
+
+
+def wait_for_first_response(url: str, proc: subprocess.Popen, timeout: float) -> float:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.monotonic()
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise TimeoutError(f"no response from {url} within {timeout}s")
+
+
+def cold_start(port: int, backend: str, timeout: float) -> float:
+    env = {**os.environ, "REPOSITORY_BACKEND": backend, "SPOOL_ENABLED": "false"}
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        return wait_for_first_response(f"http://127.0.0.1:{port}{PROBE_PATH}", proc, timeout) - started
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure cold start to first served request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", choices=["memory", "motor"], default="memory")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    times = []
+    for i in range(args.runs):
+        elapsed = cold_start(args.port, args.backend, args.timeout)
+        times.append(elapsed)
+        print(f"⏱ run {i + 1}: {elapsed * 1000:.0f} ms")
+    print(f"📊 median {statistics.median(times) * 1000:.0f} ms, best {min(times) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# scripts/export.py
+#
+#   python -m scripts.export --coach coach@example.com --start 2024-03-01 [--end ...]
+#   python -m scripts.export --athlete a@example.com --athlete b@example.com \
+#       --start 2024-03-01 --format parquet --collection sensor_data --out ./exports
+#
+# Streams straight from Mongo to disk, one chunk at a time.
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+from shared.export import (
+    EXPORT_COLLECTIONS, EXPORT_FORMATS, EXPORT_FROM_SECONDARY,
+    export_available, export_filename, stream_export, team_emails
+)
+from shared.rollups import history_window
+
+
+def _date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+async def export(args) -> int:
+    if not export_available(args.format):
+        print(f"❌ {args.format} export requires pyarrow")
+        return 1
+
+    start, end = history_window(args.start, args.end)
+    if args.athlete:
+        users, scope = args.athlete, args.athlete[0] if len(args.athlete) == 1 else "athletes"
+    else:
+        users, scope = await team_emails(args.coach), "team"
+    if not users:
+        print("❌ No athletes to export")
+        return 1
+
+    os.makedirs(args.out, exist_ok=True)
+    for collection in args.collection or EXPORT_COLLECTIONS:
+        path = os.path.join(args.out, export_filename(collection, scope, start, end, args.format))
+        size = 0
+        with open(path, "wb") as f:
+            async for chunk in stream_export(collection, users, start, end, args.format, secondary=not args.primary):
+                f.write(chunk)
+                size += len(chunk)
+        print(f"📦 {collection}: {size / 1024:.1f} KiB -> {path}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export athlete telemetry")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--coach", help="Export every athlete assigned to this coach email")
+    who.add_argument("--athlete", action="append", help="Athlete email (repeatable)")
+    parser.add_argument("--start", type=_date, required=True)
+    parser.add_argument("--end", type=_date)
+    parser.add_argument("--collection", action="append", choices=EXPORT_COLLECTIONS)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv.gz")
+    parser.add_argument("--out", default="./exports")
+    parser.add_argument("--primary", action="store_true", default=not EXPORT_FROM_SECONDARY,
+                        help="Read from the primary instead of a secondary")
+
+    return asyncio.run(export(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
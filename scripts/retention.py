@@ -0,0 +1,53 @@
+# scripts/retention.py
+#
+#   python -m scripts.retention run [--collection sensor_data ...] [--dry-run]
+#   python -m scripts.retention verify [--collection ...]
+#
+# TTLs: RETENTION_<COLLECTION>_DAYS (0 disables). Archives go to ARCHIVE_DIR.
+
+import argparse
+import asyncio
+import sys
+from shared.retention import RETENTION_DAYS, ARCHIVE_DIR, run_retention, verify_retention
+
+
+async def run(args) -> int:
+    results = await run_retention(args.collection, dry_run=args.dry_run)
+    for r in results:
+        if args.dry_run:
+            print(f"🧪 {r['collection']}: {r['expired']} rows older than {r['cutoff']:%Y-%m-%d %H:%M} ({r['days']}d)")
+        else:
+            print(f"📦 {r['collection']}: archived {r['archived']} rows into {len(r['files'])} files")
+    return 0
+
+
+async def verify(args) -> int:
+    report = await verify_retention(args.collection)
+    print(f"🔍 Checked {report['archives']} archives in {ARCHIVE_DIR}")
+    for collection, overdue in report["overdue"].items():
+        print(f"⏳ {collection}: {overdue} rows past TTL not archived yet")
+    for problem in report["problems"]:
+        print(f"❌ {problem}")
+    if report["problems"]:
+        return 1
+    print("✅ All archives intact")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Telemetry retention and archival")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Archive and delete rows past their TTL")
+    run_parser.add_argument("--collection", action="append", choices=sorted(RETENTION_DAYS))
+    run_parser.add_argument("--dry-run", action="store_true", help="Only count expired rows")
+
+    verify_parser = sub.add_parser("verify", help="Check archives against their manifest")
+    verify_parser.add_argument("--collection", action="append", choices=sorted(RETENTION_DAYS))
+
+    args = parser.parse_args()
+    return asyncio.run(run(args) if args.command == "run" else verify(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# shared/admission.py
+# Priority admission control for bursts (a whole team starting practice).
+#
+# Every request takes a slot from a per-worker pool of ADMISSION_MAX_CONCURRENCY
+# before it reaches the routes. Classes:
+#   high   - ingest and alerts; may use every slot
+#   normal - everything else; leaves ADMISSION_HIGH_RESERVED slots free
+#   low    - history and exports; at most ADMISSION_LOW_CONCURRENCY at once
+# When no slot is free a request waits in its class queue, and freed slots go
+# to the highest class first. A request that can't be queued (queue full) or
+# isn't admitted within its class's queue-time budget is shed with
+# Retry-After: 429 when only its class is over its share, 503 when the
+# whole worker is saturated.
+#
+# Pure ASGI middleware: shed requests never reach body parsing, auth or the
+# database. Counters are exposed in Prometheus text format (render_metrics).
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from shared.responses import send_json
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+ADMISSION_HIGH_RESERVED = int(os.getenv("ADMISSION_HIGH_RESERVED", "16"))
+ADMISSION_LOW_CONCURRENCY = int(os.getenv("ADMISSION_LOW_CONCURRENCY", "4"))
+
+HIGH, NORMAL, LOW = "high", "normal", "low"
+PRIORITY_ORDER = (HIGH, NORMAL, LOW)
+
+# Seconds a request may wait for a slot before it is shed
+QUEUE_BUDGETS = {
+    HIGH: float(os.getenv("ADMISSION_HIGH_QUEUE_SECONDS", "5")),
+    NORMAL: float(os.getenv("ADMISSION_NORMAL_QUEUE_SECONDS", "1")),
+    LOW: float(os.getenv("ADMISSION_LOW_QUEUE_SECONDS", "0.5")),
+}
+QUEUE_LIMITS = {
+    HIGH: int(os.getenv("ADMISSION_HIGH_QUEUE", "512")),
+    NORMAL: int(os.getenv("ADMISSION_NORMAL_QUEUE", "128")),
+    LOW: int(os.getenv("ADMISSION_LOW_QUEUE", "16")),
+}
+
+# Longest matching prefix wins; anything unlisted is NORMAL
+ROUTE_PRIORITIES = (
+    ("/data/raw-receive", HIGH),
+    ("/data/receive", HIGH),
+    ("/notifications", HIGH),
+    ("/coach/alerts", HIGH),
+    ("/data/history", LOW),
+    ("/athletes/history", LOW),
+    ("/coach/export", LOW),
+)
+# Cheap probes that must answer even while shedding
+EXEMPT_PATHS = ("/metrics", "/data/ingest/status", "/data/ping", "/data/time", "/docs", "/openapi.json", "/redoc")
+
+
+def classify(path: str) -> Optional[str]:
+    """Priority class for `path`, or None if it bypasses admission."""
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    best, best_len = NORMAL, -1
+    for prefix, priority in ROUTE_PRIORITIES:
+        if path.startswith(prefix) and len(prefix) > best_len:
+            best, best_len = priority, len(prefix)
+    return best
+
+
+class Shed(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        high_reserved: int = ADMISSION_HIGH_RESERVED,
+        low_concurrency: int = ADMISSION_LOW_CONCURRENCY,
+        queue_budgets: Dict[str, float] = QUEUE_BUDGETS,
+        queue_limits: Dict[str, int] = QUEUE_LIMITS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.class_limits = {
+            HIGH: max_concurrency,
+            NORMAL: max(max_concurrency - high_reserved, 1),
+            LOW: max(min(low_concurrency, max_concurrency - high_reserved), 1),
+        }
+        self.queue_budgets = dict(queue_budgets)
+        self.queue_limits = dict(queue_limits)
+        self.active = 0
+        self.in_flight = {c: 0 for c in PRIORITY_ORDER}
+        self._waiters = {c: deque() for c in PRIORITY_ORDER}
+        self.admitted = {c: 0 for c in PRIORITY_ORDER}
+        self.shed: Dict[Tuple[str, str], int] = {}
+        self.wait_seconds = {c: 0.0 for c in PRIORITY_ORDER}
+        # EWMA of time a slot is held, for Retry-After
+        self.service_seconds = 0.05
+
+    def _can_run(self, priority: str) -> bool:
+        return self.active < self.max_concurrency and self.in_flight[priority] < self.class_limits[priority]
+
+    def _take(self, priority: str):
+        self.active += 1
+        self.in_flight[priority] += 1
+        self.admitted[priority] += 1
+
+    def queue_depth(self, priority: str) -> int:
+        return sum(1 for f in self._waiters[priority] if not f.done())
+
+    def pressure(self) -> float:
+        """0 (idle) .. 1 (every slot busy with work queued behind it)."""
+        queued = sum(self.queue_depth(c) for c in PRIORITY_ORDER)
+        return min((self.active + queued) / (2 * self.max_concurrency), 1.0)
+
+    def retry_after(self, priority: str) -> int:
+        limit = self.class_limits[priority]
+        backlog = self.queue_depth(priority) + self.in_flight[priority] + 1
+        return max(1, math.ceil(self.service_seconds * backlog / limit))
+
+    def _shed(self, priority: str, reason: str) -> Shed:
+        self.shed[(priority, reason)] = self.shed.get((priority, reason), 0) + 1
+        # 429: this class is over its share while the worker still has room
+        status = 429 if self.active < self.max_concurrency else 503
+        return Shed(status, reason, self.retry_after(priority))
+
+    async def acquire(self, priority: str):
+        """Wait for a slot; raises Shed if the request should be rejected."""
+        if self._can_run(priority) and not self.queue_depth(priority):
+            self._take(priority)
+            return
+        if self.queue_depth(priority) >= self.queue_limits[priority]:
+            raise self._shed(priority, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_budgets[priority])
+        except asyncio.TimeoutError:
+            raise self._shed(priority, "queue_timeout")
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority, 0.0)
+            raise
+        finally:
+            self.wait_seconds[priority] += time.monotonic() - started
+            try:
+                self._waiters[priority].remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self, priority: str, held_seconds: float):
+        self.active -= 1
+        self.in_flight[priority] -= 1
+        if held_seconds:
+            self.service_seconds += 0.1 * (held_seconds - self.service_seconds)
+        # Freed slots go to the highest class that may run
+        for cls in PRIORITY_ORDER:
+            waiters = self._waiters[cls]
+            while waiters and self._can_run(cls):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self._take(cls)
+                waiter.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                c: {
+                    "in_flight": self.in_flight[c],
+                    "limit": self.class_limits[c],
+                    "queued": self.queue_depth(c),
+                    "admitted": self.admitted[c],
+                    "shed": sum(n for (cls, _), n in self.shed.items() if cls == c),
+                }
+                for c in PRIORITY_ORDER
+            },
+        }
+
+
+admission = AdmissionController()
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: Optional[AdmissionController] = None, enabled: bool = ADMISSION_ENABLED):
+        self.app = app
+        self.controller = controller or admission
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        priority = classify(scope["path"])
+        if priority is None or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.controller.acquire(priority)
+        except Shed as shed:
+            return await send_json(
+                send, shed.status_code,
+                {"detail": "Server busy, retry later", "reason": shed.reason},
+                {"Retry-After": shed.retry_after},
+            )
+
+        admitted = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(priority, time.monotonic() - admitted)
+
+
+def render_metrics(controller: Optional[AdmissionController] = None) -> str:
+    """Prometheus text exposition of the admission counters."""
+    c = controller or admission
+    lines = [
+        "# TYPE admission_active gauge",
+        f"admission_active {c.active}",
+        "# TYPE admission_pressure gauge",
+        f"admission_pressure {c.pressure():.3f}",
+        "# TYPE admission_in_flight gauge",
+        *(f'admission_in_flight{{class="{p}"}} {c.in_flight[p]}' for p in PRIORITY_ORDER),
+        "# TYPE admission_queue_depth gauge",
+        *(f'admission_queue_depth{{class="{p}"}} {c.queue_depth(p)}' for p in PRIORITY_ORDER),
+        "# TYPE admission_admitted_total counter",
+        *(f'admission_admitted_total{{class="{p}"}} {c.admitted[p]}' for p in PRIORITY_ORDER),
+        "# TYPE admission_queue_wait_seconds_total counter",
+        *(f'admission_queue_wait_seconds_total{{class="{p}"}} {c.wait_seconds[p]:.6f}' for p in PRIORITY_ORDER),
+        "# TYPE admission_shed_total counter",
+        *(f'admission_shed_total{{class="{p}",reason="{r}"}} {n}' for (p, r), n in sorted(c.shed.items())),
+    ]
+    return "\n".join(lines) + "\n"
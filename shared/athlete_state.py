@@ -0,0 +1,115 @@
+# shared/athlete_state.py
+# In-process last-known state per athlete (keyed by email): latest
+# hydration status / level and the assigned coach, so alerting can attribute
+# a reading to a coach without an athletes lookup per reading.
+#
+# Warmed from the `athletes` collection at startup and refreshed on every
+# live reading from the document the ingest path already swaps atomically
+# (find_one_and_update, ReturnDocument.BEFORE), which carries the previous
+# status and `assigned_by` for free.
+#
+# Multi-worker: each worker keeps its own copy. The atomic swap is the source
+# of truth for "what was the status before this reading" — when the previous
+# document isn't the one this worker wrote last, another worker handled the
+# athlete in between and record_write() hands back the previous level so the
+# alert engine can adopt it instead of re-announcing a transition. Coach
+# assignments drop the entry locally; the TTL bounds how stale other workers'
+# coach attribution can get until their next write for that athlete.
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from shared.repositories import get_repositories
+
+ATHLETE_STATE_TTL_SECONDS = float(os.getenv("ATHLETE_STATE_TTL_SECONDS", "300"))
+ATHLETE_STATE_CAPACITY = int(os.getenv("ATHLETE_STATE_CAPACITY", "50000"))
+ATHLETE_STATE_WARM = os.getenv("ATHLETE_STATE_WARM", "true").lower() in ("1", "true", "yes")
+
+STATE_PROJECTION = {"_id": 0, "email": 1, "status": 1, "hydration_level": 1, "assigned_by": 1}
+
+
+class AthleteStateCache:
+    def __init__(self, ttl_seconds: float = ATHLETE_STATE_TTL_SECONDS, capacity: int = ATHLETE_STATE_CAPACITY,
+                 clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self.clock = clock
+        # email -> {status, hydration_level, coach, own, loaded_at}
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.resyncs = 0
+
+    def _store(self, email: str, doc: dict, coach: Optional[str], own: bool):
+        self._entries[email] = {
+            "status": doc.get("status"),
+            "hydration_level": doc.get("hydration_level"),
+            "coach": coach,
+            "own": own,
+            "loaded_at": self.clock(),
+        }
+        self._entries.move_to_end(email)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def get(self, email: str) -> Optional[dict]:
+        entry = self._entries.get(email)
+        if entry is None or self.clock() - entry["loaded_at"] > self.ttl_seconds:
+            return None
+        return entry
+
+    async def warm(self, repos=None) -> int:
+        """Load up to `capacity` athletes' current state; returns how many."""
+        repos = repos or get_repositories()
+        docs = await repos.athletes.find({}, STATE_PROJECTION).to_list(length=self.capacity)
+        for doc in docs:
+            if "email" in doc:
+                self._store(doc["email"], doc, doc.get("assigned_by"), own=False)
+        return len(docs)
+
+    async def coach_for(self, email: str) -> Optional[str]:
+        entry = self.get(email)
+        if entry is not None:
+            self.hits += 1
+            return entry["coach"]
+        self.misses += 1
+        doc = await get_repositories().athletes.find_one({"email": email}, STATE_PROJECTION)
+        if doc is None:
+            return None
+        self._store(email, doc, doc.get("assigned_by"), own=False)
+        return doc.get("assigned_by")
+
+    def record_write(self, email: str, before: dict, after: dict) -> Optional[float]:
+        """
+        Remember the state this worker just wrote. `before` is the athletes
+        document as it was right before the write. Returns its hydration level
+        when this worker didn't write it (cold worker, or another worker took
+        the previous reading), else None.
+        """
+        entry = self._entries.get(email)
+        previous = before.get("hydration_level")
+        foreign = entry is None or not entry["own"] or entry["hydration_level"] != previous
+        self._store(email, after, before.get("assigned_by"), own=True)
+        if foreign and previous is not None:
+            self.resyncs += 1
+            return previous
+        return None
+
+    def forget(self, email: Optional[str] = None):
+        if email is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(email, None)
+
+    def stats(self) -> Dict:
+        return {
+            "tracked": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "resyncs": self.resyncs,
+        }
+
+
+athlete_state = AthleteStateCache()
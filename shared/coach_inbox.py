@@ -0,0 +1,130 @@
+# shared/coach_inbox.py
+# Per-coach alert inbox (fan-out on write).
+#
+# Every status-change alert is also pushed as a compact entry into a
+# `coach_inbox` bucket keyed by (coach, day), so the coach alert feed is a
+# single-key range read instead of an $in scatter over the whole alerts
+# collection. Buckets are capped at COACH_INBOX_BUCKET_CAP entries.
+#
+# Entries are keyed by alert_id: a push only lands in a bucket that doesn't
+# hold that alert yet, so a backfill racing a live append (or running twice)
+# can't duplicate entries. `coach_inbox_seeds` records, per coach, which
+# athletes' history has been backfilled; athletes joining the roster later
+# are backfilled on the next feed read instead of showing only new alerts.
+
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from shared.repositories import get_repositories
+from shared.database import read_db
+
+COACH_INBOX_BUCKET_CAP = int(os.getenv("COACH_INBOX_BUCKET_CAP", "500"))
+COACH_INBOX_DAYS = int(os.getenv("COACH_INBOX_DAYS", "30"))
+
+INBOX_FIELDS = (
+    "athlete_id",
+    "alert_type",
+    "title",
+    "description",
+    "hydration_level",
+    "hydration_status",
+    "status_change",
+    "status",
+    "source",
+    "coach_message",
+    "coach_name",
+    "timestamp",
+)
+
+
+def _day(ts: datetime) -> str:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.strftime("%Y-%m-%d")
+
+
+def inbox_entry(alert_id: ObjectId, alert_doc: dict) -> dict:
+    entry = {"alert_id": alert_id}
+    for field in INBOX_FIELDS:
+        if field in alert_doc:
+            entry[field] = alert_doc[field]
+    return entry
+
+
+async def _push_entries(coach_email: str, day: str, entries: List[dict]):
+    """Push entries into the (coach, day) bucket unless it already holds one of them."""
+    repos = get_repositories()
+    query = {"coach": coach_email, "day": day, "alerts.alert_id": {"$nin": [e["alert_id"] for e in entries]}}
+    update = {
+        "$push": {"alerts": {"$each": entries, "$slice": -COACH_INBOX_BUCKET_CAP}},
+        "$inc": {"count": len(entries)},
+    }
+    try:
+        await repos.coach_inbox.update_one(query, update, upsert=True)
+        return
+    except DuplicateKeyError:
+        # The bucket exists: either another append created it first (Mongo
+        # doesn't retry upserts with a $nin filter) or it holds one of these
+        pass
+    result = await repos.coach_inbox.update_one(query, update)
+    if result.matched_count == 0 and len(entries) > 1:
+        # Holds some of them already: sort it out one by one
+        for entry in entries:
+            await _push_entries(coach_email, day, [entry])
+
+
+async def append_to_inbox(coach_email: str, alert_id: ObjectId, alert_doc: dict):
+    await _push_entries(coach_email, _day(alert_doc["timestamp"]), [inbox_entry(alert_id, alert_doc)])
+
+
+async def read_inbox(coach_email: str, days: int = COACH_INBOX_DAYS) -> List[dict]:
+    """Newest-first inbox entries for the last `days` buckets."""
+    buckets = await read_db("coach").coach_inbox.find(
+        {"coach": coach_email}, {"alerts": 1}
+    ).sort("day", -1).limit(days).to_list(length=None)
+
+    entries = []
+    for bucket in buckets:
+        # Entries are appended in arrival order, so walk each day backwards
+        entries.extend(sorted(bucket.get("alerts", []), key=lambda e: e["timestamp"], reverse=True))
+    return entries
+
+
+async def unseeded_athletes(coach_email: str, athletes: List[str]) -> List[str]:
+    """Athletes whose alert history isn't in the coach's inbox yet."""
+    seeds = await get_repositories().coach_inbox_seeds.find_one({"_id": coach_email}, {"athletes": 1})
+    seeded = set(seeds.get("athletes", [])) if seeds else set()
+    return [a for a in athletes if a not in seeded]
+
+
+async def backfill_inbox(coach_email: str, athletes: List[str], alert_docs: List[dict]):
+    """
+    Seed a coach's inbox with `athletes`' history (docs still carry `_id`)
+    and mark them seeded. Safe to repeat.
+    """
+    by_day = defaultdict(list)
+    for doc in alert_docs:
+        by_day[_day(doc["timestamp"])].append(inbox_entry(doc["_id"], doc))
+
+    repos = get_repositories()
+    for day, entries in by_day.items():
+        bucket = await repos.coach_inbox.find_one({"coach": coach_email, "day": day}, {"alerts.alert_id": 1})
+        held = {e["alert_id"] for e in bucket.get("alerts", [])} if bucket else set()
+        entries = sorted((e for e in entries if e["alert_id"] not in held), key=lambda e: e["timestamp"])
+        if entries:
+            await _push_entries(coach_email, day, entries)
+
+    await repos.coach_inbox_seeds.update_one(
+        {"_id": coach_email}, {"$addToSet": {"athletes": {"$each": athletes}}}, upsert=True
+    )
+
+
+async def resolve_in_inbox(alert_id: ObjectId, status: str = "resolved"):
+    repos = get_repositories()
+    await repos.coach_inbox.update_many(
+        {"alerts.alert_id": alert_id},
+        {"$set": {"alerts.$.status": status}},
+    )
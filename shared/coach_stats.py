@@ -0,0 +1,157 @@
+# shared/coach_stats.py
+# Running per-coach dashboard aggregates.
+#
+# One `coach_stats` document per coach holds the athlete count, the sum of
+# their hydration levels and a count per status. Writers push deltas with
+# $inc, so the dashboard is a single document read instead of loading the
+# whole roster. If a coach has no stats document yet it's rebuilt from the
+# athletes collection on first read; deltas are only applied to existing
+# documents, so a delta landing while that first rebuild runs is dropped.
+# The rebuild aggregates again once its document exists, and a background
+# reconcile re-derives every coach's document from the athletes collection
+# so anything a race (or a direct DB edit) skews heals within one interval.
+
+import asyncio
+import logging
+import os
+from typing import Optional
+from shared.repositories import get_repositories
+from shared.database import read_db
+from shared.response_cache import bump_coach_version
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the background reconcile
+COACH_STATS_RECONCILE_SECONDS = float(os.getenv("COACH_STATS_RECONCILE_SECONDS", "600"))
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def _status(value) -> str:
+    # AthleteDBEntry.dict() leaves the HydrationStatus enum in place
+    return getattr(value, "value", value) or "Unknown"
+
+
+def _level(value) -> float:
+    return value if isinstance(value, (int, float)) else 0
+
+
+async def record_athlete_change(coach_email: Optional[str], before: Optional[dict], after: Optional[dict]):
+    """
+    Apply one athlete's level/status change to their coach's aggregates.
+    `before` is None when the athlete has just joined the coach, `after` is
+    None when they've been removed from (or unassigned by) the coach.
+    """
+    repos = get_repositories()
+    if not coach_email or (before is None and after is None):
+        return
+
+    if after is None:
+        inc = {
+            "total_athletes": -1,
+            "hydration_sum": -_level(before.get("hydration_level")),
+            f"status_counts.{_status(before.get('status'))}": -1,
+        }
+    elif before is None:
+        after_status = _status(after.get("status"))
+        inc = {
+            "total_athletes": 1,
+            "hydration_sum": _level(after.get("hydration_level")),
+            f"status_counts.{after_status}": 1,
+        }
+    else:
+        after_level = _level(after.get("hydration_level"))
+        after_status = _status(after.get("status"))
+        before_level = _level(before.get("hydration_level"))
+        before_status = _status(before.get("status"))
+        if before_level == after_level and before_status == after_status:
+            return
+
+        inc = {"hydration_sum": after_level - before_level}
+        if before_status != after_status:
+            inc[f"status_counts.{before_status}"] = -1
+            inc[f"status_counts.{after_status}"] = 1
+
+    await repos.coach_stats.update_one({"coach": coach_email}, {"$inc": inc})
+    await bump_coach_version(coach_email, "dashboard")
+
+
+async def _aggregate(coach_email: str) -> dict:
+    repos = get_repositories()
+    pipeline = [
+        {"$match": {"assigned_by": coach_email}},
+        {"$group": {
+            "_id": "$status",
+            "count": {"$sum": 1},
+            "hydration_sum": {"$sum": {"$ifNull": ["$hydration_level", 0]}},
+        }},
+    ]
+    groups = await repos.athletes.aggregate(pipeline).to_list(length=None)
+
+    stats = {
+        "coach": coach_email,
+        "total_athletes": sum(g["count"] for g in groups),
+        "hydration_sum": sum(g["hydration_sum"] for g in groups),
+        "status_counts": {_status(g["_id"]): g["count"] for g in groups},
+    }
+    return stats
+
+
+async def rebuild_coach_stats(coach_email: str) -> dict:
+    """
+    Re-derive a coach's aggregates from the athletes collection. $set, not
+    $setOnInsert: concurrent rebuilds each write a full fresh snapshot.
+    """
+    repos = get_repositories()
+    stats = await _aggregate(coach_email)
+    result = await repos.coach_stats.update_one({"coach": coach_email}, {"$set": stats}, upsert=True)
+    if result.upserted_id is not None:
+        # Deltas written before our insert found no document and were
+        # dropped; their athlete writes are visible to a second pass
+        stats = await _aggregate(coach_email)
+        await repos.coach_stats.update_one({"coach": coach_email}, {"$set": stats})
+    return stats
+
+
+async def reconcile_coach_stats() -> int:
+    """Rebuild every existing stats document; returns how many were checked."""
+    repos = get_repositories()
+    docs = await repos.coach_stats.find({}, {"_id": 0}).to_list(length=None)
+    for doc in docs:
+        stats = await rebuild_coach_stats(doc["coach"])
+        if stats != doc:
+            await bump_coach_version(doc["coach"], "dashboard")
+    return len(docs)
+
+
+async def get_coach_stats(coach_email: str) -> dict:
+    stats = await read_db("coach").coach_stats.find_one({"coach": coach_email}, {"_id": 0})
+    if stats is None:
+        stats = await rebuild_coach_stats(coach_email)
+    return stats
+
+
+async def _reconcile_loop():
+    while True:
+        await asyncio.sleep(COACH_STATS_RECONCILE_SECONDS)
+        try:
+            await reconcile_coach_stats()
+        except Exception:
+            logger.exception("Coach stats reconcile failed")
+
+
+def start_coach_stats_reconcile():
+    global _reconcile_task
+    if COACH_STATS_RECONCILE_SECONDS > 0 and _reconcile_task is None:
+        _reconcile_task = asyncio.create_task(_reconcile_loop())
+
+
+async def stop_coach_stats_reconcile():
+    global _reconcile_task
+    if _reconcile_task:
+        _reconcile_task.cancel()
+        try:
+            await _reconcile_task
+        except asyncio.CancelledError:
+            pass
+        _reconcile_task = None
@@ -1,15 +1,168 @@
 # shared/database.py
-from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+load_dotenv()
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 import os
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb+srv://<user>:<pass>@cluster.mongodb.net/")
 DB_NAME = os.getenv("DB_NAME", "hydration_db")
+# Seconds between index creation attempts while MongoDB is unreachable at boot
+INDEX_RETRY_SECONDS = float(os.getenv("INDEX_RETRY_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+# 🔌 Opened on first use (normally the app lifespan), so importing the app,
+# the tests or a CLI script doesn't pay for Motor or a client.
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _client = AsyncIOMotorClient(MONGO_URI)
+    return _client
+
+
+def get_db():
+    # Writes (and anything not routed below) always use the primary
+    return get_client()[DB_NAME]
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def __getattr__(name: str):
+    # `from shared.database import db` / `client` still work, lazily
+    if name == "db":
+        return get_db()
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 📖 Read-preference policy per route group; override with READ_PREFERENCE_<GROUP>.
+# Ingest stays on the primary; heavy coach/analytics reads may use secondaries
+# that lag the primary by at most READ_MAX_STALENESS_SECONDS.
+READ_POLICIES = {
+    "ingest": os.getenv("READ_PREFERENCE_INGEST", "primary"),
+    "coach": os.getenv("READ_PREFERENCE_COACH", "secondaryPreferred"),
+    "history": os.getenv("READ_PREFERENCE_HISTORY", "secondaryPreferred"),
+    "export": os.getenv("READ_PREFERENCE_EXPORT", "secondaryPreferred"),
+}
+# The server rejects anything under 90s
+READ_MAX_STALENESS_SECONDS = max(int(os.getenv("READ_MAX_STALENESS_SECONDS", "90")), 90)
+
+_READ_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+def read_preference(mode: str):
+    if mode == "primary":
+        return Primary()
+    if mode not in _READ_MODES:
+        raise ValueError(f"Unknown read preference: {mode}")
+    return _READ_MODES[mode](max_staleness=READ_MAX_STALENESS_SECONDS)
+
+
+def read_mode(group: str) -> str:
+    if _primary_reads.get():
+        return "primary"
+    return READ_POLICIES.get(group, "primary")
+
+
+def read_db(group: str):
+    """Repositories for reads in `group`, honouring its read preference."""
+    from shared.repositories import get_repositories
+    return get_repositories().read(read_mode(group))
+
+
+@contextmanager
+def primary_reads():
+    """Force read_db() onto the primary, e.g. right after a write the reader must see."""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+async def ensure_indexes(repos=None):
+    from shared.repositories import get_repositories
+    repos = repos or get_repositories()
+
+    # 🚨 Coach alert feed: athlete_id $in + status_change, newest first
+    await repos.alerts.create_index([("athlete_id", 1), ("status_change", 1), ("timestamp", -1)])
+    await repos.athletes.create_index("assigned_by")
+    # ⚡ Latest-reading lookups ($lookup on user, newest first)
+    await repos.sensor_data.create_index([("user", 1), ("timestamp", -1)])
+    await repos.predictions.create_index([("user", 1), ("timestamp", -1)])
+    await repos.alerts.create_index([("athlete_id", 1), ("timestamp", -1)])
+    # 🔑 Per-request user / athlete / session lookups
+    await repos.users.create_index("email")
+    await repos.users.create_index("username")
+    await repos.athletes.create_index("email")
+    await repos.sessions.create_index([("user", 1), ("start_time", -1)])
+    # 🪣 Idle shared rate-limit buckets (RATE_LIMIT_BACKEND=shared)
+    await repos.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    # 📡 One aggregated sensor_warnings document per device per window
+    await repos.sensor_warnings.create_index([("user", 1), ("device", 1), ("window_start", -1)])
+    # 📥 Coach inbox buckets + resolve propagation
+    await repos.coach_inbox.create_index([("coach", 1), ("day", -1)], unique=True)
+    await repos.coach_inbox.create_index("alerts.alert_id")
+    await repos.coach_stats.create_index("coach", unique=True)
+    # 🔁 Retried device readings (ingest_key = email:device time)
+    for collection in (repos.sensor_data, repos.predictions):
+        await collection.create_index(
+            "ingest_key", unique=True,
+            partialFilterExpression={"ingest_key": {"$exists": True}}
+        )
+    # 📦 Retention archive manifest
+    await repos.archives.create_index([("collection", 1), ("start", 1)])
+    await repos.vitals_rollups.create_index([("user", 1), ("res", 1), ("start", 1)], unique=True)
+
+async def _retry_indexes(repos, retry_seconds: float):
+    while True:
+        await asyncio.sleep(retry_seconds)
+        try:
+            await ensure_indexes(repos)
+        except PyMongoError as e:
+            logger.warning("Index creation still failing: %s", e)
+        else:
+            logger.info("Indexes created after startup")
+            return
 
-client = AsyncIOMotorClient(MONGO_URI)
-db = client[DB_NAME]
+async def ensure_indexes_in_background(repos=None, retry_seconds: float = INDEX_RETRY_SECONDS) -> Optional[asyncio.Task]:
+    """
+    ensure_indexes() that never keeps a worker from starting: if MongoDB is
+    unreachable it logs and keeps retrying in a task, returned so the caller
+    can cancel it on shutdown. None when the indexes went in straight away.
+    """
+    try:
+        await ensure_indexes(repos)
+    except PyMongoError as e:
+        logger.warning("Index creation failed, retrying every %ss: %s", retry_seconds, e)
+        return asyncio.create_task(_retry_indexes(repos, retry_seconds))
+    return None
 
 async def coach_exists(name: str) -> bool:
-    coach = await db["users"].find_one({
+    from shared.repositories import get_repositories
+    coach = await get_repositories().users.find_one({
         "name": name.strip(),
         "role": "coach"
     })  
@@ -0,0 +1,259 @@
+# shared/export.py
+# Streamed bulk export of sensor_data / predictions.
+#
+# Rows come off a Motor cursor `EXPORT_CHUNK_ROWS` at a time and each chunk
+# is encoded and handed to the caller before the next one is fetched, so
+# memory stays flat however long the time range is. Parquet (one row group
+# per chunk) and Arrow IPC stream need pyarrow; gzip CSV works everywhere.
+# Values that don't fit the Parquet / Arrow schema the first chunk set end up
+# in the `_extra` JSON column instead of failing the export midway.
+
+import os
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+import orjson
+from shared.repositories import get_repositories
+from shared.database import read_db
+from shared.retention import flatten_row
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+# Exports are long scans; use the "export" read policy (shared/database.py)
+# rather than the primary unless told otherwise
+EXPORT_FROM_SECONDARY = os.getenv("EXPORT_FROM_SECONDARY", "true").lower() in ("1", "true", "yes")
+
+EXPORT_COLLECTIONS = ("sensor_data", "predictions")
+EXPORT_FORMATS = ("parquet", "arrow", "csv.gz")
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv.gz": "application/gzip",
+}
+
+EXPORT_PROJECTION = {"ingest_key": 0}
+
+# Parquet / Arrow: JSON object of the values that didn't fit the schema
+EXTRA_COLUMN = "_extra"
+
+
+def export_available(fmt: str) -> bool:
+    if fmt == "csv.gz":
+        return True
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def team_emails(coach_email: str) -> List[str]:
+    repos = get_repositories()
+    cursor = repos.athletes.find({"assigned_by": coach_email}, {"_id": 0, "email": 1})
+    return [a["email"] async for a in cursor if a.get("email")]
+
+
+# ---------- chunk writers ----------
+
+class _Buffer:
+    """Write-only file object the pyarrow writers flush into; drained per chunk."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, b) -> int:
+        self.data += b
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = bytes(self.data)
+        self.data.clear()
+        return out
+
+
+class CsvGzWriter:
+    def __init__(self):
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self._columns = None
+
+    def write(self, rows: List[dict]) -> bytes:
+        import pandas as pd
+
+        header = self._columns is None
+        if header:
+            self._columns = list(pd.DataFrame(rows[:1]).columns)
+        # Later chunks are aligned to the first chunk's columns
+        text = pd.DataFrame(rows, columns=self._columns).to_csv(index=False, header=header)
+        return self._gzip.compress(text.encode())
+
+    def close(self) -> bytes:
+        return self._gzip.flush()
+
+
+class _ArrowWriter(ABC):
+    """
+    Parquet / Arrow IPC chunk writer. An open file or stream can't change its
+    schema, so the first chunk fixes it: numbers as float64, bools, UTC
+    timestamps, everything else as string, plus EXTRA_COLUMN. Anything a
+    later chunk carries that doesn't fit (a column the first chunk didn't
+    have, "n/a" where a number was) goes to EXTRA_COLUMN as a JSON object,
+    so no chunk can fail the export once the response has started.
+    """
+
+    def __init__(self):
+        self._sink = _Buffer()
+        self._schema = None
+        self._writer = None
+        self._accepts = {}
+
+    @abstractmethod
+    def _open(self, schema):
+        """pyarrow writer for `schema` over self._sink."""
+
+    @staticmethod
+    def _column_type(values):
+        import pyarrow as pa
+
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                return pa.bool_()
+            if isinstance(value, (int, float)):
+                return pa.float64()
+            if isinstance(value, datetime):
+                return pa.timestamp("us", tz="UTC")
+            return pa.string()
+        return pa.string()
+
+    def _infer_schema(self, rows: List[dict]):
+        import pyarrow as pa
+
+        columns = [c for c in dict.fromkeys(k for row in rows for k in row) if c != EXTRA_COLUMN]
+        fields = [(c, self._column_type(row.get(c) for row in rows)) for c in columns]
+        return pa.schema(fields + [(EXTRA_COLUMN, pa.string())])
+
+    def _set_schema(self, schema):
+        import pyarrow as pa
+
+        self._schema = schema
+        for field in schema:
+            if pa.types.is_boolean(field.type):
+                self._accepts[field.name] = (bool,)
+            elif pa.types.is_floating(field.type):
+                self._accepts[field.name] = (int, float)
+            elif pa.types.is_timestamp(field.type):
+                self._accepts[field.name] = (datetime,)
+            else:
+                self._accepts[field.name] = (str,)
+        self._accepts.pop(EXTRA_COLUMN, None)
+
+    def _fits(self, column: str, value) -> bool:
+        accepts = self._accepts.get(column)
+        if accepts is None:
+            return False
+        if value is None:
+            return True
+        # bool is an int subclass; keep True out of float columns and vice versa
+        return isinstance(value, accepts) and (isinstance(value, bool) == (bool in accepts))
+
+    def _table(self, rows: List[dict]):
+        import pyarrow as pa
+
+        data = {name: [] for name in self._schema.names}
+        for row in rows:
+            extra = {}
+            for column in self._accepts:
+                value = row.get(column)
+                if not self._fits(column, value):
+                    extra[column], value = value, None
+                data[column].append(value)
+            extra.update((k, v) for k, v in row.items() if k not in self._accepts)
+            data[EXTRA_COLUMN].append(orjson.dumps(extra, default=str).decode() if extra else None)
+        return pa.Table.from_pydict(data, schema=self._schema)
+
+    def write(self, rows: List[dict]) -> bytes:
+        if self._writer is None:
+            self._set_schema(self._infer_schema(rows))
+            self._writer = self._open(self._schema)
+        self._writer.write_table(self._table(rows))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._set_schema(pa.schema([("_id", pa.string()), (EXTRA_COLUMN, pa.string())]))
+            self._writer = self._open(self._schema)
+        self._writer.close()
+        return self._sink.drain()
+
+
+class ParquetWriter(_ArrowWriter):
+    def _open(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self._sink, schema, compression="zstd")
+
+
+class ArrowStreamWriter(_ArrowWriter):
+    def _open(self, schema):
+        import pyarrow as pa
+        return pa.ipc.new_stream(self._sink, schema)
+
+
+WRITERS = {"parquet": ParquetWriter, "arrow": ArrowStreamWriter, "csv.gz": CsvGzWriter}
+
+
+# ---------- export ----------
+
+def export_cursor(collection: str, users: List[str], start: datetime, end: datetime,
+                  secondary: bool = EXPORT_FROM_SECONDARY, batch_size: int = EXPORT_CHUNK_ROWS):
+    coll = (read_db("export") if secondary else get_repositories())[collection]
+    # (user, timestamp) index order: no in-memory sort
+    return coll.find(
+        {"user": {"$in": users}, "timestamp": {"$gte": start, "$lt": end}},
+        EXPORT_PROJECTION,
+        batch_size=batch_size,
+    ).sort([("user", 1), ("timestamp", 1)])
+
+
+async def stream_export(
+    collection: str,
+    users: List[str],
+    start: datetime,
+    end: datetime,
+    fmt: str = "csv.gz",
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    secondary: Optional[bool] = None,
+) -> AsyncIterator[bytes]:
+    if collection not in EXPORT_COLLECTIONS:
+        raise ValueError(f"Unsupported collection: {collection}")
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if not export_available(fmt):
+        raise ValueError(f"{fmt} export requires pyarrow")
+
+    secondary = EXPORT_FROM_SECONDARY if secondary is None else secondary
+    writer = WRITERS[fmt]()
+    chunk = []
+    async for doc in export_cursor(collection, users, start, end, secondary, chunk_rows):
+        chunk.append(flatten_row(doc))
+        if len(chunk) >= chunk_rows:
+            yield writer.write(chunk)
+            chunk = []
+    if chunk:
+        yield writer.write(chunk)
+    yield writer.close()
+
+
+def export_filename(collection: str, scope: str, start: datetime, end: datetime, fmt: str) -> str:
+    safe_scope = "".join(c if c.isalnum() or c in "-_." else "_" for c in scope)
+    return f"{collection}-{safe_scope}-{start:%Y%m%d}-{end:%Y%m%d}.{fmt}"
@@ -0,0 +1,172 @@
+# shared/hydration.py
+# Hydration status thresholds and every mapping hanging off them, in one place.
+#
+# A level is classified by where it falls in THRESHOLDS (searchsorted,
+# side="right": a level equal to a cutoff belongs to the band above it):
+#
+#   code 0  level <  70        "dehydrated"           "Dehydrated"
+#   code 1  70 <= level < 85   "slightly_dehydrated"  "Slightly Dehydrated"
+#   code 2  level >= 85        "hydrated"             "Hydrated"
+#
+# Codes index straight into the key / label / percent / alert tables, so a
+# batch of readings is classified with one np.searchsorted call and mapped
+# with fancy indexing; single readings go through bisect over the same
+# cutoffs (identical semantics, without the array round trip).
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Optional, Sequence
+import numpy as np
+
+THRESHOLDS = (70.0, 85.0)
+_THRESHOLD_ARRAY = np.array(THRESHOLDS)
+
+# Indexed by code (ascending hydration)
+STATUS_KEYS = ("dehydrated", "slightly_dehydrated", "hydrated")
+STATUS_LABELS = ("Dehydrated", "Slightly Dehydrated", "Hydrated")
+# Level stored for a model label; each sits inside its own band
+STATUS_PERCENTS = (65, 75, 90)
+
+# Model output classes (see services/preprocess.HYDRATION_LABELS)
+MODEL_CLASSES = ("Hydrated", "Slightly Dehydrated", "Dehydrated")
+
+UNKNOWN_LABEL = "Unknown"
+UNKNOWN_PERCENT = 0
+
+_KEY_ARRAY = np.array(STATUS_KEYS)
+_LABEL_ARRAY = np.array(STATUS_LABELS)
+_PERCENT_ARRAY = np.array(STATUS_PERCENTS)
+_CODE_BY_LABEL = {label: code for code, label in enumerate(STATUS_LABELS)}
+_CODE_BY_KEY = {key: code for code, key in enumerate(STATUS_KEYS)}
+
+PERCENT_BY_LABEL: Dict[str, int] = dict(zip(STATUS_LABELS, STATUS_PERCENTS))
+LABEL_BY_KEY: Dict[str, str] = dict(zip(STATUS_KEYS, STATUS_LABELS))
+
+ALERT_TEMPLATES = {
+    "dehydrated": {
+        "type": "DEHYDRATED",
+        "title": "Critical Hydration Alert",
+        "description": (
+            "You are in a dehydrated state! Immediate hydration is recommended to prevent fatigue and performance decline."
+        )
+    },
+    "slightly_dehydrated": {
+        "type": "SLIGHTLY DEHYDRATED",
+        "title": "Hydration Warning",
+        "description": (
+            "You are slightly dehydrated. Drink 250mL of water to maintain optimal performance."
+        )
+    },
+    "hydrated": {
+        "type": "HYDRATED",
+        "title": "Daily Hydration Goal Reminder",
+        "description": (
+            "You’ve consumed 1.5L of water today. Keep going!\nYour daily hydration goal is 2.5L."
+        )
+    },
+}
+
+# Back to "hydrated" from a worse status (the HYDRATED template above is the
+# daily goal reminder, which says nothing about the recovery)
+RECOVERY_TEMPLATE = {
+    "type": "HYDRATED",
+    "title": "Hydration Restored",
+    "description": (
+        "Your hydration is back in the optimal range. Keep sipping regularly to stay there."
+    )
+}
+
+COACH_SUMMARIES = {
+    "dehydrated": "The athlete is in a dehydrated state with hydration at {level:.0f}%. Immediate attention is recommended.",
+    "slightly_dehydrated": "The athlete's hydration level has dropped to {level:.0f}%. Encourage water intake soon.",
+    "hydrated": "The athlete is well-hydrated at {level:.0f}%. No immediate action needed.",
+}
+
+
+# ---------- single readings ----------
+
+def status_code(level: float) -> int:
+    return bisect_right(THRESHOLDS, level)
+
+
+def status_key(level: float) -> str:
+    return STATUS_KEYS[bisect_right(THRESHOLDS, level)]
+
+
+def status_label(level: float) -> str:
+    return STATUS_LABELS[bisect_right(THRESHOLDS, level)]
+
+
+def status_rank(key: str) -> int:
+    """0 = best hydrated; higher is worse."""
+    return len(STATUS_KEYS) - 1 - _CODE_BY_KEY[key]
+
+
+def percent_for_label(label: str) -> int:
+    return PERCENT_BY_LABEL.get(label, UNKNOWN_PERCENT)
+
+
+def label_for_prediction(prediction: Any) -> str:
+    """Model output (class index or label) -> label; "Unknown" otherwise."""
+    if isinstance(prediction, str):
+        return prediction if prediction in _CODE_BY_LABEL else UNKNOWN_LABEL
+    try:
+        return MODEL_CLASSES[int(prediction)]
+    except (ValueError, TypeError, IndexError):
+        return UNKNOWN_LABEL
+
+
+def alert_template(level: float) -> dict:
+    return ALERT_TEMPLATES[status_key(level)]
+
+
+def transition_template(key: str, previous: Optional[str] = None) -> dict:
+    """Template for an alert about moving to status `key` from `previous`."""
+    if key == "hydrated" and previous not in (None, "hydrated"):
+        return RECOVERY_TEMPLATE
+    return ALERT_TEMPLATES[key]
+
+
+def coach_summary(level: float) -> str:
+    return COACH_SUMMARIES[status_key(level)].format(level=level)
+
+
+# ---------- batches ----------
+
+def status_codes(levels: Iterable[float]) -> np.ndarray:
+    return np.searchsorted(_THRESHOLD_ARRAY, np.asarray(levels, dtype=float), side="right")
+
+
+def status_keys(levels: Iterable[float]) -> np.ndarray:
+    return _KEY_ARRAY[status_codes(levels)]
+
+
+def status_labels(levels: Iterable[float]) -> np.ndarray:
+    return _LABEL_ARRAY[status_codes(levels)]
+
+
+def percents_for_labels(labels: Iterable[str]) -> np.ndarray:
+    """Unknown labels map to UNKNOWN_PERCENT."""
+    codes = np.array([_CODE_BY_LABEL.get(label, -1) for label in labels], dtype=int)
+    return np.where(codes >= 0, _PERCENT_ARRAY[codes.clip(0)], UNKNOWN_PERCENT)
+
+
+def count_labels(levels: Iterable[float]) -> Dict[str, int]:
+    """Readings per status label, e.g. for a rollup bucket's `states`."""
+    counts = np.bincount(status_codes(levels), minlength=len(STATUS_LABELS))
+    return {label: int(n) for label, n in zip(STATUS_LABELS, counts)}
+
+
+# ---------- MongoDB ----------
+
+def status_label_expr(field: str = "$hydration_level", labels: Sequence[str] = STATUS_LABELS) -> dict:
+    """
+    Aggregation expression classifying `field` with the same cutoffs, into
+    `labels` (indexed by code; pass STATUS_KEYS for the snake_case keys).
+    """
+    return {"$switch": {
+        "branches": [
+            {"case": {"$lt": [field, cutoff]}, "then": label}
+            for cutoff, label in zip(THRESHOLDS, labels)
+        ],
+        "default": labels[-1],
+    }}
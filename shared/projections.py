@@ -0,0 +1,100 @@
+# shared/projections.py
+# Declared per-endpoint projections + the opt-in `fields=` query parameter.
+#
+# Read routes ask Mongo for only the fields the clients render. Callers that
+# need more can pass `fields=a,b,c` (dotted paths allowed) as long as the
+# top-level names are in the endpoint's allowed set.
+
+from typing import Iterable, Optional
+from fastapi import HTTPException
+
+# Vitals kept in session start/end snapshots
+SENSOR_SNAPSHOT_PROJECTION = {
+    "_id": 0,
+    "heart_rate": 1,
+    "body_temperature": 1,
+    "skin_conductance": 1,
+    "ecg_sigmoid": 1,
+    "hydration_level": 1,
+    "timestamp": 1,
+}
+
+SESSION_FIELDS = (
+    "_id", "user", "start_time", "end_time", "duration", "active", "metadata",
+    "hydration_start", "hydration_end", "sensor_start", "sensor_end", "summary", "archives",
+)
+
+# Log listings: everything except the vitals snapshots
+SESSION_SUMMARY_PROJECTION = {
+    "user": 1,
+    "start_time": 1,
+    "end_time": 1,
+    "duration": 1,
+    "active": 1,
+    "metadata": 1,
+    "hydration_start": 1,
+    "hydration_end": 1,
+    "summary": 1,
+}
+
+SENSOR_WARNING_FIELDS = (
+    "_id", "user", "device", "missing_field", "counts", "samples", "dropouts",
+    "window_start", "window_end", "last_seen", "received_data", "timestamp",
+)
+
+# The full `received_data` payload is opt-in
+SENSOR_WARNING_PROJECTION = {
+    "user": 1,
+    "device": 1,
+    "missing_field": 1,
+    "counts": 1,
+    "samples": 1,
+    "dropouts": 1,
+    "window_end": 1,
+    "timestamp": 1,
+}
+
+PREDICTION_FIELDS = ("_id", "user", "hydration_status", "hydration_percent", "timestamp")
+
+PREDICTION_PROJECTION = {
+    "user": 1,
+    "hydration_status": 1,
+    "hydration_percent": 1,
+    "timestamp": 1,
+}
+
+VITALS_PROJECTION = {
+    "heart_rate": 1,
+    "body_temperature": 1,
+    "skin_conductance": 1,
+    "ecg_sigmoid": 1,
+    "timestamp": 1,
+}
+
+
+def build_projection(fields: Optional[str], allowed: Iterable[str], default: Optional[dict]) -> Optional[dict]:
+    """
+    Turn a `fields=` query value into a Mongo projection, or return `default`
+    when the client didn't ask for anything specific.
+    """
+    if not fields:
+        return default
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    malformed = sorted(f for f in requested if any(not part or part.startswith("$") for part in f.split(".")))
+    if malformed:
+        raise HTTPException(status_code=400, detail=f"Malformed fields: {', '.join(malformed)}")
+    unknown = sorted({f.split(".")[0] for f in requested} - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    # A parent and its child (received_data,received_data.bpm) is a path
+    # collision to Mongo; the parent already includes the child
+    paths = set(requested)
+    kept = [
+        f for f in dict.fromkeys(requested)
+        if not any(".".join(f.split(".")[:i]) in paths for i in range(1, f.count(".") + 1))
+    ]
+
+    # _id comes along unless excluded, same as any inclusion projection
+    return {f: 1 for f in kept}
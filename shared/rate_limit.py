@@ -0,0 +1,246 @@
+# shared/rate_limit.py
+# Token-bucket rate limiting per token subject (athlete / coach email), per
+# route group.
+#
+# Each key gets a bucket of `burst` tokens that refills at `rate` tokens per
+# second; a request takes one token from every bucket it is charged to or is
+# answered 429 with Retry-After. Runs as ASGI middleware, so a limited
+# request never reaches body parsing, the users lookup or inference.
+#
+# Keys:
+#   Bearer token present -> its `sub`, always; plus (sub, X-Device-Id) when
+#                           the wristband sends one, an extra per-device
+#                           limit that can only be stricter. A made-up
+#                           device id never buys a fresh bucket.
+#   otherwise            -> client IP (login / signup brute force)
+#
+# Limits are "<rate>/<burst>", e.g. RATE_LIMIT_INGEST="2/10"; per-device
+# limits are RATE_LIMIT_<GROUP>_DEVICE (ingest only; default: the group's
+# limit) and are capped at the group's limit.
+#
+# Backends:
+#   local  - buckets in this process (single worker only; N workers allow
+#            N times the limit)
+#   shared - buckets in the `rate_limits` collection, refilled and taken in
+#            one atomic pipeline update, so every worker sees the same
+#            bucket; falls back to local while the database is unreachable
+# Pick one with RATE_LIMIT_BACKEND, or plug your own in with
+# set_rate_limit_backend().
+
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from shared.responses import send_json
+from shared.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_LOCAL_CAPACITY = int(os.getenv("RATE_LIMIT_LOCAL_CAPACITY", "100000"))
+
+
+def parse_limit(value: str) -> Tuple[float, float]:
+    rate, _, burst = value.partition("/")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(rate, 1.0)
+
+
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "ingest": parse_limit(os.getenv("RATE_LIMIT_INGEST", "2/10")),
+    "auth": parse_limit(os.getenv("RATE_LIMIT_AUTH", "0.2/5")),
+    "export": parse_limit(os.getenv("RATE_LIMIT_EXPORT", "0.2/3")),
+    "default": parse_limit(os.getenv("RATE_LIMIT_DEFAULT", "20/60")),
+}
+
+# Extra per-device limit for groups wristbands call; capped at the group's
+DEVICE_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "ingest": parse_limit(os.getenv("RATE_LIMIT_INGEST_DEVICE", os.getenv("RATE_LIMIT_INGEST", "2/10"))),
+}
+
+# Longest matching prefix wins; anything unlisted is "default"
+ROUTE_GROUPS = (
+    ("/data/receive", "ingest"),
+    ("/data/raw-receive", "ingest"),
+    ("/auth/login", "auth"),
+    ("/auth/signup", "auth"),
+    ("/coach/auth/login", "auth"),
+    ("/coach/auth/signup", "auth"),
+    ("/coach/export", "export"),
+)
+EXEMPT_PATHS = ("/metrics", "/data/ingest/status", "/docs", "/openapi.json", "/redoc")
+
+# group -> requests answered 429 by this worker
+limited_total: Dict[str, int] = {}
+
+
+def route_group(path: str) -> Optional[str]:
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    best, best_len = "default", -1
+    for prefix, group in ROUTE_GROUPS:
+        if path.startswith(prefix) and len(prefix) > best_len:
+            best, best_len = group, len(prefix)
+    return best
+
+
+def _retry_after(tokens: float, rate: float) -> int:
+    return max(1, math.ceil((1 - tokens) / rate)) if rate > 0 else 60
+
+
+class LocalBucketBackend:
+    def __init__(self, capacity: int = RATE_LIMIT_LOCAL_CAPACITY):
+        self.capacity = capacity
+        # key -> (tokens, last refill); least recently used dropped first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, now: float) -> Tuple[bool, int]:
+        """Take one token from `key`'s bucket: (allowed, retry_after seconds)."""
+        tokens, last = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + max(now - last, 0) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.capacity:
+            self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else _retry_after(tokens, rate)
+
+
+class SharedBucketBackend:
+    def __init__(self, collection=None):
+        self._collection = collection
+        self._fallback = LocalBucketBackend()
+
+    @property
+    def collection(self):
+        if self._collection is not None:
+            return self._collection
+        from shared.repositories import get_repositories
+        return get_repositories().rate_limits
+
+    @staticmethod
+    def pipeline(rate: float, burst: float, now: float) -> list:
+        elapsed = {"$max": [0, {"$subtract": [now, {"$ifNull": ["$ts", now]}]}]}
+        refilled = {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}]}
+        # Idle buckets expire once they would be full again (TTL index)
+        expires_at = datetime.utcnow() + timedelta(seconds=burst / rate if rate > 0 else 3600)
+        return [
+            {"$set": {"tokens": refilled, "ts": now}},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                "expires_at": expires_at,
+            }},
+        ]
+
+    async def take(self, key: str, rate: float, burst: float, now: float) -> Tuple[bool, int]:
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"_id": key},
+                self.pipeline(rate, burst, now),
+                projection={"allowed": 1, "tokens": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            logger.warning(f"Shared rate limit store unavailable ({e}); limiting locally")
+            return await self._fallback.take(key, rate, burst, now)
+        if doc["allowed"]:
+            return True, 0
+        return False, _retry_after(doc["tokens"], rate)
+
+
+_BACKENDS = {
+    "local": LocalBucketBackend,
+    "shared": SharedBucketBackend,
+}
+
+_backend = None
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        _backend = _BACKENDS[RATE_LIMIT_BACKEND]()
+    return _backend
+
+
+def set_rate_limit_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def rate_limit_buckets(scope, group: str, limit: Tuple[float, float],
+                       device_limit: Optional[Tuple[float, float]] = None) -> List[Tuple[str, float, float]]:
+    """
+    (key, rate, burst) of every bucket a request is charged to, most specific
+    first, so a request its device bucket refuses doesn't drain the subject's.
+    """
+    auth = _header(scope, b"authorization")
+    if auth and auth[:7].lower() == "bearer ":
+        payload = decode_token(auth[7:].strip())
+        if payload and payload.get("sub"):
+            buckets = [(f"{group}:{payload['sub']}", *limit)]
+            device = _header(scope, b"x-device-id")
+            if device and device_limit:
+                rate, burst = device_limit
+                buckets.insert(0, (f"{group}:{payload['sub']}:{device}", min(rate, limit[0]), min(burst, limit[1])))
+            return buckets
+    client = scope.get("client")
+    return [(f"{group}:ip:{client[0] if client else 'unknown'}", *limit)]
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, backend=None, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 enabled: bool = RATE_LIMIT_ENABLED,
+                 device_limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.app = app
+        self._backend = backend
+        self.limits = limits or RATE_LIMITS
+        self.device_limits = DEVICE_RATE_LIMITS if device_limits is None else device_limits
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        group = route_group(scope["path"])
+        if group is None or group not in self.limits:
+            return await self.app(scope, receive, send)
+
+        backend = self._backend or get_rate_limit_backend()
+        now = time.time()
+        allowed, retry_after = True, 0
+        for key, rate, burst in rate_limit_buckets(scope, group, self.limits[group], self.device_limits.get(group)):
+            allowed, retry_after = await backend.take(key, rate, burst, now)
+            if not allowed:
+                break
+        if not allowed:
+            limited_total[group] = limited_total.get(group, 0) + 1
+            return await send_json(
+                send, 429,
+                {"detail": "Too many requests", "group": group},
+                {"Retry-After": retry_after},
+            )
+        return await self.app(scope, receive, send)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of the 429 counters."""
+    lines = ["# TYPE rate_limited_total counter"]
+    lines += [f'rate_limited_total{{group="{g}"}} {n}' for g, n in sorted(limited_total.items())]
+    return "\n".join(lines) + "\n"
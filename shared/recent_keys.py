@@ -0,0 +1,65 @@
+# shared/recent_keys.py
+# Bounded "have I seen this key recently?" filter for request deduplication.
+#
+# Two Bloom filter generations: keys go into the current one, lookups check
+# both, and once the current generation holds `capacity` keys the older one
+# is dropped. Memory stays fixed, the newest 1-2x `capacity` keys are always
+# remembered, and a miss is definite. A hit may be a false positive (about
+# `error_rate`), so callers confirm hits against the database.
+
+import hashlib
+import math
+
+
+class _Bloom:
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RecentKeysFilter:
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        # Standard Bloom sizing for `capacity` keys at `error_rate`
+        self._bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self._hashes = max(int(round(self._bits / self.capacity * math.log(2))), 1)
+        self._current = _Bloom(self._bits, self._hashes)
+        self._previous = None
+        self.rotations = 0
+
+    def add(self, key: str):
+        if key in self._current:
+            return
+        if self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = _Bloom(self._bits, self._hashes)
+            self.rotations += 1
+        self._current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._current or (self._previous is not None and key in self._previous)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "bytes": len(self._current.array) * 2,
+            "hashes": self._hashes,
+            "current": self._current.count,
+            "rotations": self.rotations,
+        }
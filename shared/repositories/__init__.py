@@ -0,0 +1,51 @@
+# shared/repositories/__init__.py
+# Data access for routes and services.
+#
+# Routes take `repos: Repositories = Depends(get_repos)`; services and shared
+# helpers call get_repositories(). Both return the same active backend:
+#   motor  - MongoDB through Motor (default)
+#   memory - in-process dicts, for tests, benchmarks and load profiling
+# Pick one with REPOSITORY_BACKEND, or swap at runtime with set_repositories().
+
+import os
+from shared.repositories.base import COLLECTIONS, Repositories
+
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "motor")
+
+_repositories = None
+
+
+def get_repositories() -> Repositories:
+    global _repositories
+    if _repositories is None:
+        if REPOSITORY_BACKEND == "memory":
+            from shared.repositories.memory import MemoryRepositories
+            _repositories = MemoryRepositories()
+        elif REPOSITORY_BACKEND == "motor":
+            from shared.database import get_db
+            from shared.repositories.motor import MotorRepositories
+            _repositories = MotorRepositories(get_db())
+        else:
+            raise ValueError(f"Unknown REPOSITORY_BACKEND: {REPOSITORY_BACKEND}")
+    return _repositories
+
+
+def set_repositories(repositories: Repositories):
+    global _repositories
+    _repositories = repositories
+
+
+def close_repositories():
+    """Release the active backend; the next get_repositories() opens a new one."""
+    global _repositories
+    if _repositories is not None:
+        _repositories.close()
+        _repositories = None
+
+
+async def get_repos() -> Repositories:
+    """FastAPI dependency."""
+    return get_repositories()
+
+
+__all__ = ["COLLECTIONS", "Repositories", "get_repositories", "set_repositories", "close_repositories", "get_repos"]
@@ -0,0 +1,60 @@
+# shared/repositories/base.py
+
+from abc import ABC, abstractmethod
+
+# Collections the app reads and writes. Attribute access is limited to these
+# so a typo fails loudly instead of creating a new, empty collection.
+COLLECTIONS = (
+    # Core entities
+    "users",
+    "athletes",
+    "sensor_data",
+    "predictions",
+    "alerts",
+    "sessions",
+    "coach_profile",
+    # Everything else the routes and services touch
+    "coaches",
+    "sensor_warnings",
+    "devices",
+    "vitals_rollups",
+    "coach_inbox",
+    "coach_inbox_seeds",
+    "coach_stats",
+    "cache_versions",
+    "archives",
+    "rate_limits",
+)
+
+
+class Repositories(ABC):
+    """
+    One repository per collection, with the async Motor collection API
+    (find / find_one / insert_* / update_* / aggregate / ...). Implementations
+    provide `collection(name)`, `read(mode)` and `ping()`.
+    """
+
+    backend = "abstract"
+
+    @abstractmethod
+    def collection(self, name: str):
+        """Repository for collection `name`."""
+
+    @abstractmethod
+    def read(self, mode: str) -> "Repositories":
+        """The same repositories, reading with read preference `mode`."""
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        """True if the backing store answers; raises ConnectionFailure otherwise."""
+
+    def close(self):
+        """Release connections held by this backend."""
+
+    def __getitem__(self, name: str):
+        return self.collection(name)
+
+    def __getattr__(self, name: str):
+        if name in COLLECTIONS:
+            return self.collection(name)
+        raise AttributeError(f"{type(self).__name__} has no collection {name!r}")
@@ -0,0 +1,602 @@
+# shared/repositories/memory.py
+# In-process repositories: plain dicts behind the same async API the Motor
+# collections expose (the subset this app uses). Used for tests, benchmarks
+# and load profiling without a MongoDB.
+#
+# Documents are stored BSON-round-tripped so they look exactly like what
+# Motor hands back (naive UTC datetimes, ObjectIds, ...). Unique indexes
+# (including partial ones) are enforced; everything else about indexes is a
+# no-op. There is no real concurrency to worry about: every call runs to
+# completion on the event loop before the next one starts.
+
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from shared.repositories.base import Repositories
+from shared.repositories.query import (
+    apply_update, evaluate, get_path, matches, normalize, path_values, project, sort_docs, sort_key,
+    sort_spec, to_bson, upsert_seed, _MISSING
+)
+
+DUPLICATE_KEY = 11000
+
+
+class MemoryCursor:
+    def __init__(self, produce, projection: Optional[dict] = None):
+        self._produce = produce
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._docs = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _materialize(self) -> List[dict]:
+        if self._docs is None:
+            docs = self._produce()
+            if self._sort:
+                docs = sort_docs(docs, self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:self._limit]
+            self._docs = [copy.deepcopy(project(d, self._projection)) for d in docs]
+        return self._docs
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = self._materialize()
+        out = docs[:length] if length else list(docs)
+        self._docs = docs[len(out):]
+        return out
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        docs = self._materialize()
+        if not docs:
+            raise StopAsyncIteration
+        return docs.pop(0)
+
+
+def _hashable(value):
+    return repr(value) if isinstance(value, (dict, list)) else value
+
+
+def _lookup_values(doc: dict, field: str) -> list:
+    # Same fan-out as matching: arrays are findable by any element and as a whole
+    values = []
+    for value in path_values(doc, field) or [None]:
+        values.extend([*value, value] if isinstance(value, list) else [value])
+    return values
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryRepositories", name: str):
+        self.database = database
+        self.name = name
+        # Natural (insertion) order, like a collection scan
+        self.docs: List[dict] = []
+        self._by_id: Dict[Any, dict] = {}
+        self._seq: Dict[Any, int] = {}
+        self._next_seq = 0
+        # unique index name -> (fields, partial filter, {key: _id})
+        self._unique: Dict[str, tuple] = {}
+        # Leading field of every create_index() -> {value: {_id: doc}}, so
+        # equality / $in lookups on indexed fields skip the full scan
+        self._lookup: Dict[str, Dict[Any, Dict[Any, dict]]] = {}
+
+    # ---------- indexes ----------
+
+    async def create_index(self, keys, unique: bool = False, partialFilterExpression=None, name=None, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [k for k, _ in keys]
+        name = name or "_".join(f"{f}_1" for f in fields)
+        if unique and name not in self._unique:
+            entries = {}
+            for doc in self.docs:
+                key = self._unique_key(doc, fields, partialFilterExpression)
+                if key is not None:
+                    if key in entries:
+                        raise DuplicateKeyError(f"E11000 duplicate key error building index {name}", DUPLICATE_KEY)
+                    entries[key] = doc["_id"]
+            self._unique[name] = (fields, partialFilterExpression, entries)
+        if fields[0] not in self._lookup:
+            self._lookup[fields[0]] = {}
+            for doc in self.docs:
+                self._index_lookup(doc, fields[0])
+        return name
+
+    @staticmethod
+    def _unique_key(doc: dict, fields: List[str], partial: Optional[dict]):
+        if partial and not matches(doc, partial):
+            return None
+        return tuple(_hashable(get_path(doc, f, None)) for f in fields)
+
+    def _index_lookup(self, doc: dict, field: str):
+        for v in _lookup_values(doc, field):
+            self._lookup[field].setdefault(_hashable(v), {})[doc["_id"]] = doc
+
+    def _register(self, doc: dict):
+        if doc["_id"] in self._by_id:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.name} index: _id_", DUPLICATE_KEY
+            )
+        keys = {}
+        for name, (fields, partial, entries) in self._unique.items():
+            key = self._unique_key(doc, fields, partial)
+            if key is not None and key in entries:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {name}", DUPLICATE_KEY
+                )
+            keys[name] = key
+        for name, key in keys.items():
+            if key is not None:
+                self._unique[name][2][key] = doc["_id"]
+        self._by_id[doc["_id"]] = doc
+        for field in self._lookup:
+            self._index_lookup(doc, field)
+
+    def _unregister(self, doc: dict):
+        self._by_id.pop(doc["_id"], None)
+        for fields, partial, entries in self._unique.values():
+            key = self._unique_key(doc, fields, partial)
+            if key is not None and entries.get(key) == doc["_id"]:
+                del entries[key]
+        for field, buckets in self._lookup.items():
+            for v in _lookup_values(doc, field):
+                buckets.get(_hashable(v), {}).pop(doc["_id"], None)
+
+    # ---------- reads ----------
+
+    def _candidates(self, query: Optional[dict]) -> List[dict]:
+        if query and "_id" in query and not isinstance(query["_id"], dict):
+            doc = self._by_id.get(normalize(query["_id"]))
+            return [doc] if doc is not None else []
+        for field, condition in (query or {}).items():
+            if field not in self._lookup:
+                continue
+            if isinstance(condition, dict):
+                if set(condition) != {"$in"}:
+                    continue
+                values = condition["$in"]
+            else:
+                values = [condition]
+            found = {}
+            for value in values:
+                found.update(self._lookup[field].get(_hashable(normalize(value)), {}))
+            # Keep natural order
+            return sorted(found.values(), key=lambda d: self._seq[d["_id"]])
+        return self.docs
+
+    def _matching(self, query: Optional[dict]) -> List[dict]:
+        return [d for d in self._candidates(query) if matches(d, query)]
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None,
+             sort=None, limit: int = 0, skip: int = 0, batch_size: int = 0, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(lambda: self._matching(filter), projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, sort=None, **kwargs):
+        docs = await self.find(filter, projection, sort=sort, limit=1).to_list(length=1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter: Optional[dict] = None, **kwargs) -> int:
+        return len(self._matching(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self.docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None, **kwargs) -> list:
+        values = []
+        for doc in self._matching(filter):
+            value = get_path(doc, key)
+            for v in value if isinstance(value, list) else [value]:
+                if v is not _MISSING and v not in values:
+                    values.append(v)
+        return values
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryCursor:
+        def produce():
+            # A leading $match can use the lookup indexes like find() does
+            first = pipeline[0] if pipeline else {}
+            docs = self._matching(first["$match"]) if "$match" in first else list(self.docs)
+            return run_pipeline(self.database, docs, pipeline[1:] if "$match" in first else pipeline)
+        return MemoryCursor(produce)
+
+    # ---------- writes ----------
+
+    def _insert(self, document: dict) -> ObjectId:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        stored = to_bson(document)
+        self._register(stored)
+        self.docs.append(stored)
+        self._seq[stored["_id"]] = self._next_seq
+        self._next_seq += 1
+        return stored["_id"]
+
+    async def insert_one(self, document: dict, **kwargs):
+        return SimpleNamespace(inserted_id=self._insert(document), acknowledged=True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True, **kwargs):
+        inserted, errors = [], []
+        for i, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": DUPLICATE_KEY, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    def _update(self, filter: dict, update, upsert: bool, many: bool, sort=None):
+        targets = self._matching(filter)
+        if sort:
+            targets = sort_docs(targets, sort_spec(sort))
+        if not many:
+            targets = targets[:1]
+
+        modified = 0
+        for doc in targets:
+            updated = to_bson(apply_update(copy.deepcopy(doc), update, filter))
+            if updated == doc:
+                continue
+            self._unregister(doc)
+            try:
+                self._register(updated)
+            except DuplicateKeyError:
+                self._register(doc)
+                raise
+            # Swap contents in place so the natural order is kept
+            self._unregister(updated)
+            doc.clear()
+            doc.update(updated)
+            self._register(doc)
+            modified += 1
+
+        upserted_id = None
+        if not targets and upsert:
+            doc = apply_update(upsert_seed(filter), update, filter, inserting=True)
+            upserted_id = self._insert(doc)
+        return SimpleNamespace(
+            matched_count=len(targets), modified_count=modified, upserted_id=upserted_id, acknowledged=True
+        )
+
+    async def update_one(self, filter: dict, update, upsert: bool = False, **kwargs):
+        return self._update(filter, update, upsert, many=False, sort=kwargs.get("sort"))
+
+    async def update_many(self, filter: dict, update, upsert: bool = False, **kwargs):
+        return self._update(filter, update, upsert, many=True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs):
+        return self._update(filter, replacement, upsert, many=False)
+
+    async def find_one_and_update(self, filter: dict, update, projection: Optional[dict] = None, sort=None,
+                                  upsert: bool = False, return_document=ReturnDocument.BEFORE, **kwargs):
+        before = await self.find_one(filter, sort=sort)
+        result = self._update(filter, update, upsert, many=False, sort=sort)
+        if return_document == ReturnDocument.AFTER:
+            target = before["_id"] if before else result.upserted_id
+            after = await self.find_one({"_id": target}) if target is not None else None
+            return project(after, projection) if after else None
+        return project(before, projection) if before else None
+
+    def _delete(self, filter: Optional[dict], many: bool) -> int:
+        doomed = self._matching(filter)
+        if not many:
+            doomed = doomed[:1]
+        if not doomed:
+            return 0
+        ids = {d["_id"] for d in doomed}
+        for doc in doomed:
+            self._unregister(doc)
+            self._seq.pop(doc["_id"], None)
+        self.docs[:] = [d for d in self.docs if d["_id"] not in ids]
+        return len(doomed)
+
+    async def delete_one(self, filter: Optional[dict] = None, **kwargs):
+        return SimpleNamespace(deleted_count=self._delete(filter, many=False), acknowledged=True)
+
+    async def delete_many(self, filter: Optional[dict] = None, **kwargs):
+        return SimpleNamespace(deleted_count=self._delete(filter, many=True), acknowledged=True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs):
+        matched = modified = upserted = inserted = deleted = 0
+        for op in requests:
+            kind = type(op).__name__
+            if kind == "InsertOne":
+                self._insert(op._doc)
+                inserted += 1
+            elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                result = self._update(op._filter, op._doc, bool(op._upsert), many=kind == "UpdateMany")
+                matched += result.matched_count
+                modified += result.modified_count
+                upserted += result.upserted_id is not None
+            elif kind in ("DeleteOne", "DeleteMany"):
+                deleted += self._delete(op._filter, many=kind == "DeleteMany")
+            else:
+                raise NotImplementedError(f"Bulk operation {kind} is not supported in memory")
+        return SimpleNamespace(
+            matched_count=matched, modified_count=modified, upserted_count=upserted,
+            inserted_count=inserted, deleted_count=deleted, acknowledged=True
+        )
+
+    async def drop(self):
+        self.docs.clear()
+        self._by_id.clear()
+        self._seq.clear()
+        self._unique.clear()
+        self._lookup.clear()
+
+
+# ---------- aggregation ----------
+
+_ACCUMULATORS = ("$sum", "$avg", "$min", "$max", "$first", "$last", "$push", "$addToSet", "$count")
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, dict] = {}
+    order = []
+    for doc in docs:
+        key = evaluate(spec["_id"], doc)
+        hashable = repr(key)
+        if hashable not in groups:
+            groups[hashable] = {"_id": key, "_docs": []}
+            order.append(hashable)
+        groups[hashable]["_docs"].append(doc)
+
+    out = []
+    for hashable in order:
+        group = groups[hashable]
+        members = group.pop("_docs")
+        row = {"_id": group["_id"]}
+        for field, acc in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = acc.items()
+            if op not in _ACCUMULATORS:
+                raise NotImplementedError(f"Accumulator {op} is not supported in memory")
+            values = [evaluate(expr, d) for d in members] if op != "$count" else []
+            numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+            present = [v for v in values if v is not None]
+            if op == "$sum":
+                row[field] = sum(numbers)
+            elif op == "$count":
+                row[field] = len(members)
+            elif op == "$avg":
+                row[field] = sum(numbers) / len(numbers) if numbers else None
+            elif op == "$min":
+                row[field] = min(present, key=sort_key) if present else None
+            elif op == "$max":
+                row[field] = max(present, key=sort_key) if present else None
+            elif op == "$first":
+                row[field] = values[0] if values else None
+            elif op == "$last":
+                row[field] = values[-1] if values else None
+            elif op == "$push":
+                row[field] = values
+            elif op == "$addToSet":
+                row[field] = [v for i, v in enumerate(values) if v not in values[:i]]
+        out.append(row)
+    return out
+
+
+def _project_stage(docs: List[dict], spec: dict) -> List[dict]:
+    fields = {k: v for k, v in spec.items() if k != "_id"}
+    exclusion = fields and all(v in (0, False) for v in fields.values())
+    if exclusion or (not fields and spec.get("_id") in (0, False)):
+        return [project(d, spec) for d in docs]
+
+    out = []
+    for doc in docs:
+        row = {}
+        id_spec = spec.get("_id", 1)
+        if id_spec is True or (type(id_spec) is int and id_spec == 1):
+            row["_id"] = doc.get("_id")
+        elif not (id_spec is False or (type(id_spec) is int and id_spec == 0)):
+            row["_id"] = evaluate(id_spec, doc)
+        for field, value in fields.items():
+            if value is True or (type(value) is int and value == 1):
+                v = get_path(doc, field)
+                if v is not _MISSING:
+                    row[field] = copy.deepcopy(v)
+            else:
+                row[field] = evaluate(value, doc)
+        out.append(row)
+    return out
+
+
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def _lookup(database: "MemoryRepositories", docs: List[dict], spec: dict) -> List[dict]:
+    foreign = database[spec["from"]].docs
+    for doc in docs:
+        if "localField" in spec:
+            local = _as_list(get_path(doc, spec["localField"], None))
+            candidates = [
+                f for f in foreign
+                if any(v in local for v in _as_list(get_path(f, spec["foreignField"], None)))
+            ]
+        else:
+            candidates = list(foreign)
+        variables = {name: evaluate(expr, doc) for name, expr in spec.get("let", {}).items()}
+        if "pipeline" in spec:
+            candidates = run_pipeline(database, candidates, spec["pipeline"], variables)
+        doc[spec["as"]] = copy.deepcopy(candidates)
+    return docs
+
+
+def _set_window_fields(docs: List[dict], spec: dict) -> List[dict]:
+    partitions: Dict[Any, List[dict]] = {}
+    for doc in docs:
+        key = repr(evaluate(spec["partitionBy"], doc)) if "partitionBy" in spec else None
+        partitions.setdefault(key, []).append(doc)
+
+    out = []
+    for members in partitions.values():
+        if "sortBy" in spec:
+            members = sort_docs(members, sort_spec(spec["sortBy"]))
+        for i, doc in enumerate(members):
+            for field, window in spec["output"].items():
+                (op, args), = window.items()
+                if op != "$shift":
+                    raise NotImplementedError(f"Window operator {op} is not supported in memory")
+                j = i + args["by"]
+                doc[field] = (
+                    evaluate(args["output"], members[j]) if 0 <= j < len(members)
+                    else evaluate(args.get("default"), doc)
+                )
+        out.extend(members)
+    return out
+
+
+def _merge(database: "MemoryRepositories", docs: List[dict], spec: dict):
+    into = database[spec["into"] if isinstance(spec["into"], str) else spec["into"]["coll"]]
+    on = spec.get("on", "_id")
+    on = [on] if isinstance(on, str) else on
+    when_matched = spec.get("whenMatched", "merge")
+    when_not_matched = spec.get("whenNotMatched", "insert")
+
+    for doc in docs:
+        existing = next(
+            (d for d in into.docs if all(get_path(d, f, None) == get_path(doc, f, None) for f in on)), None
+        )
+        if existing is None:
+            if when_not_matched == "insert":
+                into._insert(copy.deepcopy(doc))
+            elif when_not_matched == "fail":
+                raise DuplicateKeyError("$merge found no matching document", DUPLICATE_KEY)
+            continue
+        if when_matched == "keepExisting":
+            continue
+        if when_matched == "fail":
+            raise DuplicateKeyError("$merge matched an existing document", DUPLICATE_KEY)
+        incoming = to_bson({k: v for k, v in doc.items() if k != "_id"})
+        if when_matched == "replace":
+            _id = existing["_id"]
+            existing.clear()
+            existing.update({"_id": _id, **incoming})
+        elif when_matched == "merge":
+            existing.update(incoming)
+        else:
+            raise NotImplementedError(f"$merge whenMatched {when_matched!r} is not supported in memory")
+
+
+def run_pipeline(database: "MemoryRepositories", docs: List[dict], pipeline: List[dict],
+                 variables: Optional[dict] = None) -> List[dict]:
+    docs = [copy.deepcopy(d) for d in docs]
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            if variables:
+                docs = [d for d in docs if matches(d, _bind(spec, variables))]
+            else:
+                docs = [d for d in docs if matches(d, spec)]
+        elif name == "$sort":
+            docs = sort_docs(docs, sort_spec(spec))
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$project":
+            docs = _project_stage(docs, spec)
+        elif name in ("$set", "$addFields"):
+            for doc in docs:
+                for field, expr in spec.items():
+                    value = evaluate(expr, doc, variables)
+                    parts = field.split(".")
+                    target = doc
+                    for p in parts[:-1]:
+                        target = target.setdefault(p, {})
+                    target[parts[-1]] = value
+        elif name == "$unset":
+            for doc in docs:
+                for field in [spec] if isinstance(spec, str) else spec:
+                    doc.pop(field, None)
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$lookup":
+            docs = _lookup(database, docs, spec)
+        elif name == "$setWindowFields":
+            docs = _set_window_fields(docs, spec)
+        elif name == "$unwind":
+            path = (spec if isinstance(spec, str) else spec["path"])[1:]
+            unwound = []
+            for doc in docs:
+                for item in get_path(doc, path, None) or []:
+                    unwound.append({**copy.deepcopy(doc), path: item})
+            docs = unwound
+        elif name == "$merge":
+            _merge(database, docs, spec)
+            docs = []
+        else:
+            raise NotImplementedError(f"Aggregation stage {name} is not supported in memory")
+    return docs
+
+
+def _bind(query: dict, variables: dict) -> dict:
+    """Inline $$vars in a $match (only used from $lookup sub-pipelines)."""
+    if isinstance(query, dict):
+        return {k: _bind(v, variables) for k, v in query.items()}
+    if isinstance(query, list):
+        return [_bind(v, variables) for v in query]
+    if isinstance(query, str) and query.startswith("$$"):
+        return variables.get(query[2:])
+    return query
+
+
+class MemoryRepositories(Repositories):
+    backend = "memory"
+
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def collection(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def read(self, mode: str) -> "MemoryRepositories":
+        # One copy of the data: every read preference sees the primary
+        return self
+
+    async def ping(self) -> bool:
+        return True
+
+    async def command(self, name, *args, **kwargs) -> dict:
+        if name == "ping":
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {name} is not supported in memory")
+
+    def reset(self):
+        self._collections.clear()
+
+
+def seed(repos: MemoryRepositories, collection: str, docs: List[dict]):
+    """Load fixture documents straight into a memory collection."""
+    for doc in docs:
+        repos[collection]._insert(normalize(copy.deepcopy(doc)))
@@ -0,0 +1,39 @@
+# shared/repositories/motor.py
+
+from shared.database import read_preference
+from shared.repositories.base import Repositories
+
+
+class MotorRepositories(Repositories):
+    backend = "motor"
+
+    def __init__(self, database):
+        self.database = database
+        self._views = {}
+
+    @property
+    def read_preference(self):
+        return self.database.read_preference
+
+    def collection(self, name: str):
+        return self.database[name]
+
+    def read(self, mode: str) -> "MotorRepositories":
+        if mode == "primary":
+            return self
+        if mode not in self._views:
+            handle = self.database.client.get_database(self.database.name, read_preference=read_preference(mode))
+            self._views[mode] = MotorRepositories(handle)
+        return self._views[mode]
+
+    def close(self):
+        from shared.database import close_client
+        close_client()
+        self._views.clear()
+
+    async def ping(self) -> bool:
+        await self.database.command("ping")
+        return True
+
+    async def command(self, *args, **kwargs):
+        return await self.database.command(*args, **kwargs)
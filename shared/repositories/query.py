@@ -0,0 +1,515 @@
+# shared/repositories/query.py
+# The slice of MongoDB query / update / expression semantics the in-memory
+# repositories need: exactly what the routes and services in this repo send,
+# plus the obvious neighbours. Anything else raises NotImplementedError so a
+# new query shows up in tests instead of silently matching nothing.
+
+import copy
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, List, Optional, Tuple
+import bson
+from bson import ObjectId
+
+_MISSING = object()
+
+
+# ---------- values ----------
+
+def to_bson(doc: dict) -> dict:
+    """Round-trip through BSON so stored docs look exactly like Motor's (naive UTC datetimes etc.)."""
+    return bson.decode(bson.encode(doc))
+
+
+def normalize(value):
+    """Query operands get the same treatment as stored values."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+# BSON comparison order for mixed types
+def _type_rank(value) -> int:
+    if value is _MISSING or value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def sort_key(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def compare(a, b) -> int:
+    ka, kb = sort_key(a), sort_key(b)
+    return (ka > kb) - (ka < kb)
+
+
+# ---------- paths ----------
+
+def get_path(doc, path: str, default=_MISSING):
+    """Plain dotted lookup (numeric parts index arrays); no array fan-out."""
+    current = doc
+    for part in path.split("."):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        else:
+            return default
+    return current
+
+
+def path_values(doc, path: str) -> list:
+    """Every value `path` reaches, fanning out over arrays like Mongo does."""
+    parts = path.split(".")
+
+    def walk(value, i):
+        if i == len(parts):
+            return [value]
+        part = parts[i]
+        if isinstance(value, dict):
+            return walk(value[part], i + 1) if part in value else []
+        if isinstance(value, list):
+            if part.isdigit() and int(part) < len(value):
+                return walk(value[int(part)], i + 1)
+            out = []
+            for item in value:
+                if isinstance(item, dict):
+                    out.extend(walk(item, i))
+            return out
+        return []
+
+    return walk(doc, 0)
+
+
+def set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    current = doc
+    for part in parts[:-1]:
+        if isinstance(current, list):
+            current = current[int(part)]
+            continue
+        if part not in current or not isinstance(current[part], (dict, list)):
+            current[part] = {}
+        current = current[part]
+    if isinstance(current, list):
+        current[int(parts[-1])] = value
+    else:
+        current[parts[-1]] = value
+
+
+def unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    current = get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+    if isinstance(current, dict):
+        current.pop(parts[-1], None)
+
+
+# ---------- matching ----------
+
+def _cmp_op(op: str, value, operand) -> bool:
+    if _type_rank(value) != _type_rank(operand):
+        return False
+    c = compare(value, operand)
+    return {"$gt": c > 0, "$gte": c >= 0, "$lt": c < 0, "$lte": c <= 0}[op]
+
+
+def _equals(value, operand) -> bool:
+    if value is _MISSING:
+        return operand is None
+    return value == operand
+
+
+def _match_value(values: list, condition) -> bool:
+    """Does any value reached by a path satisfy `condition`?"""
+    candidates = []
+    for v in values:
+        candidates.append(v)
+        if isinstance(v, list):
+            candidates.extend(v)
+    if not candidates:
+        candidates = [_MISSING]
+
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, operand in condition.items():
+            if op == "$exists":
+                if bool(operand) != (bool(values)):
+                    return False
+            elif op == "$eq":
+                if not any(_equals(v, operand) for v in candidates):
+                    return False
+            elif op == "$ne":
+                if any(_equals(v, operand) for v in candidates):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if not any(_cmp_op(op, v, operand) for v in candidates):
+                    return False
+            elif op == "$in":
+                if not any(_equals(v, o) for v in candidates for o in operand):
+                    return False
+            elif op == "$nin":
+                if any(_equals(v, o) for v in candidates for o in operand):
+                    return False
+            elif op == "$regex":
+                pattern = re.compile(operand, re.I if "i" in condition.get("$options", "") else 0)
+                if not any(isinstance(v, str) and pattern.search(v) for v in candidates):
+                    return False
+            elif op == "$options":
+                continue
+            elif op == "$elemMatch":
+                if not any(isinstance(v, list) and any(matches(i, operand) for i in v if isinstance(i, dict))
+                           for v in values):
+                    return False
+            elif op == "$size":
+                if not any(isinstance(v, list) and len(v) == operand for v in values):
+                    return False
+            elif op == "$type":
+                aliases = operand if isinstance(operand, list) else [operand]
+                if not any(
+                    _bson_type(v) in aliases or _bson_type(v, alias=False) in aliases
+                    or ("number" in aliases and _bson_type(v) in ("int", "double"))
+                    for v in values
+                ):
+                    return False
+            elif op == "$not":
+                if _match_value(values, operand):
+                    return False
+            else:
+                raise NotImplementedError(f"Query operator {op} is not supported in memory")
+        return True
+
+    return any(_equals(v, condition) for v in candidates)
+
+
+_TYPE_ALIASES = (
+    (bool, "bool", 8), (int, "int", 16), (float, "double", 1), (str, "string", 2),
+    (datetime, "date", 9), (ObjectId, "objectId", 7), (list, "array", 4), (dict, "object", 3),
+)
+
+
+def _bson_type(value, alias: bool = True):
+    if value is None:
+        return "null" if alias else 10
+    for py_type, name, number in _TYPE_ALIASES:
+        if isinstance(value, py_type):
+            return name if alias else number
+    return None
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in condition):
+                return False
+        elif key == "$expr":
+            if not evaluate(condition, doc):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key} is not supported in memory")
+        elif not _match_value(path_values(doc, key), normalize(condition)):
+            return False
+    return True
+
+
+# ---------- projection / sort ----------
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    include_id = bool(projection.get("_id", 1))
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+
+    if all(not v for v in fields.values()):
+        out = copy.deepcopy(doc)
+        for path in fields:
+            unset_path(out, path)
+        if not include_id:
+            out.pop("_id", None)
+        return out
+
+    out = {}
+    if include_id and "_id" in doc:
+        out["_id"] = doc["_id"]
+    for path in fields:
+        value = get_path(doc, path)
+        if value is not _MISSING:
+            set_path(out, path, copy.deepcopy(value))
+    return out
+
+
+def sort_spec(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def sort_docs(docs: List[dict], spec: Iterable[Tuple[str, int]]) -> List[dict]:
+    for path, direction in reversed(list(spec)):
+        docs.sort(key=lambda d: sort_key(get_path(d, path)), reverse=direction < 0)
+    return docs
+
+
+# ---------- updates ----------
+
+def _positional(path: str, doc: dict, query: dict) -> str:
+    """Resolve `arr.$.field` to the index of the first element the query matched."""
+    if ".$" not in path:
+        return path
+    prefix, rest = path.split(".$", 1)
+    array = get_path(doc, prefix)
+    sub = {k[len(prefix) + 1:]: v for k, v in (query or {}).items() if k.startswith(prefix + ".")}
+    if isinstance(array, list):
+        for i, item in enumerate(array):
+            if (matches(item, sub) if isinstance(item, dict) else _match_value([item], sub or None)):
+                return f"{prefix}.{i}{rest}"
+    raise ValueError(f"The positional operator did not find the match needed from the query: {path}")
+
+
+def apply_update(doc: dict, update, query: Optional[dict] = None, inserting: bool = False) -> dict:
+    if isinstance(update, list):
+        return _apply_pipeline_update(doc, update)
+    update = normalize(update)
+    if not any(k.startswith("$") for k in update):
+        # Replacement document keeps the _id
+        replaced = copy.deepcopy(update)
+        if "_id" in doc:
+            replaced["_id"] = doc["_id"]
+        doc.clear()
+        doc.update(replaced)
+        return doc
+
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for raw_path, operand in fields.items() if isinstance(fields, dict) else []:
+            path = _positional(raw_path, doc, query)
+            current = get_path(doc, path)
+            if op in ("$set", "$setOnInsert"):
+                set_path(doc, path, copy.deepcopy(operand))
+            elif op == "$unset":
+                unset_path(doc, path)
+            elif op == "$inc":
+                set_path(doc, path, (0 if current is _MISSING else current) + operand)
+            elif op == "$mul":
+                set_path(doc, path, (0 if current is _MISSING else current) * operand)
+            elif op == "$min":
+                if current is _MISSING or compare(operand, current) < 0:
+                    set_path(doc, path, operand)
+            elif op == "$max":
+                if current is _MISSING or compare(operand, current) > 0:
+                    set_path(doc, path, operand)
+            elif op == "$currentDate":
+                set_path(doc, path, datetime.now(timezone.utc).replace(tzinfo=None))
+            elif op in ("$push", "$addToSet"):
+                array = [] if current is _MISSING else current
+                each = operand["$each"] if isinstance(operand, dict) and "$each" in operand else [operand]
+                for item in each:
+                    if op == "$push" or item not in array:
+                        array.append(copy.deepcopy(item))
+                if op == "$push" and isinstance(operand, dict) and "$slice" in operand:
+                    n = operand["$slice"]
+                    array[:] = array[n:] if n < 0 else array[:n]
+                set_path(doc, path, array)
+            elif op == "$pull":
+                if isinstance(current, list):
+                    current[:] = [
+                        i for i in current
+                        if not (matches(i, operand) if isinstance(operand, dict) and isinstance(i, dict)
+                                else i == operand)
+                    ]
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported in memory")
+    return doc
+
+
+def _apply_pipeline_update(doc: dict, pipeline: list) -> dict:
+    """Update with an aggregation pipeline ($set / $addFields / $unset stages)."""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name in ("$set", "$addFields"):
+            # Every expression in a stage sees the document as it entered the stage
+            values = {path: normalize(evaluate(expr, doc)) for path, expr in spec.items()}
+            for path, value in values.items():
+                set_path(doc, path, value)
+        elif name == "$unset":
+            for path in [spec] if isinstance(spec, str) else spec:
+                unset_path(doc, path)
+        else:
+            raise NotImplementedError(f"Pipeline update stage {name} is not supported in memory")
+    return doc
+
+
+def upsert_seed(query: Optional[dict]) -> dict:
+    """Equality fields of a filter become the new document on upsert."""
+    seed = {}
+    for key, value in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if isinstance(value, dict) and any(k.startswith("$") for k in value):
+            if "$eq" in value:
+                set_path(seed, key, normalize(value["$eq"]))
+            continue
+        set_path(seed, key, normalize(value))
+    return seed
+
+
+# ---------- aggregation expressions ----------
+
+def _num(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _date_trunc(date: datetime, unit: str, bin_size: int = 1) -> datetime:
+    seconds = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+    if unit not in seconds:
+        raise NotImplementedError(f"$dateTrunc unit {unit} is not supported in memory")
+    step = seconds[unit] * bin_size
+    epoch = datetime(1970, 1, 1) if date.tzinfo is None else datetime(1970, 1, 1, tzinfo=timezone.utc)
+    elapsed = int((date - epoch).total_seconds())
+    return epoch + timedelta(seconds=elapsed - elapsed % step)
+
+
+def evaluate(expr, doc: dict, variables: Optional[dict] = None):
+    variables = variables or {}
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            name, _, rest = expr[2:].partition(".")
+            base = doc if name == "ROOT" else variables.get(name)
+            value = get_path(base, rest) if rest else base
+            return None if value is _MISSING else value
+        if expr.startswith("$"):
+            value = get_path(doc, expr[1:])
+            return None if value is _MISSING else value
+        return expr
+    if isinstance(expr, list):
+        return [evaluate(e, doc, variables) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) != 1 or not next(iter(expr)).startswith("$"):
+        return {k: evaluate(v, doc, variables) for k, v in expr.items()}
+
+    op, args = next(iter(expr.items()))
+    ev = lambda e: evaluate(e, doc, variables)  # noqa: E731
+
+    if op == "$literal":
+        return args
+    if op == "$ifNull":
+        values = [ev(a) for a in args]
+        return next((v for v in values[:-1] if v is not None), values[-1])
+    if op == "$arrayElemAt":
+        array, index = ev(args[0]), ev(args[1])
+        if not isinstance(array, list) or not -len(array) <= index < len(array):
+            return None
+        return array[index]
+    if op == "$size":
+        return len(ev(args))
+    if op == "$toInt":
+        value = ev(args)
+        return None if value is None else int(float(value))
+    if op == "$toDouble":
+        value = ev(args)
+        return None if value is None else float(value)
+    if op == "$toString":
+        value = ev(args)
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.isoformat(timespec="milliseconds") + "Z"
+        return str(value)
+    if op == "$cond":
+        if isinstance(args, dict):
+            args = [args["if"], args["then"], args["else"]]
+        return ev(args[1]) if ev(args[0]) else ev(args[2])
+    if op == "$switch":
+        for branch in args["branches"]:
+            if ev(branch["case"]):
+                return ev(branch["then"])
+        if "default" not in args:
+            raise ValueError("$switch could not find a matching branch")
+        return ev(args["default"])
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        a, b = ev(args[0]), ev(args[1])
+        c = compare(a, b)
+        return {"$eq": c == 0, "$ne": c != 0, "$gt": c > 0, "$gte": c >= 0, "$lt": c < 0, "$lte": c <= 0}[op]
+    if op == "$and":
+        return all(ev(a) for a in args)
+    if op == "$or":
+        return any(ev(a) for a in args)
+    if op == "$not":
+        return not ev(args[0] if isinstance(args, list) else args)
+    if op == "$in":
+        return ev(args[0]) in (ev(args[1]) or [])
+    if op == "$add":
+        values = [ev(a) for a in args]
+        if any(v is None for v in values):
+            return None
+        dates = [v for v in values if isinstance(v, datetime)]
+        if dates:
+            ms = sum(v for v in values if not isinstance(v, datetime))
+            return dates[0] + timedelta(milliseconds=ms)
+        return sum(values)
+    if op == "$subtract":
+        a, b = ev(args[0]), ev(args[1])
+        if a is None or b is None:
+            return None
+        if isinstance(a, datetime) and isinstance(b, datetime):
+            return int((a - b).total_seconds() * 1000)
+        if isinstance(a, datetime):
+            return a - timedelta(milliseconds=b)
+        return a - b
+    if op == "$multiply":
+        values = [ev(a) for a in args]
+        if any(v is None for v in values):
+            return None
+        out = 1
+        for v in values:
+            out *= v
+        return out
+    if op == "$divide":
+        a, b = ev(args[0]), ev(args[1])
+        return None if a is None or b is None else a / b
+    if op == "$concat":
+        values = [ev(a) for a in args]
+        return None if any(v is None for v in values) else "".join(values)
+    if op == "$dateTrunc":
+        date = ev(args["date"])
+        return None if date is None else _date_trunc(date, args["unit"], args.get("binSize", 1))
+    if op in ("$min", "$max") and isinstance(args, list):
+        values = [v for v in (ev(a) for a in args) if v is not None]
+        if not values:
+            return None
+        return min(values, key=sort_key) if op == "$min" else max(values, key=sort_key)
+    raise NotImplementedError(f"Expression operator {op} is not supported in memory")
@@ -0,0 +1,182 @@
+# shared/response_cache.py
+# Versioned response cache + strong ETags for coach read endpoints.
+#
+# Each (scope, coach) pair has a version counter. Write paths bump the
+# counter (ingest bumps "athletes"/"dashboard", alert writes bump "alerts"),
+# and a read whose version hasn't moved is served from the cached body, or
+# answered with 304 if the client already holds the matching ETag.
+#
+# Backends:
+#   local - counters and bodies in this process (single worker only; with
+#           several, each serves its own stale bodies and ETags)
+#   mongo - counters in the `cache_versions` collection so every worker sees
+#           the same bumps; rendered bodies still live in-process
+# Pick one with RESPONSE_CACHE_BACKEND, or plug your own in with
+# set_cache_backend().
+#
+# Builders may read from secondaries (see shared.database.read_db). A body
+# cached under a new version must include the write that bumped it, so a
+# rebuild within READ_MAX_STALENESS_SECONDS of the last bump reads from the
+# primary instead.
+
+import hashlib
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from shared.database import READ_MAX_STALENESS_SECONDS, primary_reads, read_mode
+from shared.responses import dumps
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "local")
+
+COACH_SCOPES = ("athletes", "dashboard", "alerts")
+
+
+class LocalCacheBackend:
+    def __init__(self):
+        # Counters restart at 0 with the process, so ETags carry an epoch too
+        self.epoch = uuid.uuid4().hex
+        self._versions: Dict[str, int] = {}
+        self._bodies: Dict[str, Tuple[int, bytes]] = {}
+        self._bumped_at: Dict[str, float] = {}
+
+    async def get_version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    async def bump_version(self, key: str):
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._bumped_at[key] = time.time()
+
+    def bumped_at(self, key: str) -> Optional[float]:
+        """When `key` was last bumped, as of the latest get_version (None if unknown)."""
+        return self._bumped_at.get(key)
+
+    async def get_body(self, key: str, version: int) -> Optional[bytes]:
+        cached = self._bodies.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        return None
+
+    async def set_body(self, key: str, version: int, body: bytes):
+        self._bodies[key] = (version, body)
+
+
+class MongoCacheBackend(LocalCacheBackend):
+    def __init__(self, collection=None):
+        super().__init__()
+        if collection is None:
+            from shared.repositories import get_repositories
+            collection = get_repositories().cache_versions
+        self.collection = collection
+        self.epoch = "mongo"
+
+    async def get_version(self, key: str) -> int:
+        doc = await self.collection.find_one({"_id": key}, {"version": 1, "bumped_at": 1})
+        if not doc:
+            return 0
+        if "bumped_at" in doc:
+            self._bumped_at[key] = doc["bumped_at"]
+        return doc["version"]
+
+    async def bump_version(self, key: str):
+        await self.collection.update_one(
+            {"_id": key}, {"$inc": {"version": 1}, "$set": {"bumped_at": time.time()}}, upsert=True
+        )
+
+
+_BACKENDS = {
+    "local": LocalCacheBackend,
+    "mongo": MongoCacheBackend,
+}
+
+_backend = None
+
+
+def get_cache_backend():
+    global _backend
+    if _backend is None:
+        _backend = _BACKENDS[RESPONSE_CACHE_BACKEND]()
+    return _backend
+
+
+def set_cache_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def _key(scope: str, coach_email: str) -> str:
+    return f"{scope}:{coach_email}"
+
+
+def make_etag(key: str, epoch: str, version: int) -> str:
+    digest = hashlib.sha1(f"{key}:{epoch}:{version}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+async def bump_coach_version(coach_email: Optional[str], *scopes: str):
+    """Invalidate cached responses for a coach (all scopes if none given)."""
+    if not coach_email:
+        return
+    backend = get_cache_backend()
+    for scope in scopes or COACH_SCOPES:
+        await backend.bump_version(_key(scope, coach_email))
+
+
+def _recently_bumped(backend, key: str) -> bool:
+    bumped_at = getattr(backend, "bumped_at", lambda key: None)(key)
+    # Unknown (e.g. bumped before this process started): assume recent
+    return bumped_at is None or time.time() - bumped_at < READ_MAX_STALENESS_SECONDS
+
+
+async def cached_json(
+    request: Request,
+    scope: str,
+    coach_email: str,
+    build: Callable[[], Awaitable[Any]],
+    response_model: Any = None,
+    read_group: Optional[str] = None,
+) -> Response:
+    """
+    Serve `build()`'s result for (scope, coach) with a strong ETag, reusing the
+    last rendered body while the version counter is unchanged.
+
+    With `response_model` the payload is validated/filtered by pydantic once
+    per render; without it the payload is written out as-is with orjson.
+    `read_group` names the read_db() group the builder reads through.
+    """
+    backend = get_cache_backend()
+    key = _key(scope, coach_email)
+    version = await backend.get_version(key)
+    etag = make_etag(key, backend.epoch, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = await backend.get_body(key, version)
+    if body is None:
+        if read_group and read_mode(read_group) != "primary" and _recently_bumped(backend, key):
+            # A secondary may not have the write behind this version yet
+            with primary_reads():
+                payload = await build()
+        else:
+            payload = await build()
+        if response_model is not None:
+            # Same filtering/validation FastAPI would apply for response_model
+            adapter = TypeAdapter(response_model)
+            body = adapter.dump_json(adapter.validate_python(payload))
+        else:
+            # Builder already returns the exact response shape
+            body = dumps(payload)
+        await backend.set_body(key, version, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,73 @@
+# shared/responses.py
+# orjson-based JSON rendering for Motor results.
+#
+# FastAPI's default path runs jsonable_encoder (and response_model
+# validation) over every element of a list response. For raw Mongo documents
+# that's pure overhead: orjson already handles datetimes natively and only
+# needs a hook for BSON types like ObjectId.
+
+from typing import AsyncIterator, Optional
+import orjson
+from bson import ObjectId, Decimal128
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Motor hands back naive UTC datetimes; keep FastAPI's "no suffix" format by
+# default, or opt into a trailing "Z" like the athlete alerts feed uses.
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+ORJSON_OPTIONS_UTC_Z = ORJSON_OPTIONS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def bson_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content, utc_z: bool = False) -> bytes:
+    return orjson.dumps(content, default=bson_default, option=ORJSON_OPTIONS_UTC_Z if utc_z else ORJSON_OPTIONS)
+
+
+class BSONJSONResponse(JSONResponse):
+    """JSONResponse that renders Mongo documents directly with orjson."""
+
+    def __init__(self, content, utc_z: bool = False, **kwargs):
+        self.utc_z = utc_z
+        super().__init__(content, **kwargs)
+
+    def render(self, content) -> bytes:
+        return dumps(content, utc_z=self.utc_z)
+
+
+async def iter_json_array(cursor, utc_z: bool = False) -> AsyncIterator[bytes]:
+    """Encode a Motor cursor as a JSON array, one ~64KB chunk at a time."""
+    buffer = bytearray(b"[")
+    first = True
+    async for doc in cursor:
+        if not first:
+            buffer += b","
+        buffer += dumps(doc, utc_z=utc_z)
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+def stream_json_array(cursor, utc_z: bool = False, headers: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(iter_json_array(cursor, utc_z=utc_z), media_type="application/json", headers=headers)
+
+
+async def send_json(send, status_code: int, content, headers: Optional[dict] = None):
+    """Answer straight from ASGI middleware, before the app (and body parsing) runs."""
+    body = dumps(content)
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(k.lower().encode(), str(v).encode()) for k, v in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status_code, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,335 @@
+# shared/retention.py
+# Retention passes for raw telemetry.
+#
+# Each collection has a TTL in days. A pass takes the rows older than that,
+# writes them to compressed columnar archive files on local disk (Parquet
+# when pyarrow is installed, gzip CSV otherwise), registers every file in the
+# `archives` collection, links it from the sessions it overlaps and only then
+# deletes the archived rows by _id. Before sensor_data rows go, any vitals
+# rollup buckets they never made it into (e.g. readings replayed from the
+# spool) are backfilled so history charts keep working.
+#
+# Run it with scripts/retention.py; nothing here is wired into the app.
+
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import orjson
+from bson import ObjectId
+from pymongo import UpdateMany
+from shared.repositories import get_repositories
+from shared.rollups import RESOLUTIONS, ROLLUP_VITALS
+from shared.hydration import STATUS_LABELS, status_label_expr
+
+# 0 disables retention for a collection
+RETENTION_DAYS = {
+    "sensor_data": int(os.getenv("RETENTION_SENSOR_DATA_DAYS", "30")),
+    "predictions": int(os.getenv("RETENTION_PREDICTIONS_DAYS", "90")),
+    "sensor_warnings": int(os.getenv("RETENTION_SENSOR_WARNINGS_DAYS", "30")),
+    "alerts": int(os.getenv("RETENTION_ALERTS_DAYS", "180")),
+}
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_CHUNK_ROWS = int(os.getenv("ARCHIVE_CHUNK_ROWS", "50000"))
+
+# Field naming the athlete a row belongs to (email or username, see _usernames)
+OWNER_FIELD = {
+    "sensor_data": "user",
+    "predictions": "user",
+    "sensor_warnings": "user",
+    "alerts": "athlete_id",
+}
+
+# Same cutoffs as shared.hydration, for rollup state counts
+STATUS_SWITCH = status_label_expr("$hydration_level")
+
+ROLLUP_UNITS = {"1m": ("minute", 1), "15m": ("minute", 15), "1h": ("hour", 1)}
+DELETE_BATCH = 1000
+
+
+def retention_cutoff(days: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the hour `days` ago, so every rollup bucket before it is complete."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=days)
+    return cutoff.replace(minute=0, second=0, microsecond=0)
+
+
+# ---------- archive files ----------
+
+def archive_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "csv.gz"
+
+
+def flatten_row(doc: dict) -> dict:
+    """One archive row: ObjectIds as strings, nested values as JSON text."""
+    row = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            row[key] = str(value)
+        elif isinstance(value, (dict, list)):
+            row[key] = orjson.dumps(value, default=str).decode()
+        elif isinstance(value, datetime) and value.tzinfo is None:
+            row[key] = value.replace(tzinfo=timezone.utc)
+        else:
+            row[key] = value
+    return row
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_archive(rows: List[dict], path_base: str, fmt: Optional[str] = None) -> str:
+    """Write flattened `rows` to `path_base`.<fmt> and return the final path."""
+    import pandas as pd
+
+    fmt = fmt or archive_format()
+    path = f"{path_base}.{fmt}"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+
+    frame = pd.DataFrame(rows)
+    if fmt == "parquet":
+        frame.to_parquet(tmp, compression="zstd", index=False)
+    else:
+        frame.to_csv(tmp, compression="gzip", index=False)
+
+    # Atomic rename: a crashed pass never leaves a truncated archive behind
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def read_archive(path: str):
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, compression="gzip")
+
+
+# ---------- rollup backfill ----------
+
+def _rollup_backfill_pipeline(res: str, cutoff: datetime) -> list:
+    unit, bin_size = ROLLUP_UNITS[res]
+    group = {
+        "_id": {
+            "user": "$user",
+            "start": {"$dateTrunc": {"date": "$timestamp", "unit": unit, "binSize": bin_size}},
+        },
+        "count": {"$sum": 1},
+    }
+    for v in ROLLUP_VITALS:
+        group[f"sum_{v}"] = {"$sum": f"${v}"}
+        group[f"min_{v}"] = {"$min": f"${v}"}
+        group[f"max_{v}"] = {"$max": f"${v}"}
+    for status in STATUS_LABELS:
+        group[f"state_{status}"] = {"$sum": {"$cond": [{"$eq": [STATUS_SWITCH, status]}, 1, 0]}}
+
+    return [
+        {"$match": {"timestamp": {"$lt": cutoff}}},
+        {"$group": group},
+        {"$project": {
+            "_id": 0,
+            "user": "$_id.user",
+            "res": res,
+            "start": "$_id.start",
+            "count": 1,
+            "sum": {v: f"$sum_{v}" for v in ROLLUP_VITALS},
+            "min": {v: f"$min_{v}" for v in ROLLUP_VITALS},
+            "max": {v: f"$max_{v}" for v in ROLLUP_VITALS},
+            "states": {s: f"$state_{s}" for s in STATUS_LABELS},
+        }},
+        # Buckets written live are left alone; only missing ones are filled in
+        {"$merge": {
+            "into": "vitals_rollups",
+            "on": ["user", "res", "start"],
+            "whenMatched": "keepExisting",
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+
+async def backfill_rollups(cutoff: datetime):
+    repos = get_repositories()
+    for res in RESOLUTIONS:
+        await repos.sensor_data.aggregate(_rollup_backfill_pipeline(res, cutoff)).to_list(length=None)
+
+
+# ---------- sessions ----------
+
+async def _usernames(owners: Iterable[str]) -> Dict[str, str]:
+    """Map row owners (emails or usernames) to the username sessions are keyed by."""
+    repos = get_repositories()
+    owners = list(owners)
+    mapping = {}
+    cursor = repos.users.find(
+        {"$or": [{"email": {"$in": owners}}, {"username": {"$in": owners}}]},
+        {"_id": 0, "email": 1, "username": 1},
+    )
+    async for user in cursor:
+        if user.get("email") in owners:
+            mapping[user["email"]] = user["username"]
+        if user.get("username") in owners:
+            mapping[user["username"]] = user["username"]
+    return mapping
+
+
+async def link_sessions(archive: dict, windows: Dict[str, list]):
+    """Add a reference to `archive` on every session overlapping an owner's archived window."""
+    repos = get_repositories()
+    usernames = await _usernames(windows)
+    ref = {k: archive[k] for k in ("_id", "collection", "path", "start", "end")}
+    ops = []
+    for owner, (start, end) in windows.items():
+        username = usernames.get(owner)
+        if not username:
+            continue
+        ops.append(UpdateMany(
+            {
+                "user": username,
+                "start_time": {"$lte": end},
+                "$or": [{"end_time": {"$gte": start}}, {"end_time": {"$exists": False}}],
+            },
+            {"$addToSet": {"archives": ref}},
+        ))
+    if ops:
+        await repos.sessions.bulk_write(ops, ordered=False)
+
+
+# ---------- passes ----------
+
+async def _archive_chunk(collection: str, docs: List[dict], fmt: str) -> dict:
+    repos = get_repositories()
+    owner_field = OWNER_FIELD[collection]
+    windows: Dict[str, list] = {}
+    for doc in docs:
+        owner, ts = doc.get(owner_field), doc.get("timestamp")
+        if owner is None or ts is None:
+            continue
+        window = windows.setdefault(owner, [ts, ts])
+        window[0], window[1] = min(window[0], ts), max(window[1], ts)
+
+    timestamps = [d["timestamp"] for d in docs if d.get("timestamp")]
+    start, end = min(timestamps), max(timestamps)
+    path_base = os.path.join(ARCHIVE_DIR, collection, f"{start:%Y-%m-%d}-{docs[0]['_id']}")
+    path = write_archive([flatten_row(d) for d in docs], path_base, fmt)
+
+    archive = {
+        "_id": ObjectId(),
+        "collection": collection,
+        "path": os.path.abspath(path),
+        "format": fmt,
+        "rows": len(docs),
+        "start": start,
+        "end": end,
+        "owners": sorted(windows),
+        "sha256": file_sha256(path),
+        "created_at": datetime.now(timezone.utc),
+    }
+    await repos.archives.insert_one(archive)
+    await link_sessions(archive, windows)
+
+    # Rows are only removed once their archive is on disk and registered
+    ids = [d["_id"] for d in docs]
+    for i in range(0, len(ids), DELETE_BATCH):
+        await repos[collection].delete_many({"_id": {"$in": ids[i:i + DELETE_BATCH]}})
+    return archive
+
+
+async def retain_collection(collection: str, days: int, now: Optional[datetime] = None, dry_run: bool = False) -> dict:
+    repos = get_repositories()
+    cutoff = retention_cutoff(days, now)
+    query = {"timestamp": {"$lt": cutoff}}
+    summary = {"collection": collection, "days": days, "cutoff": cutoff, "archived": 0, "files": []}
+
+    if dry_run:
+        summary["expired"] = await repos[collection].count_documents(query)
+        return summary
+
+    if collection == "sensor_data":
+        await backfill_rollups(cutoff)
+
+    fmt = archive_format()
+    # _id order streams off the default index without an in-memory sort
+    cursor = repos[collection].find(query, batch_size=min(ARCHIVE_CHUNK_ROWS, 5000)).sort("_id", 1)
+    chunk = []
+    async for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= ARCHIVE_CHUNK_ROWS:
+            archive = await _archive_chunk(collection, chunk, fmt)
+            summary["archived"] += archive["rows"]
+            summary["files"].append(archive["path"])
+            chunk = []
+    if chunk:
+        archive = await _archive_chunk(collection, chunk, fmt)
+        summary["archived"] += archive["rows"]
+        summary["files"].append(archive["path"])
+    return summary
+
+
+async def run_retention(collections: Optional[Iterable[str]] = None, dry_run: bool = False) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    results = []
+    for collection in collections or RETENTION_DAYS:
+        days = RETENTION_DAYS.get(collection, 0)
+        if days > 0:
+            results.append(await retain_collection(collection, days, now, dry_run))
+    return results
+
+
+def _as_id(value: str):
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+async def verify_archive(archive: dict) -> List[str]:
+    """Problems with one registered archive; an empty list means it's sound."""
+    repos = get_repositories()
+    path = archive["path"]
+    if not os.path.exists(path):
+        return [f"{path}: missing"]
+
+    problems = []
+    if file_sha256(path) != archive["sha256"]:
+        problems.append(f"{path}: checksum mismatch")
+
+    frame = read_archive(path)
+    if len(frame) != archive["rows"]:
+        problems.append(f"{path}: {len(frame)} rows, expected {archive['rows']}")
+
+    ids = [_as_id(str(i)) for i in frame["_id"]]
+    live = 0
+    for i in range(0, len(ids), DELETE_BATCH):
+        live += await repos[archive["collection"]].count_documents({"_id": {"$in": ids[i:i + DELETE_BATCH]}})
+    if live:
+        problems.append(f"{path}: {live} archived rows still in {archive['collection']}")
+    return problems
+
+
+async def verify_retention(collections: Optional[Iterable[str]] = None) -> dict:
+    repos = get_repositories()
+    collections = list(collections or RETENTION_DAYS)
+    report = {"archives": 0, "problems": [], "overdue": {}}
+
+    async for archive in repos.archives.find({"collection": {"$in": collections}}).sort("start", 1):
+        report["archives"] += 1
+        report["problems"].extend(await verify_archive(archive))
+
+    # Rows past their TTL that no pass has picked up yet
+    for collection in collections:
+        days = RETENTION_DAYS.get(collection, 0)
+        if days > 0:
+            overdue = await repos[collection].count_documents({"timestamp": {"$lt": retention_cutoff(days)}})
+            if overdue:
+                report["overdue"][collection] = overdue
+    return report
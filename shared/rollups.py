@@ -0,0 +1,180 @@
+# shared/rollups.py
+# Incrementally maintained vitals rollups + the history reader built on them.
+#
+# Every reading $inc's into one `vitals_rollups` document per resolution
+# (1m / 15m / 1h), keyed by (user, res, start). History charts read those
+# instead of the raw sensor_data series. The newest, still-filling bucket is
+# recomputed from raw rows so the tail of a chart is always exact.
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from shared.repositories import get_repositories
+from shared.database import read_db
+from shared.downsample import lttb_indices
+
+RESOLUTIONS = {
+    "1m": 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+}
+
+ROLLUP_VITALS = [
+    "heart_rate",
+    "body_temperature",
+    "skin_conductance",
+    "ecg_sigmoid",
+    "hydration_level",
+]
+
+# Upper bound on raw rows pulled for an un-rolled-up window
+RAW_HISTORY_LIMIT = 20000
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def history_window(start: Optional[datetime], end: Optional[datetime], default_hours: float = 2):
+    """UTC-normalised (start, end); defaults to the last `default_hours`."""
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(hours=default_hours)
+    if start >= end:
+        raise ValueError("start must be before end")
+    return start, end
+
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    epoch = int(_as_utc(ts).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def pick_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """Finest rollup that keeps the window under `max_points` buckets."""
+    span = (_as_utc(end) - _as_utc(start)).total_seconds()
+    for res, seconds in sorted(RESOLUTIONS.items(), key=lambda kv: kv[1]):
+        if span / seconds <= max_points:
+            return res
+    return "1h"
+
+
+async def update_rollups(user_key: str, reading: dict, hydration_status: str, timestamp: datetime):
+    repos = get_repositories()
+    values = {
+        v: reading[v] for v in ROLLUP_VITALS
+        if isinstance(reading.get(v), (int, float))
+    }
+    update = {
+        "$inc": {
+            "count": 1,
+            f"states.{hydration_status}": 1,
+            **{f"sum.{v}": x for v, x in values.items()},
+        },
+        "$min": {f"min.{v}": x for v, x in values.items()},
+        "$max": {f"max.{v}": x for v, x in values.items()},
+    }
+    ops = [
+        UpdateOne(
+            {"user": user_key, "res": res, "start": bucket_start(timestamp, seconds)},
+            update,
+            upsert=True,
+        )
+        for res, seconds in RESOLUTIONS.items()
+    ]
+    await repos.vitals_rollups.bulk_write(ops, ordered=False)
+
+
+async def _live_bucket(user_key: str, start: datetime, end: datetime) -> Optional[dict]:
+    group = {"_id": None, "count": {"$sum": 1}}
+    for v in ROLLUP_VITALS:
+        group[f"{v}"] = {"$avg": f"${v}"}
+    rows = await read_db("history").sensor_data.aggregate([
+        {"$match": {"user": user_key, "timestamp": {"$gte": start, "$lt": end}}},
+        {"$group": group},
+    ]).to_list(length=1)
+    if not rows or not rows[0]["count"]:
+        return None
+    row = rows[0]
+    return {"timestamp": start, **{v: row.get(v) for v in ROLLUP_VITALS}}
+
+
+async def _rollup_points(user_key: str, res: str, start: datetime, end: datetime) -> List[dict]:
+    seconds = RESOLUTIONS[res]
+    live_start = bucket_start(datetime.now(timezone.utc), seconds)
+    first = bucket_start(start, seconds)
+
+    cursor = read_db("history").vitals_rollups.find(
+        {"user": user_key, "res": res, "start": {"$gte": first, "$lt": min(_as_utc(end), live_start)}},
+        {"_id": 0, "start": 1, "count": 1, "sum": 1},
+    ).sort("start", 1)
+
+    points = []
+    async for doc in cursor:
+        count = doc.get("count") or 0
+        if not count:
+            continue
+        sums = doc.get("sum", {})
+        points.append({
+            "timestamp": doc["start"],
+            **{v: (sums[v] / count if v in sums else None) for v in ROLLUP_VITALS},
+        })
+
+    # Newest partial bucket straight from raw rows
+    if _as_utc(end) > live_start:
+        live = await _live_bucket(user_key, live_start, _as_utc(end))
+        if live:
+            points.append(live)
+    return points
+
+
+async def _raw_points(user_key: str, start: datetime, end: datetime) -> List[dict]:
+    # Newest first so a window over the limit loses its oldest rows, not the
+    # ones a live chart is looking at; flipped back to chronological order
+    cursor = read_db("history").sensor_data.find(
+        {"user": user_key, "timestamp": {"$gte": start, "$lte": end}},
+        {"_id": 0, "timestamp": 1, **{v: 1 for v in ROLLUP_VITALS}},
+    ).sort("timestamp", -1).limit(RAW_HISTORY_LIMIT)
+    points = await cursor.to_list(length=None)
+    points.reverse()
+    return points
+
+
+def _series(points: List[dict], max_points: Optional[int]) -> Dict[str, list]:
+    """Per-vital [[epoch_ms, value], ...], LTTB-reduced to `max_points` if given."""
+    series = {}
+    for v in ROLLUP_VITALS:
+        pairs = [
+            (int(_as_utc(p["timestamp"]).timestamp() * 1000), p[v])
+            for p in points
+            if isinstance(p.get(v), (int, float))
+        ]
+        if max_points and len(pairs) > max_points:
+            xs = [t for t, _ in pairs]
+            ys = [y for _, y in pairs]
+            pairs = [pairs[i] for i in lttb_indices(xs, ys, max_points)]
+        series[v] = [[t, y] for t, y in pairs]
+    return series
+
+
+async def read_history(
+    user_key: str,
+    start: datetime,
+    end: datetime,
+    resolution: str = "auto",
+    max_points: Optional[int] = None,
+) -> dict:
+    if resolution == "auto":
+        resolution = pick_resolution(start, end, max_points or 500)
+
+    if resolution == "raw":
+        points = await _raw_points(user_key, start, end)
+    else:
+        points = await _rollup_points(user_key, resolution, start, end)
+
+    return {
+        "user": user_key,
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "series": _series(points, max_points),
+    }
@@ -0,0 +1,67 @@
+# shared/roster.py
+# In-process coach → athlete membership index.
+#
+# Maps each coach email straight to the usernames (the `athlete_id` used on
+# alerts) and display names of their athletes, so the coach alert feed doesn't
+# have to walk coach_profile → athletes → users on every call.
+# Entries are dropped when an athlete joins a coach or a coach edits their
+# profile; the TTL bounds how stale other workers can get.
+
+import os
+import time
+from typing import Dict, Optional
+from shared.repositories import get_repositories
+
+ROSTER_TTL_SECONDS = float(os.getenv("ROSTER_TTL_SECONDS", "300"))
+
+_rosters: Dict[str, dict] = {}
+
+
+def username_to_pretty(name: str) -> str:
+    return name.replace(".", " ").title() if name else "Unknown"
+
+
+async def _load_roster(coach_email: str) -> dict:
+    repos = get_repositories()
+    profile = await repos.coach_profile.find_one({"email": coach_email}, {"name": 1})
+
+    athlete_docs = await repos.athletes.find(
+        {"assigned_by": coach_email}, {"email": 1}
+    ).to_list(length=None)
+    athlete_emails = [a["email"] for a in athlete_docs if "email" in a]
+
+    user_docs = []
+    if athlete_emails:
+        user_docs = await repos.users.find(
+            {"email": {"$in": athlete_emails}}, {"email": 1, "username": 1, "name": 1}
+        ).to_list(length=None)
+
+    athletes = {
+        u["username"]: u.get("name") or username_to_pretty(u["username"])
+        for u in user_docs
+        if "email" in u and "username" in u
+    }
+
+    return {
+        "coach_name": profile.get("name") if profile else None,
+        "athletes": athletes,
+        "loaded_at": time.monotonic(),
+    }
+
+
+async def get_coach_roster(coach_email: str) -> dict:
+    """
+    Returns {"coach_name": str | None, "athletes": {username: display name}}.
+    """
+    entry = _rosters.get(coach_email)
+    if entry is None or time.monotonic() - entry["loaded_at"] > ROSTER_TTL_SECONDS:
+        entry = await _load_roster(coach_email)
+        _rosters[coach_email] = entry
+    return entry
+
+
+def invalidate_coach_roster(coach_email: Optional[str] = None):
+    if coach_email is None:
+        _rosters.clear()
+    else:
+        _rosters.pop(coach_email, None)
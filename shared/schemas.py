@@ -2,6 +2,7 @@
 from pydantic import BaseModel, validator
 from pydantic.config import ConfigDict
 from typing import Literal
+from shared.hydration import status_label
 
 class UserSignup(BaseModel):
     first_name: str
@@ -48,9 +49,4 @@ class UserLogin(BaseModel):
     )
 
 def hydration_status_from_percent(level: float) -> str:
-    if level >= 85:
-        return "Hydrated"
-    elif 70 <= level < 85:
-        return "Slightly Dehydrated"
-    else:
-        return "Dehydrated"
\ No newline at end of file
+    return status_label(level)
\ No newline at end of file
@@ -0,0 +1,227 @@
+# shared/spool.py
+# Durable local spool for ingest while MongoDB is unreachable.
+#
+# One append-only, memory-mapped file per worker. Each record is a
+# length-prefixed BSON document {"c": collection, "d": doc}, so datetimes and
+# ObjectIds survive the round trip untouched. Documents carry their `_id`
+# from before the first insert attempt, which makes replay idempotent: a doc
+# that did reach Mongo just comes back as a duplicate key and is skipped.
+#
+# File layout:
+#   header  magic(4) version(4) read_offset(8) write_offset(8) records(8)
+#   records [len(4) bson(len)] ...
+#
+# Each worker holds an exclusive flock on its own file; any spool file in the
+# directory that can be locked belongs to a dead worker and can be replayed.
+
+import fcntl
+import glob
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, List, Optional, Tuple
+import bson
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"HSPL"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQQ")
+LENGTH = struct.Struct("<I")
+DUPLICATE_KEY = 11000
+
+
+class SpoolFull(Exception):
+    pass
+
+
+class Spool:
+    def __init__(self, path: str, initial_size: int = 1 << 20, max_size: int = 256 << 20):
+        self.path = path
+        self.initial_size = max(initial_size, HEADER.size + LENGTH.size)
+        self.max_size = max_size
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self.read_offset = HEADER.size
+        self.write_offset = HEADER.size
+        self.records = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.last_replay_rate = 0.0
+        self.last_error: Optional[str] = None
+
+    # ---------- file handling ----------
+
+    def open(self, blocking: bool = False):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a+b")
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._file.fileno(), flags)
+        except OSError:
+            self._file.close()
+            self._file = None
+            raise
+
+        if os.path.getsize(self.path) < self.initial_size:
+            self._file.truncate(self.initial_size)
+        self._map()
+
+        magic, version, read_offset, write_offset, records = HEADER.unpack_from(self._mm, 0)
+        if magic == MAGIC and version == VERSION:
+            self.read_offset, self.write_offset, self.records = read_offset, write_offset, records
+        else:
+            self._write_header()
+        return self
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._mm is not None
+
+    def _map(self):
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self.read_offset, self.write_offset, self.records)
+
+    def _ensure_capacity(self, needed: int):
+        size = len(self._mm)
+        if self.write_offset + needed <= size:
+            return
+        new_size = size
+        while self.write_offset + needed > new_size:
+            new_size *= 2
+        if new_size > self.max_size:
+            raise SpoolFull(f"Spool {self.path} would exceed {self.max_size} bytes")
+        self._mm.flush()
+        self._mm.close()
+        self._file.truncate(new_size)
+        self._map()
+
+    # ---------- append / read ----------
+
+    def append(self, collection: str, docs: List[dict]):
+        payload = bytearray()
+        for doc in docs:
+            record = bson.encode({"c": collection, "d": doc})
+            payload += LENGTH.pack(len(record)) + record
+
+        self._ensure_capacity(len(payload))
+        self._mm[self.write_offset:self.write_offset + len(payload)] = payload
+        self.write_offset += len(payload)
+        self.records += len(docs)
+        self.spooled += len(docs)
+        self._write_header()
+        self._mm.flush()
+
+    def read_batch(self, max_records: int) -> Tuple[List[Tuple[str, dict]], int]:
+        """Up to `max_records` pending records and the offset just past them."""
+        items = []
+        offset = self.read_offset
+        while offset < self.write_offset and len(items) < max_records:
+            (length,) = LENGTH.unpack_from(self._mm, offset)
+            start = offset + LENGTH.size
+            record = bson.decode(self._mm[start:start + length])
+            items.append((record["c"], record["d"]))
+            offset = start + length
+        return items, offset
+
+    def commit(self, offset: int, count: int):
+        """Mark everything before `offset` as replayed."""
+        self.read_offset = offset
+        self.records = max(self.records - count, 0)
+        if self.read_offset >= self.write_offset:
+            # Drained: rewind and give the space back
+            self.read_offset = self.write_offset = HEADER.size
+            self.records = 0
+            if len(self._mm) > self.initial_size:
+                self._mm.close()
+                self._file.truncate(self.initial_size)
+                self._map()
+        self._write_header()
+        self._mm.flush()
+
+    @property
+    def pending(self) -> int:
+        return self.records
+
+    # ---------- replay ----------
+
+    async def replay(self, db, batch_size: int = 500) -> int:
+        """Bulk-insert pending records into `db`; connection errors propagate and leave the rest pending."""
+        total = 0
+        started = time.monotonic()
+        while self.pending:
+            items, offset = self.read_batch(batch_size)
+            by_collection = {}
+            for collection, doc in items:
+                by_collection.setdefault(collection, []).append(doc)
+
+            for collection, docs in by_collection.items():
+                try:
+                    await db[collection].insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    # Unordered: everything else in the batch went in. Duplicates
+                    # are earlier partial successes; anything else can never
+                    # succeed, so log it rather than wedge the spool.
+                    errors = e.details.get("writeErrors", [])
+                    duplicates = sum(1 for err in errors if err.get("code") == DUPLICATE_KEY)
+                    self.duplicates += duplicates
+                    self.rejected += len(errors) - duplicates
+                    if len(errors) > duplicates:
+                        logger.error(f"Spool replay rejected {len(errors) - duplicates} docs for {collection}")
+
+            self.commit(offset, len(items))
+            self.replayed += len(items)
+            total += len(items)
+
+        elapsed = time.monotonic() - started
+        if total:
+            self.last_replay_rate = total / elapsed if elapsed > 0 else float(total)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "open": self.is_open,
+            "pending": self.pending,
+            "bytes": max(self.write_offset - self.read_offset, 0),
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "replay_rate": round(self.last_replay_rate, 1),
+            "last_error": self.last_error,
+        }
+
+
+def claim_orphaned_spools(directory: str, exclude: Optional[str] = None) -> Iterator[Spool]:
+    """
+    Open and lock, in one step, each spool file in `directory` whose owning
+    worker is gone. Files another worker holds (or claims first) are skipped.
+    The caller closes each yielded spool.
+    """
+    for path in sorted(glob.glob(os.path.join(directory, "spool-*.bin"))):
+        if exclude and os.path.abspath(path) == os.path.abspath(exclude):
+            continue
+        try:
+            yield Spool(path).open()
+        except OSError:
+            continue
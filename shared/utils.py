@@ -1,10 +1,8 @@
+from shared.hydration import status_key
+
+
 def get_status_label(level: float) -> str:
-    if level < 70:
-        return "dehydrated"
-    elif level < 85:
-        return "slightly_dehydrated"
-    else:
-        return "hydrated"
+    return status_key(level)
 
 def format_status_for_coach(status: str) -> str:
     return f"Status changed to {status.replace('_', ' ').capitalize()}"
\ No newline at end of file
@@ -0,0 +1,168 @@
+# shared/write_behind.py
+# In-process write-behind queue for high-rate inserts.
+#
+# Requests hand their document to `submit()` and return immediately; a worker
+# task coalesces everything queued (across all athletes) into insert_many
+# batches, flushed when `max_batch` documents are waiting or `flush_interval`
+# seconds have passed since the first one. The queue is bounded: once it's
+# full a submit waits up to `put_timeout` for room, then falls back to a
+# direct insert so memory stays bounded and callers feel the backpressure.
+#
+# An optional `fallback(docs) -> bool` takes over batches that failed to
+# flush and documents that found the queue saturated (e.g. a local spool);
+# returning False means it couldn't take them either.
+#
+# `collection` may also be a zero-argument callable returning the collection,
+# resolved on every write so a swapped repository backend is picked up.
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        collection,
+        max_batch: int = 500,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+        put_timeout: float = 0.05,
+        enabled: bool = True,
+        fallback: Optional[Callable[[List[dict]], Awaitable[bool]]] = None,
+    ):
+        self._collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.enabled = enabled
+        self.fallback = fallback
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.overflow = 0
+        self.failed = 0
+        self.handed_off = 0
+
+    @property
+    def collection(self):
+        if hasattr(self._collection, "insert_one"):
+            return self._collection
+        return self._collection()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.enabled or self.running:
+            return
+        # Queue has to be created on the serving event loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued so far, then stop the worker."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, doc: dict):
+        if not self.running:
+            await self.collection.insert_one(doc)
+            return
+
+        try:
+            self._queue.put_nowait(doc)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        try:
+            await asyncio.wait_for(self._queue.put(doc), self.put_timeout)
+        except asyncio.TimeoutError:
+            # Saturated: hand off or write this one inline rather than grow without bound
+            self.overflow += 1
+            if not await self._hand_off([doc]):
+                await self._write_direct(doc)
+
+    async def _hand_off(self, docs: List[dict]) -> bool:
+        if self.fallback is None:
+            return False
+        try:
+            handled = await self.fallback(docs)
+        except Exception as e:
+            logger.error(f"Write-behind fallback failed: {e}")
+            return False
+        if handled:
+            self.handed_off += len(docs)
+        return handled
+
+    async def _write_direct(self, doc: dict):
+        await self.collection.insert_one(doc)
+        self.written += 1
+
+    async def _flush(self, batch: list):
+        if not batch:
+            return
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            if await self._hand_off(batch):
+                logger.warning(f"Write-behind flush failed ({e}); {len(batch)} docs handed off")
+                return
+            self.failed += len(batch)
+            logger.error(f"Write-behind flush of {len(batch)} docs failed: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "batches": self.batches,
+            "overflow": self.overflow,
+            "failed": self.failed,
+            "handed_off": self.handed_off,
+        }
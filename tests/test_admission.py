@@ -0,0 +1,115 @@
+# tests/test_admission.py
+
+import asyncio
+import pytest
+from shared.admission import (
+    AdmissionController, AdmissionMiddleware, Shed, classify, render_metrics, HIGH, NORMAL, LOW
+)
+
+def make_controller(**kwargs):
+    options = dict(
+        max_concurrency=2, high_reserved=1, low_concurrency=1,
+        queue_budgets={HIGH: 1.0, NORMAL: 1.0, LOW: 0.05},
+        queue_limits={HIGH: 10, NORMAL: 10, LOW: 1},
+    )
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_classify_routes():
+    assert classify("/data/raw-receive") == HIGH
+    assert classify("/coach/alerts/resolve/1") == HIGH
+    assert classify("/athletes/history/a@x.com") == LOW
+    assert classify("/coach/export/sensor_data") == LOW
+    assert classify("/dashboard/") == NORMAL
+    assert classify("/metrics") is None
+    assert classify("/data/ingest/status") is None
+
+def test_freed_slot_goes_to_highest_class():
+    async def scenario():
+        c = make_controller()
+        await c.acquire(HIGH)
+        await c.acquire(HIGH)
+        order = []
+
+        async def wait(priority):
+            await c.acquire(priority)
+            order.append(priority)
+
+        normal = asyncio.create_task(wait(NORMAL))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(wait(HIGH))
+        await asyncio.sleep(0)
+        assert c.queue_depth(NORMAL) == 1 and c.queue_depth(HIGH) == 1
+
+        c.release(HIGH, 0.01)
+        await settle()
+        assert order == [HIGH]
+        c.release(HIGH, 0.01)
+        await asyncio.gather(normal, high)
+        return order
+
+    assert asyncio.run(scenario()) == [HIGH, NORMAL]
+
+def test_normal_leaves_reserved_slot_for_high():
+    async def scenario():
+        c = make_controller(queue_budgets={HIGH: 1.0, NORMAL: 0.05, LOW: 0.05})
+        await c.acquire(NORMAL)
+        with pytest.raises(Shed) as shed:
+            await c.acquire(NORMAL)
+        # The reserved slot is still free for ingest
+        await c.acquire(HIGH)
+        return shed.value, c
+
+    shed, c = asyncio.run(scenario())
+    assert shed.status_code == 429 and shed.reason == "queue_timeout"
+    assert shed.retry_after >= 1
+    assert c.shed[(NORMAL, "queue_timeout")] == 1
+
+def test_saturated_worker_sheds_with_503():
+    async def scenario():
+        c = make_controller(queue_limits={HIGH: 0, NORMAL: 0, LOW: 0})
+        await c.acquire(HIGH)
+        await c.acquire(HIGH)
+        with pytest.raises(Shed) as shed:
+            await c.acquire(HIGH)
+        return shed.value
+
+    shed = asyncio.run(scenario())
+    assert shed.status_code == 503 and shed.reason == "queue_full"
+
+def test_middleware_sheds_before_app():
+    controller = make_controller(queue_limits={HIGH: 0, NORMAL: 0, LOW: 0})
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = AdmissionMiddleware(app, controller, enabled=True)
+
+    async def request(path):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": "GET", "path": path}, None, send)
+        return sent[0]
+
+    async def scenario():
+        await controller.acquire(HIGH)
+        await controller.acquire(HIGH)
+        shed = await request("/dashboard/")
+        probe = await request("/metrics")
+        return shed, probe
+
+    shed, probe = asyncio.run(scenario())
+    assert shed["status"] == 503
+    assert (b"retry-after", b"1") in shed["headers"]
+    assert probe["status"] == 200 and calls == ["/metrics"]
+    assert 'admission_shed_total{class="normal",reason="queue_full"} 1' in render_metrics(controller)
@@ -0,0 +1,76 @@
+# tests/test_alert_engine.py
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from athlete_app.services.alert_engine import AlertEngine
+
+T0 = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def engine():
+    return AlertEngine(
+        reminder_interval=timedelta(minutes=15),
+        cooldowns={
+            "DEHYDRATED": timedelta(minutes=2), "HYDRATED": timedelta(minutes=5), "SensorWarning": timedelta(minutes=5)
+        },
+        hysteresis=3,
+    )
+
+def test_first_hydrated_reading_is_silent(engine):
+    assert engine.evaluate("john.doe", 90, T0) is None
+
+def test_only_transitions_and_reminders_are_written(engine):
+    first = engine.evaluate("john.doe", 75, T0)
+    assert first["status"] == "slightly_dehydrated"
+    assert first["status_change"] is True
+
+    # 1 Hz for ten minutes of the same state -> nothing
+    for s in range(1, 600):
+        assert engine.evaluate("john.doe", 75, T0 + timedelta(seconds=s)) is None
+
+    reminder = engine.evaluate("john.doe", 75, T0 + timedelta(minutes=15))
+    assert reminder["alert_type"] == "SLIGHTLY DEHYDRATED"
+    assert reminder["status_change"] is False
+
+def test_recovery_needs_to_clear_hysteresis(engine):
+    engine.evaluate("john.doe", 75, T0)
+    assert engine.evaluate("john.doe", 86, T0 + timedelta(seconds=1)) is None
+    assert engine.last_status("john.doe") == "slightly_dehydrated"
+
+    recovered = engine.evaluate("john.doe", 90, T0 + timedelta(seconds=2))
+    assert recovered["status"] == "hydrated"
+    assert recovered["previous_status"] == "slightly_dehydrated"
+
+def test_cooldown_suppresses_flapping_recoveries(engine):
+    engine.evaluate("john.doe", 75, T0)
+    assert engine.evaluate("john.doe", 90, T0 + timedelta(seconds=10))["alert_type"] == "HYDRATED"
+    assert engine.evaluate("john.doe", 75, T0 + timedelta(seconds=20)) is not None
+    # Recovered again inside the 5 minute cooldown
+    assert engine.evaluate("john.doe", 90, T0 + timedelta(seconds=30)) is None
+    assert engine.last_status("john.doe") == "hydrated"
+
+def test_worsening_bypasses_cooldown(engine):
+    assert engine.evaluate("john.doe", 65, T0)["alert_type"] == "DEHYDRATED"
+    assert engine.evaluate("john.doe", 75, T0 + timedelta(seconds=10)) is not None
+    # Back to dehydrated inside the 2 minute cooldown still alerts
+    worse = engine.evaluate("john.doe", 65, T0 + timedelta(seconds=20))
+    assert worse["alert_type"] == "DEHYDRATED" and worse["status_change"] is True
+    # A reminder for the same status still waits out the cooldown and interval
+    assert engine.evaluate("john.doe", 65, T0 + timedelta(seconds=30)) is None
+
+def test_sensor_warning_cooldown(engine):
+    assert engine.allow("john.doe", "SensorWarning", T0)
+    assert not engine.allow("john.doe", "SensorWarning", T0 + timedelta(minutes=1))
+    assert engine.allow("john.doe", "SensorWarning", T0 + timedelta(minutes=5))
+    assert engine.allow("jane.doe", "SensorWarning", T0)
+
+def test_state_is_bounded():
+    engine = AlertEngine(reminder_interval=timedelta(minutes=15), capacity=2)
+    engine.evaluate("a", 65, T0)
+    engine.evaluate("b", 65, T0)
+    # Touching "a" makes "b" the least recently seen
+    engine.evaluate("a", 65, T0 + timedelta(seconds=1))
+    engine.evaluate("c", 65, T0)
+    assert engine.last_status("b") is None and engine.last_status("a") == "dehydrated"
+    # "b" starts over, so its next reading counts as a fresh transition
+    assert engine.evaluate("b", 65, T0 + timedelta(seconds=2))["status_change"] is True
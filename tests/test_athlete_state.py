@@ -0,0 +1,79 @@
+# tests/test_athlete_state.py
+
+import asyncio
+from datetime import timedelta
+import pytest
+import shared.repositories as repositories
+from shared.athlete_state import AthleteStateCache
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories, seed
+from athlete_app.services.alert_engine import AlertEngine
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def repos():
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    seed(repos, "athletes", [
+        {"email": "a@x.com", "status": "Dehydrated", "hydration_level": 65, "assigned_by": "coach@x.com"},
+        {"email": "b@x.com", "status": "Hydrated", "hydration_level": 90, "assigned_by": "other@x.com"},
+    ])
+    set_repositories(repos)
+    yield repos
+    set_repositories(previous)
+
+def test_warm_cache_answers_coach_without_lookup(repos):
+    cache = AthleteStateCache(clock=Clock())
+    assert asyncio.run(cache.warm(repos)) == 2
+    asyncio.run(repos.athletes.delete_many({}))
+
+    assert asyncio.run(cache.coach_for("a@x.com")) == "coach@x.com"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 0
+
+def test_miss_loads_once_and_ttl_expires(repos):
+    clock = Clock()
+    cache = AthleteStateCache(ttl_seconds=60, clock=clock)
+    assert asyncio.run(cache.coach_for("b@x.com")) == "other@x.com"
+    assert asyncio.run(cache.coach_for("b@x.com")) == "other@x.com"
+    assert cache.stats()["misses"] == 1
+
+    clock.now = 61
+    asyncio.run(cache.coach_for("b@x.com"))
+    assert cache.stats()["misses"] == 2
+    assert asyncio.run(cache.coach_for("nobody@x.com")) is None
+
+def test_record_write_hands_back_foreign_previous_state():
+    cache = AthleteStateCache(clock=Clock())
+    before = {"hydration_level": 65, "status": "Dehydrated", "assigned_by": "coach@x.com"}
+
+    # Cold worker: adopt what was stored before this reading
+    assert cache.record_write("a@x.com", before, {"hydration_level": 65, "status": "Dehydrated"}) == 65
+    # This worker wrote the previous state: nothing to adopt
+    assert cache.record_write("a@x.com", before, {"hydration_level": 75, "status": "Slightly Dehydrated"}) is None
+    # Another worker wrote 90 since: adopt it
+    before = {"hydration_level": 90, "status": "Hydrated", "assigned_by": "coach@x.com"}
+    assert cache.record_write("a@x.com", before, {"hydration_level": 65, "status": "Dehydrated"}) == 90
+    assert cache.get("a@x.com")["coach"] == "coach@x.com"
+
+def test_synced_engine_does_not_repeat_transition():
+    engine = AlertEngine(reminder_interval=timedelta(minutes=15))
+    first = engine.evaluate("a", 65)
+    assert first["status_change"] is True
+
+    # Restarted worker that learned the previous level from the athletes swap
+    restarted = AlertEngine(reminder_interval=timedelta(minutes=15))
+    restarted.sync("a", 65)
+    decision = restarted.evaluate("a", 65)
+    assert decision["status_change"] is False
+
+def test_state_is_bounded():
+    cache = AthleteStateCache(capacity=2, clock=Clock())
+    for email in ("a", "b", "c"):
+        cache.record_write(email, {"hydration_level": 90}, {"hydration_level": 90})
+    assert cache.get("a") is None and cache.stats()["tracked"] == 2
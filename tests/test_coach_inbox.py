@@ -0,0 +1,74 @@
+# tests/test_coach_inbox.py
+
+import asyncio
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import shared.repositories as repositories
+from shared.coach_inbox import append_to_inbox, backfill_inbox, read_inbox, unseeded_athletes
+from shared.database import ensure_indexes
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories
+
+@pytest.fixture
+def repos():
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    asyncio.run(ensure_indexes(repos))
+    yield repos
+    set_repositories(previous)
+
+def alert(athlete, hour, day=1):
+    return {"_id": ObjectId(), "athlete_id": athlete, "status_change": True, "timestamp": datetime(2025, 6, day, hour)}
+
+def test_backfill_is_keyed_by_alert_id(repos):
+    history = [alert("ann", 8), alert("ann", 9), alert("ann", 10, day=2)]
+
+    async def scenario():
+        # A live append lands before the backfill reads the same alert
+        await append_to_inbox("c@x.com", history[1]["_id"], history[1])
+        await backfill_inbox("c@x.com", ["ann"], history)
+        await backfill_inbox("c@x.com", ["ann"], history)
+        await append_to_inbox("c@x.com", history[2]["_id"], history[2])
+        return await read_inbox("c@x.com"), await repos.coach_inbox.find({}).to_list(length=None)
+
+    entries, buckets = asyncio.run(scenario())
+    assert [e["alert_id"] for e in entries] == [h["_id"] for h in reversed(history)]
+    assert sorted(b["count"] for b in buckets) == [1, 2]
+
+def test_athletes_joining_later_are_backfilled(repos):
+    async def scenario():
+        assert await unseeded_athletes("c@x.com", ["ann"]) == ["ann"]
+        await backfill_inbox("c@x.com", ["ann"], [alert("ann", 8)])
+        # Roster grows: only the newcomer still needs a backfill
+        missing = await unseeded_athletes("c@x.com", ["ann", "bob"])
+        await backfill_inbox("c@x.com", missing, [alert("bob", 7)])
+        return missing, await unseeded_athletes("c@x.com", ["ann", "bob"]), await read_inbox("c@x.com")
+
+    missing, after, entries = asyncio.run(scenario())
+    assert missing == ["bob"] and after == []
+    assert [e["athlete_id"] for e in entries] == ["ann", "bob"]
+
+def test_append_losing_the_bucket_creation_race_still_lands(repos, monkeypatch):
+    theirs, ours = alert("ann", 8), alert("bob", 9)
+    inbox = repos.coach_inbox
+    real_update = inbox.update_one
+
+    async def racing_update(query, update, upsert=False, **kwargs):
+        if upsert:
+            # Another worker creates the bucket between our lookup and our insert
+            monkeypatch.setattr(inbox, "update_one", real_update)
+            await append_to_inbox("c@x.com", theirs["_id"], theirs)
+            raise DuplicateKeyError("E11000 duplicate key error", 11000)
+        return await real_update(query, update, upsert=upsert, **kwargs)
+
+    monkeypatch.setattr(inbox, "update_one", racing_update)
+    asyncio.run(append_to_inbox("c@x.com", ours["_id"], ours))
+    first = asyncio.run(read_inbox("c@x.com"))
+    # A repeat still doesn't duplicate
+    asyncio.run(append_to_inbox("c@x.com", ours["_id"], ours))
+
+    assert [e["alert_id"] for e in first] == [ours["_id"], theirs["_id"]]
+    assert asyncio.run(read_inbox("c@x.com")) == first
@@ -0,0 +1,73 @@
+# tests/test_coach_stats.py
+
+import asyncio
+import pytest
+import shared.repositories as repositories
+from shared.coach_stats import get_coach_stats, reconcile_coach_stats, record_athlete_change
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories, seed
+
+@pytest.fixture
+def repos():
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    seed(repos, "athletes", [
+        {"email": "ann@x.com", "assigned_by": "c@x.com", "hydration_level": 90, "status": "Hydrated"},
+        {"email": "bob@x.com", "assigned_by": "c@x.com", "hydration_level": 80, "status": "Slightly Dehydrated"},
+    ])
+    yield repos
+    set_repositories(previous)
+
+async def stored(repos):
+    return await repos.coach_stats.find_one({"coach": "c@x.com"}, {"_id": 0})
+
+async def write(repos, email, level, status):
+    before = await repos.athletes.find_one({"email": email})
+    after = {"hydration_level": level, "status": status}
+    await repos.athletes.update_one({"email": email}, {"$set": after})
+    await record_athlete_change("c@x.com", before, after)
+
+def test_delta_racing_the_first_rebuild_is_not_lost(repos, monkeypatch):
+    stats = repos.coach_stats
+    real_update = stats.update_one
+
+    async def racing_update(query, update, upsert=False, **kwargs):
+        if upsert:
+            # A reading lands after the aggregation but before the insert:
+            # its $inc finds no document yet
+            monkeypatch.setattr(stats, "update_one", real_update)
+            await write(repos, "ann@x.com", 60, "Dehydrated")
+        return await real_update(query, update, upsert=upsert, **kwargs)
+
+    monkeypatch.setattr(stats, "update_one", racing_update)
+
+    async def scenario():
+        await get_coach_stats("c@x.com")
+        return await stored(repos)
+
+    result = asyncio.run(scenario())
+    assert result["hydration_sum"] == 60 + 80
+    assert result["status_counts"] == {"Dehydrated": 1, "Slightly Dehydrated": 1}
+
+def test_removal_decrements_and_reconcile_heals_drift(repos):
+    async def scenario():
+        await get_coach_stats("c@x.com")
+        bob = await repos.athletes.find_one({"email": "bob@x.com"})
+        await repos.athletes.delete_one({"email": "bob@x.com"})
+        await record_athlete_change("c@x.com", bob, None)
+        removed = await stored(repos)
+
+        # A change that never sent its delta, e.g. a direct DB edit
+        await repos.athletes.update_one({"email": "ann@x.com"}, {"$set": {"hydration_level": 75, "status": "Slightly Dehydrated"}})
+        checked = await reconcile_coach_stats()
+        return removed, checked, await stored(repos)
+
+    removed, checked, healed = asyncio.run(scenario())
+    assert removed["total_athletes"] == 1 and removed["hydration_sum"] == 90
+    assert removed["status_counts"] == {"Hydrated": 1, "Slightly Dehydrated": 0}
+    assert checked == 1
+    assert healed == {
+        "coach": "c@x.com", "total_athletes": 1, "hydration_sum": 75,
+        "status_counts": {"Slightly Dehydrated": 1},
+    }
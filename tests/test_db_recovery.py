@@ -0,0 +1,89 @@
+# tests/test_db_recovery.py
+
+import asyncio
+import pytest
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure
+import shared.repositories as repositories
+import athlete_app.services.ingest as ingest
+from shared.database import ensure_indexes_in_background
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories
+
+@pytest.fixture
+def repos(monkeypatch):
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    # Spool disabled: nothing absorbs writes while the database is down
+    monkeypatch.setattr(ingest, "spool", None)
+    monkeypatch.setattr(ingest, "_db_down_since", None)
+    monkeypatch.setattr(ingest, "_db_retry_at", 0.0)
+    yield repos
+    set_repositories(previous)
+
+def reading():
+    return {"_id": ObjectId(), "user": "a@x.com"}, {"_id": ObjectId(), "user": "a@x.com"}
+
+def test_write_recovers_without_spool(repos, monkeypatch):
+    predictions = repos.predictions
+    real_insert = predictions.insert_one
+    failures = [ConnectionFailure("blip")]
+
+    async def flaky_insert(doc, *args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return await real_insert(doc, *args, **kwargs)
+
+    monkeypatch.setattr(predictions, "insert_one", flaky_insert)
+
+    with pytest.raises(ConnectionFailure):
+        asyncio.run(ingest.write_reading(*reading()))
+    assert ingest.db_is_down()
+
+    # After the backoff one attempt goes through, succeeds and clears the latch
+    monkeypatch.setattr(ingest, "_db_retry_at", 0.0)
+    assert asyncio.run(ingest.write_reading(*reading())) is False
+    assert ingest._db_down_since is None
+    assert asyncio.run(repos.predictions.count_documents({})) == 1
+
+def test_failed_retry_backs_off_again(repos, monkeypatch):
+    monkeypatch.setattr(ingest, "DB_RETRY_SECONDS", 60)
+    ingest.mark_db_down()
+    assert not ingest.claim_db_retry()
+    monkeypatch.setattr(ingest, "_db_retry_at", 0.0)
+    assert ingest.claim_db_retry()
+    # Only one probe per backoff period
+    assert not ingest.claim_db_retry()
+
+def test_reads_and_status_leave_the_retry_to_writes(repos, monkeypatch):
+    ingest.mark_db_down()
+    monkeypatch.setattr(ingest, "_db_retry_at", 0.0)
+    # Lookups, load and status checks on the way to the write don't spend it
+    assert asyncio.run(ingest.find_ingested("a@x.com:1", confirm_only=True)) is None
+    assert ingest.ingest_load() == 1.0
+    assert ingest.db_is_down()
+    assert asyncio.run(ingest.write_reading(*reading())) is False
+    assert not ingest.db_is_down()
+
+def test_index_creation_retries_in_the_background(repos, monkeypatch):
+    stats = repos.coach_stats
+    real_create = stats.create_index
+    failures = [ConnectionFailure("down at boot")] * 2
+
+    async def flaky_create(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return await real_create(*args, **kwargs)
+
+    monkeypatch.setattr(stats, "create_index", flaky_create)
+
+    async def scenario():
+        task = await ensure_indexes_in_background(repos, retry_seconds=0)
+        # Startup carried on without the index
+        missing = "coach_1" not in stats._unique
+        await task
+        return missing
+
+    assert asyncio.run(scenario())
+    assert "coach_1" in stats._unique and not failures
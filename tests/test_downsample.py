@@ -0,0 +1,23 @@
+# tests/test_downsample.py
+
+import numpy as np
+from shared.downsample import lttb, lttb_indices
+
+def test_short_series_is_untouched():
+    assert list(lttb_indices([0, 1, 2], [5, 6, 7], 10)) == [0, 1, 2]
+
+def test_keeps_endpoints_and_threshold():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+
+def test_preserves_spikes():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[123] = 50.0
+    xs, ys = lttb(x, y, 20)
+    assert 123 in xs
+    assert ys.max() == 50.0
@@ -0,0 +1,77 @@
+# tests/test_ecg.py
+
+import base64
+import numpy as np
+import pytest
+from athlete_app.models.schemas import RawSensorInput
+from athlete_app.services.ecg import EcgStage, decode_window, detect_r_peaks
+from athlete_app.services.sensor_quality import SensorQualityMonitor
+
+FS = 250
+
+def synthetic_ecg(seconds, bpm=75, start=0.0, seed=0):
+    """Gaussian R-waves on baseline wander, mains hum and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * FS)) / FS + start
+    signal = 2048 + 200 * np.sin(2 * np.pi * 0.3 * t) + 40 * np.sin(2 * np.pi * 50 * t) + rng.normal(0, 15, len(t))
+    beats = np.arange(start, t[-1] + 1, 60 / bpm) + 0.1
+    for beat in beats:
+        signal += 900 * np.exp(-((t - beat) / 0.01) ** 2)
+    return signal, beats[beats <= t[-1]]
+
+def test_r_peaks_found_at_the_beats():
+    signal, beats = synthetic_ecg(10)
+    peaks = detect_r_peaks(signal, FS) / FS
+    assert len(peaks) == len(beats)
+    assert np.max(np.abs(peaks - beats)) < 0.02
+
+def test_window_features_and_cross_window_rr():
+    stage = EcgStage(fs=FS)
+    first = stage.process("a", synthetic_ecg(6, bpm=60)[0], end=6.0)
+    assert first["ecg_quality"] == "good"
+    assert first["ecg_heart_rate"] == pytest.approx(60, abs=1)
+    assert 0 < first["ecg_sigmoid"] < 1
+
+    rr_before = len(stage._states["a"]["rr"])
+    second = stage.process("a", synthetic_ecg(6, bpm=60, start=6.0)[0], end=12.0)
+    # 6 beats in the window plus the interval across the boundary
+    assert len(stage._states["a"]["rr"]) == rr_before + second["ecg_r_peaks"]
+    # A retried window doesn't add intervals again
+    assert stage.process("a", np.zeros(FS * 6), end=12.0) is second
+    assert len(stage._states["a"]["rr"]) == rr_before + second["ecg_r_peaks"]
+
+def test_flat_and_lead_off_windows():
+    stage = EcgStage(fs=FS)
+    assert stage.process("a", np.full(FS * 3, 2048.0), end=3.0)["ecg_quality"] == "flat"
+    assert stage.process("b", np.full(FS * 3, 4095.0), end=3.0)["ecg_quality"] == "lead_off"
+    with pytest.raises(ValueError):
+        stage.process("c", np.full(FS, 2048.0), end=3.0)
+
+def test_state_is_bounded():
+    stage = EcgStage(fs=FS, capacity=2)
+    for device in ("a", "b", "c"):
+        stage.process(device, np.full(FS * 3, 2048.0), end=3.0)
+    assert stage.stats()["devices"] == 2
+
+def test_decode_base64_window_and_schema():
+    samples = np.array([2048, 2100, 4095, 0], dtype="<u2")
+    encoded = base64.b64encode(samples.tobytes()).decode()
+    assert decode_window(encoded).tolist() == [2048, 2100, 4095, 0]
+    assert decode_window([1, 2, 3]).tolist() == [1, 2, 3]
+    with pytest.raises(ValueError):
+        decode_window("not base64!")
+
+    reading = {"max30105": {"bpm": 72}, "gy906": 36.5, "groveGsr": 1200}
+    assert RawSensorInput(**reading, ad8232_window=encoded).ad8232 is None
+    with pytest.raises(ValueError):
+        RawSensorInput(**reading)
+    for rate in (0, -250, 1e6):
+        with pytest.raises(ValueError):
+            RawSensorInput(**reading, ad8232_window=encoded, ecg_hz=rate)
+
+def test_window_median_is_left_out_of_the_flatline_check():
+    monitor = SensorQualityMonitor()
+    for t in range(15):
+        sample = {"bpm": 72.0 + t % 3, "gy906": 36.6, "groveGsr": 1200.0 + t, "ad8232": 2048}
+        result = monitor.check("a", sample, t * 10, flatline_channels=("groveGsr",))
+    assert result["flags"] == {} and not result["rejected"]
@@ -0,0 +1,85 @@
+# tests/test_export.py
+
+import asyncio
+import gzip
+import io
+from datetime import datetime, timezone
+import pandas as pd
+import pytest
+from bson import ObjectId
+import shared.export as export
+from shared.export import (
+    EXTRA_COLUMN, ArrowStreamWriter, CsvGzWriter, ParquetWriter, _ArrowWriter, export_filename, stream_export
+)
+
+def test_csv_chunks_form_one_gzip_file():
+    writer = CsvGzWriter()
+    data = writer.write([{"user": "a@b.c", "heart_rate": 70}])
+    # Second chunk has an extra field and a missing one; columns follow chunk one
+    data += writer.write([{"user": "a@b.c", "extra": 1}])
+    data += writer.close()
+
+    frame = pd.read_csv(io.BytesIO(gzip.decompress(data)))
+    assert list(frame.columns) == ["user", "heart_rate"]
+    assert len(frame) == 2
+
+def test_stream_export_yields_per_chunk(monkeypatch):
+    docs = [
+        {"_id": ObjectId(), "user": "a@b.c", "heart_rate": 70 + i, "timestamp": datetime(2024, 5, 1, 12, i)}
+        for i in range(5)
+    ]
+
+    async def fake_cursor(*args, **kwargs):
+        for doc in docs:
+            yield doc
+
+    monkeypatch.setattr(export, "export_cursor", fake_cursor)
+    start = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 5, 2, tzinfo=timezone.utc)
+
+    async def collect():
+        return [c async for c in stream_export("sensor_data", ["a@b.c"], start, end, "csv.gz", chunk_rows=2)]
+
+    chunks = asyncio.run(collect())
+    # 3 data chunks + the gzip trailer
+    assert len(chunks) == 4
+    frame = pd.read_csv(io.BytesIO(gzip.decompress(b"".join(chunks))))
+    assert list(frame["heart_rate"]) == [70, 71, 72, 73, 74]
+
+def test_export_filename_is_safe():
+    start = datetime(2024, 3, 1)
+    end = datetime(2024, 6, 1)
+    name = export_filename("predictions", "a b/c@x.com", start, end, "parquet")
+    assert name == "predictions-a_b_c_x.com-20240301-20240601.parquet"
+
+def test_arrow_writers_must_open_a_writer():
+    with pytest.raises(TypeError):
+        _ArrowWriter()
+
+DRIFTING_CHUNKS = [
+    [{"_id": "a", "bpm": 72, "ok": True, "timestamp": datetime(2024, 5, 1, 12, tzinfo=timezone.utc)}],
+    # 72.5 still fits float64; "n/a", the new column and the bool are kept aside
+    [{"_id": "b", "bpm": 72.5, "spo2": 97}, {"_id": "c", "bpm": "n/a", "ok": 1}],
+]
+
+@pytest.mark.parametrize("writer_class", [ParquetWriter, ArrowStreamWriter])
+def test_arrow_schema_absorbs_later_chunks(writer_class):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    writer = writer_class()
+    data = b"".join(writer.write(chunk) for chunk in DRIFTING_CHUNKS) + writer.close()
+    if writer_class is ParquetWriter:
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+
+    assert table.schema.field("bpm").type == pa.float64()
+    assert table.column("bpm").to_pylist() == [72.0, 72.5, None]
+    assert table.column(EXTRA_COLUMN).to_pylist() == [None, '{"spo2":97}', '{"bpm":"n/a","ok":1}']
+
+def test_empty_arrow_export_is_still_a_valid_file():
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    writer = ParquetWriter()
+    assert pq.read_table(io.BytesIO(writer.close())).num_rows == 0
@@ -0,0 +1,52 @@
+# tests/test_hydration.py
+
+import numpy as np
+from shared.hydration import (
+    ALERT_TEMPLATES, RECOVERY_TEMPLATE, STATUS_KEYS, STATUS_LABELS, count_labels, coach_summary, label_for_prediction,
+    percent_for_label, percents_for_labels, status_key, status_keys, status_label, status_label_expr, status_labels,
+    transition_template
+)
+from shared.repositories.query import evaluate
+
+LEVELS = [0, 65, 69.99, 70, 75, 84.9, 85, 90, 100]
+
+def test_cutoffs_belong_to_the_band_above():
+    assert [status_key(x) for x in LEVELS] == [
+        "dehydrated", "dehydrated", "dehydrated",
+        "slightly_dehydrated", "slightly_dehydrated", "slightly_dehydrated",
+        "hydrated", "hydrated", "hydrated",
+    ]
+
+def test_batch_matches_single_readings():
+    levels = np.random.default_rng(0).uniform(40, 100, 1000).tolist() + LEVELS
+    assert status_keys(levels).tolist() == [status_key(x) for x in levels]
+    assert status_labels(levels).tolist() == [status_label(x) for x in levels]
+    counts = count_labels(LEVELS)
+    assert counts == {"Dehydrated": 3, "Slightly Dehydrated": 3, "Hydrated": 3}
+
+def test_label_percent_round_trip():
+    # Each label's stored percent classifies back to the same label
+    for label in STATUS_LABELS:
+        assert status_label(percent_for_label(label)) == label
+    assert percent_for_label("Unknown") == 0
+    assert percents_for_labels(["Hydrated", "nope", "Dehydrated"]).tolist() == [90, 0, 65]
+
+def test_label_for_prediction():
+    assert label_for_prediction(0) == "Hydrated"
+    assert label_for_prediction(np.int64(2)) == "Dehydrated"
+    assert label_for_prediction("Slightly Dehydrated") == "Slightly Dehydrated"
+    assert label_for_prediction(7) == "Unknown"
+    assert label_for_prediction(None) == "Unknown"
+
+def test_mongo_expression_uses_same_cutoffs():
+    expr = status_label_expr()
+    assert [evaluate(expr, {"hydration_level": x}) for x in LEVELS] == [status_label(x) for x in LEVELS]
+    keys = status_label_expr("$level", STATUS_KEYS)
+    assert [evaluate(keys, {"level": x}) for x in LEVELS] == [status_key(x) for x in LEVELS]
+    assert coach_summary(69.5).startswith("The athlete is in a dehydrated state")
+
+def test_recovery_has_its_own_template():
+    assert transition_template("hydrated", "dehydrated") is RECOVERY_TEMPLATE
+    assert transition_template("hydrated", "slightly_dehydrated")["title"] == "Hydration Restored"
+    assert transition_template("slightly_dehydrated", "dehydrated") is ALERT_TEMPLATES["slightly_dehydrated"]
+    assert transition_template("dehydrated", "hydrated") is ALERT_TEMPLATES["dehydrated"]
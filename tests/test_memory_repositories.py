@@ -0,0 +1,182 @@
+# tests/test_memory_repositories.py
+
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import shared.repositories as repositories
+from shared.repositories import set_repositories
+from shared.repositories.base import Repositories
+from shared.repositories.memory import MemoryRepositories, seed
+
+T0 = datetime(2024, 5, 1, 12, 0)
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture
+def repos():
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    yield repos
+    set_repositories(previous)
+
+def test_find_filters_projects_and_sorts(repos):
+    seed(repos, "sensor_data", [
+        {"user": "a@x.com", "timestamp": T0 + timedelta(seconds=i), "heart_rate": 60 + i, "tags": ["x", str(i)]}
+        for i in range(5)
+    ])
+
+    async def scenario():
+        coll = repos.sensor_data
+        rows = await coll.find(
+            {"user": "a@x.com", "heart_rate": {"$gte": 62, "$nin": [63]}}, {"_id": 0, "heart_rate": 1}
+        ).sort("timestamp", -1).to_list(length=None)
+        latest = await coll.find_one({"user": "a@x.com"}, {"heart_rate": 1}, sort=[("timestamp", -1)])
+        tagged = await coll.count_documents({"tags": "3"})
+        missing = await coll.find_one({"user": "b@x.com"})
+        return rows, latest, tagged, missing
+
+    rows, latest, tagged, missing = run(scenario())
+    assert rows == [{"heart_rate": 64}, {"heart_rate": 62}]
+    assert latest["heart_rate"] == 64 and "_id" in latest and "user" not in latest
+    assert tagged == 1
+    assert missing is None
+
+def test_results_are_copies(repos):
+    seed(repos, "users", [{"email": "a@x.com", "profile": {"age": 20}}])
+
+    async def scenario():
+        user = await repos.users.find_one({"email": "a@x.com"})
+        user["profile"]["age"] = 99
+        return await repos.users.find_one({"email": "a@x.com"})
+
+    assert run(scenario())["profile"]["age"] == 20
+
+def test_unique_partial_index(repos):
+    async def scenario():
+        coll = repos.predictions
+        await coll.create_index(
+            [("ingest_key", 1)], unique=True,
+            partialFilterExpression={"ingest_key": {"$type": "string"}},
+        )
+        await coll.insert_one({"ingest_key": "a@x.com:1"})
+        # Documents without the key are outside the partial index
+        await coll.insert_one({"user": "a@x.com"})
+        await coll.insert_one({"user": "a@x.com"})
+        with pytest.raises(DuplicateKeyError):
+            await coll.insert_one({"ingest_key": "a@x.com:1"})
+        return await coll.count_documents({})
+
+    assert run(scenario()) == 3
+
+def test_updates_and_upserts(repos):
+    async def scenario():
+        coll = repos.coach_inbox
+        await coll.update_one(
+            {"coach": "c@x.com"},
+            {"$setOnInsert": {"created": T0}, "$push": {"alerts": {"$each": [{"alert_id": i} for i in range(4)], "$slice": -3}}},
+            upsert=True,
+        )
+        await coll.update_one(
+            {"coach": "c@x.com", "alerts.alert_id": 2}, {"$set": {"alerts.$.status": "resolved"}, "$inc": {"n": 1}}
+        )
+        await coll.update_one({"coach": "c@x.com"}, {"$setOnInsert": {"created": T0 + timedelta(days=1)}}, upsert=True)
+        return await coll.find_one_and_update(
+            {"coach": "c@x.com"}, {"$inc": {"n": 1}}, return_document=ReturnDocument.AFTER
+        )
+
+    doc = run(scenario())
+    assert [a["alert_id"] for a in doc["alerts"]] == [1, 2, 3]
+    assert doc["alerts"][1]["status"] == "resolved"
+    assert doc["created"] == T0
+    assert doc["n"] == 2
+
+def test_bulk_write_upserts(repos):
+    async def scenario():
+        ops = [UpdateOne({"key": k}, {"$inc": {"count": 1}}, upsert=True) for k in ("a", "b", "a")]
+        await repos.vitals_rollups.bulk_write(ops, ordered=False)
+        return await repos.vitals_rollups.find({}, {"_id": 0}).sort("key", 1).to_list(length=None)
+
+    assert run(scenario()) == [{"key": "a", "count": 2}, {"key": "b", "count": 1}]
+
+def test_group_and_window_aggregation(repos):
+    seed(repos, "athletes", [
+        {"email": "a@x.com", "assigned_by": "c@x.com", "status": "Hydrated"},
+        {"email": "b@x.com", "assigned_by": "c@x.com", "status": "Dehydrated"},
+        {"email": "d@x.com", "assigned_by": "c@x.com", "status": "Hydrated"},
+    ])
+    seed(repos, "predictions", [
+        {"user": "a@x.com", "timestamp": T0 + timedelta(seconds=i), "hydration_status": s}
+        for i, s in enumerate(["Hydrated", "Hydrated", "Dehydrated"])
+    ])
+
+    async def scenario():
+        groups = await repos.athletes.aggregate([
+            {"$match": {"assigned_by": "c@x.com"}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]).to_list(length=None)
+        changes = await repos.predictions.aggregate([
+            {"$setWindowFields": {
+                "partitionBy": "$user", "sortBy": {"timestamp": 1},
+                "output": {"previous": {"$shift": {"output": "$hydration_status", "by": -1}}},
+            }},
+            {"$match": {"$expr": {"$ne": ["$hydration_status", "$previous"]}}},
+            {"$project": {"_id": 0, "hydration_status": 1}},
+        ]).to_list(length=None)
+        return groups, changes
+
+    groups, changes = run(scenario())
+    assert groups == [{"_id": "Dehydrated", "count": 1}, {"_id": "Hydrated", "count": 2}]
+    assert [c["hydration_status"] for c in changes] == ["Hydrated", "Dehydrated"]
+
+def test_merge_keeps_existing(repos):
+    seed(repos, "vitals_rollups", [{"_id": "a", "count": 10}])
+    seed(repos, "sensor_data", [{"key": k} for k in ("a", "b", "b")])
+
+    async def scenario():
+        await repos.sensor_data.aggregate([
+            {"$group": {"_id": "$key", "count": {"$sum": 1}}},
+            {"$merge": {"into": "vitals_rollups", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+        ]).to_list(length=None)
+        return await repos.vitals_rollups.find({}).sort("_id", 1).to_list(length=None)
+
+    assert run(scenario()) == [{"_id": "a", "count": 10}, {"_id": "b", "count": 2}]
+
+def test_coach_athletes_pipeline(repos):
+    # The same $lookup-based pipeline the coach dashboard runs against MongoDB
+    from coach_app.api.routes.athletes import load_athletes
+
+    seed(repos, "coach_profile", [{"email": "c@x.com", "name": "Coach"}])
+    seed(repos, "athletes", [
+        {"id": "1", "email": "a@x.com", "name": "Ann", "sport": "Run", "assigned_by": "c@x.com", "status": "Hydrated"},
+        {"id": "2", "email": "b@x.com", "name": "Ben", "assigned_by": "c@x.com"},
+        {"id": "3", "email": "z@x.com", "name": "Zed", "assigned_by": "other@x.com"},
+    ])
+    seed(repos, "sensor_data", [
+        {"user": "a@x.com", "timestamp": T0, "heart_rate": 70, "hydration_level": 80.6},
+        {"user": "a@x.com", "timestamp": T0 + timedelta(minutes=1), "heart_rate": 75, "hydration_level": 60.2},
+    ])
+
+    rows = run(load_athletes({"email": "c@x.com"}))
+    assert [r["name"] for r in rows] == ["Ann", "Ben"]
+    assert rows[0]["heart_rate"] == 75.0 and rows[0]["hydration_level"] == 60
+    assert rows[1]["heart_rate"] == 0.0 and rows[1]["status"] == "Unknown"
+
+def test_unknown_collection_and_operator(repos):
+    with pytest.raises(AttributeError):
+        repos.not_a_collection
+    with pytest.raises(NotImplementedError):
+        run(repos.athletes.aggregate([{"$graphLookup": {}}]).to_list(length=None))
+
+def test_backends_must_implement_the_whole_interface():
+    class Partial(Repositories):
+        def collection(self, name):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert isinstance(MemoryRepositories(), Repositories)
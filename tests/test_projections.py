@@ -0,0 +1,21 @@
+# tests/test_projections.py
+
+import pytest
+from fastapi import HTTPException
+from shared.projections import SENSOR_WARNING_FIELDS, SENSOR_WARNING_PROJECTION, build_projection
+
+def test_default_and_requested_fields():
+    assert build_projection(None, SENSOR_WARNING_FIELDS, SENSOR_WARNING_PROJECTION) is SENSOR_WARNING_PROJECTION
+    assert build_projection("device, counts.bpm", SENSOR_WARNING_FIELDS, None) == {"device": 1, "counts.bpm": 1}
+
+def test_child_paths_collapse_into_the_requested_parent():
+    projection = build_projection(
+        "received_data.bpm,received_data,counts.bpm.spike,counts.bpm,device,device", SENSOR_WARNING_FIELDS, None
+    )
+    assert projection == {"received_data": 1, "counts.bpm": 1, "device": 1}
+
+@pytest.mark.parametrize("fields", ["secret", "device,received_data.", "counts..bpm", "counts.$where"])
+def test_unknown_or_malformed_fields_are_a_400(fields):
+    with pytest.raises(HTTPException) as e:
+        build_projection(fields, SENSOR_WARNING_FIELDS, None)
+    assert e.value.status_code == 400
@@ -0,0 +1,121 @@
+# tests/test_rate_limit.py
+
+import asyncio
+from shared.rate_limit import (
+    LocalBucketBackend, RateLimitMiddleware, SharedBucketBackend, parse_limit, route_group, render_metrics
+)
+from shared.repositories.memory import MemoryRepositories
+from shared.security import create_access_token
+
+def test_parse_limit_and_route_group():
+    assert parse_limit("2/10") == (2.0, 10.0)
+    assert parse_limit("0.5") == (0.5, 1.0)
+    assert route_group("/data/raw-receive") == "ingest"
+    assert route_group("/coach/auth/login") == "auth"
+    assert route_group("/coach/export/sensor_data") == "export"
+    assert route_group("/dashboard/") == "default"
+    assert route_group("/metrics") is None
+
+def drain(backend, key, rate, burst, now, n):
+    async def scenario():
+        return [await backend.take(key, rate, burst, now) for _ in range(n)]
+    return asyncio.run(scenario())
+
+def test_local_bucket_refills_over_time():
+    backend = LocalBucketBackend()
+    results = drain(backend, "k", 1.0, 3, 100.0, 4)
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == 1
+    # Two seconds later two tokens are back
+    results = drain(backend, "k", 1.0, 3, 102.0, 3)
+    assert [allowed for allowed, _ in results] == [True, True, False]
+
+def test_local_bucket_is_bounded():
+    backend = LocalBucketBackend(capacity=2)
+    for key in ("a", "b", "c"):
+        drain(backend, key, 1.0, 1, 0.0, 1)
+    assert list(backend._buckets) == ["b", "c"]
+
+def test_shared_bucket_pipeline_update():
+    collection = MemoryRepositories().rate_limits
+    backend = SharedBucketBackend(collection)
+    results = drain(backend, "ingest:a@x.com", 0.5, 2, 10.0, 3)
+    assert [allowed for allowed, _ in results] == [True, True, False]
+    assert results[-1][1] == 2
+
+    doc = asyncio.run(collection.find_one({"_id": "ingest:a@x.com"}))
+    assert doc["tokens"] == 0 and doc["ts"] == 10.0 and "expires_at" in doc
+    # Other workers share the same document
+    other = SharedBucketBackend(collection)
+    assert drain(other, "ingest:a@x.com", 0.5, 2, 12.0, 2) == [(True, 0), (False, 2)]
+
+def test_middleware_limits_by_token_subject():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = RateLimitMiddleware(app, LocalBucketBackend(), {"ingest": (0.001, 1)}, enabled=True)
+
+    async def request(token, client):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/data/raw-receive", "client": (client, 1234),
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+        await middleware(scope, None, send)
+        return sent[0]
+
+    a = create_access_token({"sub": "a@x.com"})
+    b = create_access_token({"sub": "b@x.com"})
+
+    async def scenario():
+        # Same subject from two addresses shares one bucket
+        return [await request(a, "10.0.0.1"), await request(a, "10.0.0.2"), await request(b, "10.0.0.1")]
+
+    first, limited, other = asyncio.run(scenario())
+    assert first["status"] == 200 and other["status"] == 200
+    assert limited["status"] == 429
+    assert any(k == b"retry-after" for k, _ in limited["headers"])
+    assert len(calls) == 2
+    assert 'rate_limited_total{group="ingest"}' in render_metrics()
+
+def test_device_id_adds_a_bucket_but_never_replaces_the_subject():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    # Device bucket (2) is stricter than the subject's (3)
+    middleware = RateLimitMiddleware(
+        app, LocalBucketBackend(), {"ingest": (0.001, 3)}, enabled=True, device_limits={"ingest": (0.001, 2)}
+    )
+    token = create_access_token({"sub": "a@x.com"})
+
+    async def status(device):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/data/raw-receive", "client": ("10.0.0.1", 1234),
+            "headers": [(b"authorization", f"Bearer {token}".encode()), (b"x-device-id", device.encode())],
+        }
+        await middleware(scope, None, send)
+        return sent[0]["status"]
+
+    async def scenario():
+        same = [await status("band-1") for _ in range(3)]
+        # A fresh device id doesn't buy fresh tokens: one left on the subject
+        rotated = [await status(f"band-{i}") for i in range(2, 5)]
+        return same, rotated
+
+    same, rotated = asyncio.run(scenario())
+    assert same == [200, 200, 429]
+    assert rotated == [200, 429, 429]
@@ -0,0 +1,90 @@
+# tests/test_read_preference.py
+#
+# Policy checks run anywhere. The replica-set test needs a local replica set:
+#   MONGO_REPLSET_URI="mongodb://localhost:27017,localhost:27018/?replicaSet=rs0" pytest
+
+import asyncio
+import os
+import pytest
+from starlette.requests import Request
+from shared.repositories import get_repositories
+from shared.database import read_db, read_mode, primary_reads, READ_MAX_STALENESS_SECONDS
+from shared.response_cache import LocalCacheBackend, set_cache_backend, cached_json, bump_coach_version
+
+def make_request():
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+def test_ingest_stays_on_primary():
+    assert read_mode("ingest") == "primary"
+    assert read_db("ingest") is get_repositories()
+    assert read_db("unknown-group") is get_repositories()
+
+def test_coach_reads_use_bounded_staleness_secondaries():
+    handle = read_db("coach")
+    assert handle is not get_repositories()
+    assert handle.read_preference.mongos_mode == "secondaryPreferred"
+    assert handle.read_preference.max_staleness == READ_MAX_STALENESS_SECONDS
+    assert read_db("history").read_preference.mongos_mode == "secondaryPreferred"
+    assert read_db("export").read_preference.mongos_mode == "secondaryPreferred"
+
+def test_primary_reads_overrides_policy():
+    with primary_reads():
+        assert read_db("coach") is get_repositories()
+    assert read_db("coach") is not get_repositories()
+
+def test_cached_rebuild_after_bump_reads_primary(monkeypatch):
+    backend = LocalCacheBackend()
+    set_cache_backend(backend)
+    modes = []
+
+    async def build():
+        modes.append(read_mode("coach"))
+        return []
+
+    async def scenario():
+        await bump_coach_version("coach@x.com", "athletes")
+        await cached_json(make_request(), "athletes", "coach@x.com", build, read_group="coach")
+
+        # Same bump, long past the staleness bound: secondaries are safe again
+        backend._bumped_at["athletes:coach@x.com"] -= READ_MAX_STALENESS_SECONDS + 1
+        backend._bodies.clear()
+        await cached_json(make_request(), "athletes", "coach@x.com", build, read_group="coach")
+
+    asyncio.run(scenario())
+    assert modes == ["primary", "secondaryPreferred"]
+
+@pytest.mark.skipif(not os.getenv("MONGO_REPLSET_URI"), reason="needs a local replica set (MONGO_REPLSET_URI)")
+def test_replica_set_routing():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import WriteConcern
+
+    async def scenario():
+        client = AsyncIOMotorClient(os.getenv("MONGO_REPLSET_URI"))
+        try:
+            primary = client.get_database("read_preference_test", write_concern=WriteConcern(w="majority"))
+            coach = client.get_database(
+                "read_preference_test", read_preference=database.read_preference(database.READ_POLICIES["coach"])
+            )
+            await primary.probe.drop()
+            await primary.probe.insert_one({"n": 1})
+
+            hello = await primary.command("hello")
+            assert hello.get("setName"), "not a replica set"
+
+            # A majority write shows up on the secondary well inside the staleness bound
+            for _ in range(50):
+                if await coach.probe.find_one({"n": 1}):
+                    break
+                await asyncio.sleep(0.1)
+            else:
+                pytest.fail("secondary never caught up")
+
+            if len(hello.get("hosts", [])) > 1:
+                explain = await coach.probe.find({"n": 1}).explain()
+                served_by = f"{explain['serverInfo']['host']}:{explain['serverInfo']['port']}"
+                assert served_by != hello["primary"]
+            await primary.probe.drop()
+        finally:
+            client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+# tests/test_receive.py
+
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import shared.repositories as repositories
+import athlete_app.api.routes.data as data
+import athlete_app.services.ingest as ingest
+from athlete_app.api.deps import require_athlete
+from athlete_app.api.routes.alerts import alert_engine
+from shared.athlete_state import athlete_state
+from shared.coach_stats import get_coach_stats
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories, seed
+
+USER = {"username": "ann", "email": "ann@x.com", "role": "athlete"}
+
+@pytest.fixture
+def client(monkeypatch):
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    seed(repos, "athletes", [
+        {"email": "ann@x.com", "assigned_by": "c@x.com", "hydration_level": 90, "status": "Hydrated"},
+        {"email": "bob@x.com", "assigned_by": "c@x.com", "hydration_level": 80, "status": "Slightly Dehydrated"},
+    ])
+    monkeypatch.setattr(ingest, "spool", None)
+    monkeypatch.setattr(ingest, "_db_down_since", None)
+    # Model class 2 = "Dehydrated", stored as 65%
+    monkeypatch.setattr(data, "predict_hydration", lambda reading: (2, 60.0))
+    athlete_state.forget()
+    alert_engine.reset()
+
+    app = FastAPI()
+    app.include_router(data.router, prefix="/data")
+    app.dependency_overrides[require_athlete] = lambda: USER
+    yield TestClient(app), repos
+    athlete_state.forget()
+    alert_engine.reset()
+    set_repositories(previous)
+
+def test_receive_keeps_coach_averages_and_state_in_step(client):
+    http, repos = client
+    stats = asyncio.run(get_coach_stats("c@x.com"))
+    assert stats["hydration_sum"] == 170
+
+    # The client's own hydration_level must not reach the athletes document
+    reading = {
+        "hydration_level": 40, "heart_rate": 80.0, "body_temperature": 36.6,
+        "skin_conductance": 1200.0, "ecg_sigmoid": 0.5, "combined_metrics": 329.3,
+    }
+    resyncs = athlete_state.stats()["resyncs"]
+    for _ in range(2):
+        assert http.post("/data/receive", json=reading).status_code == 200
+
+    async def stored():
+        athlete = await repos.athletes.find_one({"email": "ann@x.com"})
+        return athlete, await repos.coach_stats.find_one({"coach": "c@x.com"})
+
+    athlete, stats = asyncio.run(stored())
+    assert athlete["hydration_level"] == 65 and athlete["status"] == "Dehydrated"
+    assert stats["hydration_sum"] == 65 + 80
+    assert stats["status_counts"] == {"Dehydrated": 1, "Hydrated": 0, "Slightly Dehydrated": 1}
+    # Only the cold first write is adopted as foreign; the second matches the cache
+    assert athlete_state.stats()["resyncs"] == resyncs + 1
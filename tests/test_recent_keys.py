@@ -0,0 +1,30 @@
+# tests/test_recent_keys.py
+
+from shared.recent_keys import RecentKeysFilter
+
+def test_added_keys_are_always_found():
+    keys = RecentKeysFilter(capacity=1000)
+    for i in range(1000):
+        keys.add(f"athlete@example.com:{1749538669 + i}")
+    assert all(f"athlete@example.com:{1749538669 + i}" in keys for i in range(1000))
+
+def test_false_positive_rate_is_bounded():
+    keys = RecentKeysFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        keys.add(f"seen:{i}")
+    hits = sum(f"unseen:{i}" in keys for i in range(5000))
+    assert hits < 5000 * 0.03
+
+def test_rotation_forgets_oldest_generation():
+    keys = RecentKeysFilter(capacity=100)
+    for i in range(100):
+        keys.add(f"old:{i}")
+    for i in range(100):
+        keys.add(f"mid:{i}")
+    assert "old:0" in keys and "mid:0" in keys
+
+    for i in range(100):
+        keys.add(f"new:{i}")
+    assert keys.rotations == 2
+    assert "mid:0" in keys and "new:99" in keys
+    assert sum(f"old:{i}" in keys for i in range(100)) < 10
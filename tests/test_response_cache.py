@@ -0,0 +1,60 @@
+# tests/test_response_cache.py
+
+import asyncio
+import pytest
+from pydantic import BaseModel
+from starlette.requests import Request
+from shared.response_cache import LocalCacheBackend, set_cache_backend, cached_json, bump_coach_version
+
+class Row(BaseModel):
+    id: str
+    level: int
+
+def make_request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+@pytest.fixture(autouse=True)
+def backend():
+    backend = LocalCacheBackend()
+    set_cache_backend(backend)
+    return backend
+
+def test_cached_body_and_304():
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return [{"id": "a", "level": 90, "extra": "dropped"}]
+
+    async def scenario():
+        first = await cached_json(make_request(), "athletes", "coach@x.com", build, list[Row])
+        assert first.body == b'[{"id":"a","level":90}]'
+
+        again = await cached_json(make_request(), "athletes", "coach@x.com", build, list[Row])
+        assert again.body == first.body
+
+        etag = first.headers["etag"]
+        not_modified = await cached_json(make_request(etag), "athletes", "coach@x.com", build, list[Row])
+        assert not_modified.status_code == 304
+
+        await bump_coach_version("coach@x.com", "athletes")
+        fresh = await cached_json(make_request(etag), "athletes", "coach@x.com", build, list[Row])
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+def test_versions_are_per_coach_and_scope():
+    async def scenario(backend):
+        await bump_coach_version("coach@x.com", "alerts")
+        await bump_coach_version("other@x.com")
+        return (
+            await backend.get_version("alerts:coach@x.com"),
+            await backend.get_version("athletes:coach@x.com"),
+            await backend.get_version("dashboard:other@x.com"),
+        )
+
+    from shared.response_cache import get_cache_backend
+    assert asyncio.run(scenario(get_cache_backend())) == (1, 0, 1)
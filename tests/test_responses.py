@@ -0,0 +1,43 @@
+# tests/test_responses.py
+
+import asyncio
+from datetime import datetime
+import orjson
+from bson import ObjectId
+from shared.responses import dumps, iter_json_array
+
+OID = ObjectId("665b1f0c2f4e8a1b2c3d4e5f")
+TS = datetime(2025, 6, 1, 12, 30, 5, 123000)
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+def collect(cursor, **kwargs):
+    async def run():
+        return b"".join([chunk async for chunk in iter_json_array(cursor, **kwargs)])
+    return asyncio.run(run())
+
+def test_bson_types_are_encoded():
+    assert orjson.loads(dumps({"_id": OID, "timestamp": TS})) == {
+        "_id": "665b1f0c2f4e8a1b2c3d4e5f",
+        "timestamp": "2025-06-01T12:30:05.123000",
+    }
+
+def test_utc_z_matches_isoformat_suffix():
+    assert orjson.loads(dumps({"timestamp": TS}, utc_z=True))["timestamp"] == TS.isoformat() + "Z"
+
+def test_stream_json_array():
+    assert collect(FakeCursor([])) == b"[]"
+    docs = [{"_id": OID, "n": i} for i in range(3)]
+    assert orjson.loads(collect(FakeCursor(docs))) == [{"_id": str(OID), "n": i} for i in range(3)]
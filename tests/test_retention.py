@@ -0,0 +1,33 @@
+# tests/test_retention.py
+
+from datetime import datetime, timezone
+from bson import ObjectId
+from shared.retention import (
+    retention_cutoff, flatten_row, write_archive, read_archive, file_sha256
+)
+
+def test_cutoff_is_hour_aligned():
+    now = datetime(2024, 6, 10, 14, 37, 12, tzinfo=timezone.utc)
+    assert retention_cutoff(30, now) == datetime(2024, 5, 11, 14, 0, tzinfo=timezone.utc)
+
+def test_flatten_row_makes_scalar_columns():
+    oid = ObjectId()
+    row = flatten_row({
+        "_id": oid,
+        "user": "athlete",
+        "received_data": {"heart_rate": 0, "body_temperature": 36.5},
+        "timestamp": datetime(2024, 5, 1, 12, 0),
+    })
+    assert row["_id"] == str(oid)
+    assert row["received_data"] == '{"heart_rate":0,"body_temperature":36.5}'
+    assert row["timestamp"].tzinfo == timezone.utc
+
+def test_archive_round_trip(tmp_path):
+    rows = [flatten_row({"_id": ObjectId(), "user": "a@b.c", "heart_rate": 70 + i}) for i in range(10)]
+    path = write_archive(rows, str(tmp_path / "sensor_data" / "2024-05-01-x"), "csv.gz")
+
+    assert path.endswith(".csv.gz")
+    assert not (tmp_path / "sensor_data" / "2024-05-01-x.csv.gz.tmp").exists()
+    frame = read_archive(path)
+    assert len(frame) == 10
+    assert list(frame["_id"]) == [r["_id"] for r in rows]
@@ -0,0 +1,29 @@
+# tests/test_rollups.py
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+import shared.repositories as repositories
+import shared.rollups as rollups
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories, seed
+
+T0 = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def repos():
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    seed(repos, "sensor_data", [
+        {"user": "ann", "timestamp": T0 + timedelta(seconds=s), "heart_rate": 60.0 + s}
+        for s in range(10)
+    ])
+    yield repos
+    set_repositories(previous)
+
+def test_raw_history_over_the_limit_keeps_the_newest_rows(repos, monkeypatch):
+    monkeypatch.setattr(rollups, "RAW_HISTORY_LIMIT", 4)
+    history = asyncio.run(rollups.read_history("ann", T0, T0 + timedelta(minutes=1), resolution="raw"))
+    epoch_ms = int(T0.timestamp() * 1000)
+    assert history["series"]["heart_rate"] == [[epoch_ms + s * 1000, 60.0 + s] for s in range(6, 10)]
@@ -0,0 +1,73 @@
+# tests/test_sampling.py
+
+from athlete_app.services.sampling import AdaptiveSampler
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_sampler(**kwargs):
+    clock = Clock()
+    options = dict(min_seconds=2, base_seconds=5, max_seconds=60, watch_max_seconds=15,
+                   doubling_seconds=600, load_gain=2, capacity=100, clock=clock)
+    options.update(kwargs)
+    return AdaptiveSampler(**options), clock
+
+def interval(result):
+    return result["recommended_interval_seconds"]
+
+def test_backs_off_while_stable_and_caps():
+    sampler, clock = make_sampler()
+    first = sampler.observe("a", "Hydrated")
+    assert first == {"recommended_interval_seconds": 5, "sampling_reason": "new"}
+
+    clock.now = 600
+    assert interval(sampler.observe("a", "Hydrated")) == 10
+    clock.now = 1200
+    assert interval(sampler.observe("a", "Hydrated")) == 20
+    clock.now = 3600
+    result = sampler.observe("a", "Hydrated")
+    assert interval(result) == 60 and result["sampling_reason"] == "stable"
+
+def test_transition_resets_to_fastest_rate():
+    sampler, clock = make_sampler()
+    sampler.observe("a", "Hydrated")
+    clock.now = 3600
+    result = sampler.observe("a", "Slightly Dehydrated", load=1.0)
+    # Load never slows down a transition
+    assert result == {"recommended_interval_seconds": 2, "sampling_reason": "transition"}
+    assert sampler.transitions == 1
+
+def test_not_hydrated_stays_on_watch_cap():
+    sampler, clock = make_sampler()
+    sampler.observe("a", "Dehydrated")
+    clock.now = 3600
+    result = sampler.observe("a", "Dehydrated")
+    assert result == {"recommended_interval_seconds": 15, "sampling_reason": "watch"}
+
+def test_load_never_stretches_past_the_watch_cap():
+    sampler, clock = make_sampler()
+    sampler.observe("a", "Slightly Dehydrated")
+    clock.now = 3600
+    result = sampler.observe("a", "Slightly Dehydrated", load=1.0)
+    assert result == {"recommended_interval_seconds": 15, "sampling_reason": "watch"}
+
+def test_load_stretches_stable_interval():
+    sampler, clock = make_sampler()
+    sampler.observe("a", "Hydrated")
+    clock.now = 600
+    result = sampler.observe("a", "Hydrated", load=0.5)
+    assert result == {"recommended_interval_seconds": 20, "sampling_reason": "load"}
+    clock.now = 3600
+    assert interval(sampler.observe("a", "Hydrated", load=1.0)) == 60
+
+def test_state_is_bounded():
+    sampler, _ = make_sampler(capacity=2)
+    for athlete in ("a", "b", "c"):
+        sampler.observe(athlete, "Hydrated")
+    assert sampler.stats()["tracked"] == 2
+    # "a" was evicted, so it starts over instead of counting as a transition
+    assert sampler.observe("a", "Dehydrated")["sampling_reason"] == "new"
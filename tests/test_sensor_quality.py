@@ -0,0 +1,114 @@
+# tests/test_sensor_quality.py
+
+import asyncio
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+import shared.repositories as repositories
+from shared.repositories import set_repositories
+from shared.repositories.memory import MemoryRepositories
+from athlete_app.services.sensor_quality import (
+    RAW_CHANNELS, SensorQualityMonitor, assess, record_sensor_warnings, summarize
+)
+
+T0 = datetime(2025, 6, 1, 12, 0, 30, tzinfo=timezone.utc)
+
+def steady(n, rng=np.random.default_rng(0)):
+    """n plausible raw readings: bpm, gy906, groveGsr, ad8232."""
+    return np.column_stack([
+        rng.normal(80, 2, n), rng.normal(36.6, 0.05, n), rng.normal(1200, 10, n), rng.integers(1500, 2500, n),
+    ])
+
+@pytest.fixture
+def repos():
+    previous = repositories._repositories
+    repos = MemoryRepositories()
+    set_repositories(repos)
+    yield repos
+    set_repositories(previous)
+
+def test_missing_and_range_masks():
+    values = steady(3).tolist()
+    values[1][0] = None
+    values[2][1] = 45.0
+    masks = assess(values)
+    assert masks["missing"][1].tolist() == [True, False, False, False]
+    assert masks["range"][2].tolist() == [False, True, False, False]
+    assert masks["rejected"].tolist() == [False, True, True]
+
+def test_flatline_spike_and_dropout_over_batch():
+    values = steady(20)
+    values[8:, 3] = 2048          # ECG stuck from sample 8 on
+    values[15, 0] = 160           # bpm spike
+    stamps = np.arange(20) * 5.0
+    stamps[12:] += 60             # one minute gap before sample 12
+    masks = assess(values, RAW_CHANNELS, stamps, flatline_samples=10)
+
+    assert np.flatnonzero(masks["flatline"][:, 3]).tolist() == list(range(17, 20))
+    assert np.flatnonzero(masks["spike"][:, 0]).tolist() == [15]
+    assert not masks["spike"][:, 3].any()
+    assert np.flatnonzero(masks["dropout"]).tolist() == [12]
+    assert summarize(masks, row=15)["flags"] == {"bpm": ["spike"]}
+
+def test_monitor_keeps_a_window_per_device_and_ignores_retries():
+    monitor = SensorQualityMonitor(window=12)
+    sample = {"bpm": 80.0, "gy906": 36.6, "groveGsr": 1200.0, "ad8232": 2048}
+    for t in range(9):
+        jitter = dict(sample, bpm=80.0 + t % 3, gy906=36.5 + t % 2 / 10, groveGsr=1200.0 + t)
+        assert not monitor.check("a", jitter, t * 10)["rejected"]
+    # Retry of the last reading doesn't count as another identical sample
+    assert monitor.check("a", dict(sample, bpm=82.0), 80).get("repeat")
+    result = monitor.check("a", dict(sample, bpm=81.0, groveGsr=1210.0), 90)
+    assert result["flags"] == {"ad8232": ["flatline"]} and result["rejected"]
+    # Other devices have their own window
+    assert monitor.check("b", sample, 90)["flags"] == {}
+    assert monitor.stats()["devices"] == 2
+
+def test_steady_temperature_and_heart_rate_ramp_are_not_artifacts():
+    rng = np.random.default_rng(1)
+    monitor = SensorQualityMonitor(window=30)
+    # Skin temperature holds at 36.6 while exercise lifts the heart rate 72 -> 115
+    bpm = [72.0 + rng.normal(0, 1) for _ in range(12)] + [95.0, 105.0, 110.0, 115.0, 115.0, 114.0, 116.0]
+    for t, rate in enumerate(bpm):
+        sample = {"bpm": rate, "gy906": 36.6, "groveGsr": 1200.0 + rng.normal(0, 15), "ad8232": 1500 + t * 37 % 900}
+        result = monitor.check("a", sample, t * 5)
+        assert result["flags"] == {} and result["confirmed"] == {} and not result["rejected"]
+
+def test_single_outlier_is_a_spike_once_the_next_sample_returns():
+    rng = np.random.default_rng(2)
+    monitor = SensorQualityMonitor(window=30)
+    sample = {"gy906": 36.6, "groveGsr": 1200.0, "ad8232": 2000}
+    for t in range(12):
+        monitor.check("a", dict(sample, bpm=72.0 + rng.normal(0, 1), groveGsr=1200.0 + t), t * 5)
+    outlier = monitor.check("a", dict(sample, bpm=160.0, groveGsr=1190.0), 60)
+    assert outlier["flags"] == {} and not outlier["rejected"]
+    back = monitor.check("a", dict(sample, bpm=73.0, groveGsr=1185.0), 65)
+    assert back["confirmed"] == {"bpm": ["spike"]} and back["flags"] == {}
+
+def test_excluded_samples_stay_out_of_the_spike_baseline():
+    values = [[72.0 + i % 3, 36.6, 1200.0 + i, 2000.0] for i in range(12)]
+    # Earlier samples the monitor excluded (rejected / confirmed spikes), then a 38.0 blip
+    values += [[72.0, 38.0, 1200.0, 2000.0]] * 14 + [[72.0, 38.0, 1200.0, 2000.0], [72.0, 36.6, 1200.0, 2000.0]]
+    reference = [True] * 12 + [False] * 14 + [True, True]
+    assert assess(values, RAW_CHANNELS, reference=reference)["spike"][26, 1]
+    # Left in the baseline they would have made the blip look normal
+    assert not assess(values, RAW_CHANNELS)["spike"][26, 1]
+
+def test_warnings_aggregate_into_one_document_per_window(repos):
+    result = {"flags": {"ad8232": ["flatline"], "bpm": ["spike"]}, "dropout": False, "rejected": True}
+
+    async def scenario():
+        opened = [
+            await record_sensor_warnings("john", "band-1", result, {"gy906": 36.6}, now=T0.replace(second=s))
+            for s in (30, 40, 50)
+        ]
+        return opened, await repos.sensor_warnings.find({}).to_list(length=None)
+
+    opened, docs = asyncio.run(scenario())
+    assert opened == [True, False, False]
+    assert len(docs) == 1
+    doc = docs[0]
+    assert doc["samples"] == 3 and doc["counts"]["ad8232"]["flatline"] == 3
+    assert sorted(doc["missing_field"]) == ["ad8232", "bpm"]
+    # Stored as naive UTC, like MongoDB hands it back
+    assert doc["timestamp"] == doc["window_start"] == datetime(2025, 6, 1, 12, 0)
@@ -0,0 +1,129 @@
+# tests/test_spool.py
+
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from shared.spool import Spool, SpoolFull, claim_orphaned_spools
+
+class FakeCollection:
+    def __init__(self, store):
+        self.store = store
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        for i, doc in enumerate(docs):
+            if doc["_id"] in self.store:
+                errors.append({"index": i, "code": 11000})
+            else:
+                self.store[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+class FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeCollection({}))
+
+def test_append_survives_reopen(tmp_path):
+    path = str(tmp_path / "spool-1.bin")
+    ts = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    oid = ObjectId()
+
+    spool = Spool(path).open()
+    spool.append("sensor_data", [{"_id": oid, "timestamp": ts, "heart_rate": 80}])
+    spool.close()
+
+    spool = Spool(path).open()
+    assert spool.pending == 1
+    items, _ = spool.read_batch(10)
+    spool.close()
+
+    collection, doc = items[0]
+    assert collection == "sensor_data"
+    assert doc["_id"] == oid
+    assert doc["heart_rate"] == 80
+    assert doc["timestamp"].replace(tzinfo=timezone.utc) == ts
+
+def test_commit_drains_and_rewinds(tmp_path):
+    spool = Spool(str(tmp_path / "spool-1.bin")).open()
+    spool.append("predictions", [{"n": i} for i in range(5)])
+
+    items, offset = spool.read_batch(3)
+    spool.commit(offset, len(items))
+    assert spool.pending == 2
+
+    items, offset = spool.read_batch(10)
+    assert [d["n"] for _, d in items] == [3, 4]
+    spool.commit(offset, len(items))
+    assert spool.pending == 0
+    assert spool.stats()["bytes"] == 0
+    spool.close()
+
+def test_grows_until_max_size(tmp_path):
+    spool = Spool(str(tmp_path / "spool-1.bin"), initial_size=256, max_size=4096).open()
+    spool.append("sensor_data", [{"pad": "x" * 200}])
+    assert spool.pending == 1
+
+    with pytest.raises(SpoolFull):
+        spool.append("sensor_data", [{"pad": "x" * 5000}])
+    assert spool.pending == 1
+    spool.close()
+
+def test_replay_skips_duplicates(tmp_path):
+    db = FakeDB()
+    first, second = ObjectId(), ObjectId()
+    db["sensor_data"].store[first] = {"_id": first}
+
+    spool = Spool(str(tmp_path / "spool-1.bin")).open()
+    spool.append("sensor_data", [{"_id": first}, {"_id": second}])
+    replayed = asyncio.run(spool.replay(db))
+
+    assert replayed == 2
+    assert spool.pending == 0
+    assert spool.duplicates == 1
+    assert spool.rejected == 0
+    assert set(db["sensor_data"].store) == {first, second}
+    spool.close()
+
+def test_orphans_exclude_locked_files(tmp_path):
+    live = Spool(str(tmp_path / "spool-1.bin")).open()
+    dead = Spool(str(tmp_path / "spool-2.bin")).open()
+    dead.close()
+
+    claimed = list(claim_orphaned_spools(str(tmp_path)))
+    assert [s.path for s in claimed] == [str(tmp_path / "spool-2.bin")]
+    claimed[0].close()
+    assert list(claim_orphaned_spools(str(tmp_path), exclude=dead.path)) == []
+    live.close()
+
+def test_claim_skips_orphan_taken_by_another_worker(tmp_path):
+    for name in ("spool-1.bin", "spool-2.bin"):
+        Spool(str(tmp_path / name)).open().close()
+    # Another worker claims spool-1 between our listing and our open
+    other = Spool(str(tmp_path / "spool-1.bin")).open()
+
+    claimed = list(claim_orphaned_spools(str(tmp_path)))
+    assert [s.path for s in claimed] == [str(tmp_path / "spool-2.bin")]
+    assert all(s.is_open for s in claimed)
+    for s in claimed:
+        s.close()
+    other.close()
+
+def test_replay_loop_survives_unexpected_errors(monkeypatch):
+    import athlete_app.services.ingest as ingest
+
+    calls = []
+
+    async def failing_pass():
+        calls.append(1)
+        if len(calls) == 1:
+            raise BlockingIOError("orphan taken")
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(ingest, "replay_spool_once", failing_pass)
+    monkeypatch.setattr(ingest, "SPOOL_REPLAY_SECONDS", 0)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(ingest._replay_loop())
+    assert len(calls) == 3
@@ -0,0 +1,44 @@
+# tests/test_startup.py
+#
+# Importing the app must stay cheap: no pandas / scikit-learn / Motor client
+# until the lifespan (or the first prediction) needs them. That is the hard
+# check; wall-clock import time depends on the machine, so the budget only
+# runs when asked for:
+#   IMPORT_TIME_BUDGET_MS=800 pytest tests/test_startup.py
+
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "0"))
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "motor")
+
+PROBE = """
+import sys, main, shared.database as database
+print("HEAVY", ",".join(m for m in {heavy!r} if m in sys.modules))
+print("CLIENT", database._client is not None)
+"""
+
+def run_probe(*flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+
+def test_import_does_not_load_heavy_modules_or_connect():
+    out = run_probe().stdout
+    assert "HEAVY \n" in out
+    assert "CLIENT False" in out
+
+@pytest.mark.skipif(not IMPORT_TIME_BUDGET_MS, reason="set IMPORT_TIME_BUDGET_MS to check import time")
+def test_import_time_budget():
+    # -X importtime: "import time: self [us] | cumulative | imported package"
+    stderr = run_probe("-X", "importtime").stderr
+    cumulative = [
+        int(line.split("|")[1]) for line in stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[2].strip() == "main"
+    ]
+    assert cumulative, stderr[-500:]
+    assert cumulative[0] / 1000 < IMPORT_TIME_BUDGET_MS
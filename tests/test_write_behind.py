@@ -0,0 +1,75 @@
+# tests/test_write_behind.py
+
+import asyncio
+from shared.write_behind import WriteBehindBuffer
+
+class FakeCollection:
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.singles = []
+        self.delay = delay
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.batches.append(list(docs))
+
+    async def insert_one(self, doc):
+        self.singles.append(doc)
+
+def test_disabled_buffer_writes_inline():
+    coll = FakeCollection()
+    buffer = WriteBehindBuffer(coll, enabled=False)
+
+    async def run():
+        await buffer.start()
+        await buffer.submit({"n": 1})
+
+    asyncio.run(run())
+    assert coll.singles == [{"n": 1}]
+    assert coll.batches == []
+
+def test_coalesces_and_drains_on_stop():
+    coll = FakeCollection()
+    buffer = WriteBehindBuffer(coll, max_batch=100, flush_interval=5)
+
+    async def run():
+        await buffer.start()
+        for i in range(250):
+            await buffer.submit({"n": i})
+        await buffer.stop()
+
+    asyncio.run(run())
+    sizes = [len(b) for b in coll.batches]
+    assert sum(sizes) == 250
+    assert max(sizes) <= 100
+    assert [d["n"] for b in coll.batches for d in b] == list(range(250))
+    assert buffer.stats()["written"] == 250
+
+def test_flushes_on_interval():
+    coll = FakeCollection()
+    buffer = WriteBehindBuffer(coll, max_batch=100, flush_interval=0.01)
+
+    async def run():
+        await buffer.start()
+        await buffer.submit({"n": 1})
+        await asyncio.sleep(0.05)
+        flushed = list(coll.batches)
+        await buffer.stop()
+        return flushed
+
+    assert asyncio.run(run()) == [[{"n": 1}]]
+
+def test_full_queue_falls_back_to_inline_write():
+    coll = FakeCollection(delay=0.2)
+    buffer = WriteBehindBuffer(coll, max_batch=1, flush_interval=0, max_queue=2, put_timeout=0.01)
+
+    async def run():
+        await buffer.start()
+        for i in range(10):
+            await buffer.submit({"n": i})
+        await buffer.stop()
+
+    asyncio.run(run())
+    written = sum(len(b) for b in coll.batches) + len(coll.singles)
+    assert written == 10
+    assert buffer.stats()["overflow"] == len(coll.singles) > 0